@@ -5,8 +5,13 @@ import { preloadImage } from '../../utils/imagePreloader';
 import { getImageLoadingStrategy, measureImageLoadTime } from '../../utils/deviceDetection';
 import { logImageLoad, logImageError } from '../../utils/imageDebug';
 
+// MIME types of the derivative formats in an API `*_srcset` map
+const SRCSET_TYPES = { avif: 'image/avif', webp: 'image/webp' };
+
 const OptimizedImage = ({
   src,
+  srcSet,
+  sizes = '(max-width: 600px) 50vw, 300px',
   alt,
   fallbackSrc = '/images/placeholder.svg',
   height = 200,
@@ -24,10 +29,14 @@ const OptimizedImage = ({
   const [loadStartTime] = useState(() => performance.now());
   
   const loadingStrategy = getImageLoadingStrategy();
+  // Resized variants let the browser pick a width; the original is only the fallback
+  const responsive = !error && srcSet && Object.keys(srcSet).length > 0;
 
   // Preload image based on device capabilities
   useEffect(() => {
-    if (src && !preloaded && loadingStrategy.preload) {
+    if (responsive) {
+      setPreloaded(true);
+    } else if (src && !preloaded && loadingStrategy.preload) {
       const imageUrl = getImageUrlWithFallback(src, fallbackSrc);
       preloadImage(imageUrl, 'high')
         .then(() => {
@@ -42,7 +51,7 @@ const OptimizedImage = ({
     } else if (!loadingStrategy.preload) {
       setPreloaded(true);
     }
-  }, [src, fallbackSrc, preloaded, loadingStrategy.preload, loadStartTime]);
+  }, [src, responsive, fallbackSrc, preloaded, loadingStrategy.preload, loadStartTime]);
 
   const handleLoad = useCallback(() => {
     setLoading(false);
@@ -89,30 +98,37 @@ const OptimizedImage = ({
         />
       )}
       
-      <img
-        src={currentSrc}
-        alt={alt}
-        onLoad={handleLoad}
-        onError={handleError}
-        onClick={onClick}
-        loading={loadingStrategy.lazy ? 'lazy' : 'eager'}
-        style={{
-          height,
-          width,
-          objectFit,
-          opacity: loading ? 0 : 1,
-          transition: 'opacity 0.3s ease',
-          cursor: onClick ? 'pointer' : 'default',
-          // Mobile-specific optimizations
-          imageRendering: loadingStrategy.quality === 'low' ? 'pixelated' : 'auto',
-          WebkitImageSmoothing: true,
-          // Improve rendering performance on mobile
-          willChange: 'transform',
-          backfaceVisibility: 'hidden',
-          ...sx,
-        }}
-        {...props}
-      />
+      <picture>
+        {responsive && Object.entries(SRCSET_TYPES).map(([format, type]) => (
+          srcSet[format] ? <source key={format} type={type} srcSet={srcSet[format]} sizes={sizes} /> : null
+        ))}
+        <img
+          src={currentSrc}
+          srcSet={responsive ? srcSet.jpeg : undefined}
+          sizes={responsive && srcSet.jpeg ? sizes : undefined}
+          alt={alt}
+          onLoad={handleLoad}
+          onError={handleError}
+          onClick={onClick}
+          loading={loadingStrategy.lazy ? 'lazy' : 'eager'}
+          style={{
+            height,
+            width,
+            objectFit,
+            opacity: loading ? 0 : 1,
+            transition: 'opacity 0.3s ease',
+            cursor: onClick ? 'pointer' : 'default',
+            // Mobile-specific optimizations
+            imageRendering: loadingStrategy.quality === 'low' ? 'pixelated' : 'auto',
+            WebkitImageSmoothing: true,
+            // Improve rendering performance on mobile
+            willChange: 'transform',
+            backfaceVisibility: 'hidden',
+            ...sx,
+          }}
+          {...props}
+        />
+      </picture>
       
       {error && currentSrc === fallbackSrc && (
         <Box
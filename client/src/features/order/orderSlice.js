@@ -11,6 +11,10 @@ const initialState = {
   success: false,
   totalPages: 1,
   updatingStatus: false,
+  dashboard: null,
+  dashboardLoading: false,
+  quote: null,
+  quoteLoading: false,
 };
 
 // Create order
@@ -177,17 +181,11 @@ export const getAllOrders = createAsyncThunk(
         },
       };
       
-      // For dashboard statistics, we need all orders, not paginated
-      if (params.getAllForStats) {
-        // Fetch all orders by setting a very high page size
-        const { data } = await axios.get(getApiUrl('/api/orders/?page_size=10000'), config);
-        return data;
-      }
-      
       // Build query parameters for regular pagination
       const queryParams = new URLSearchParams();
       if (params.page) queryParams.append('page', params.page);
-      if (params.limit) queryParams.append('limit', params.limit);
+      // The API caps page_size at 100
+      if (params.page_size) queryParams.append('page_size', params.page_size);
       if (params.status) queryParams.append('status', params.status);
       if (params.order_id) queryParams.append('order_id', params.order_id);
       
@@ -206,6 +204,58 @@ export const getAllOrders = createAsyncThunk(
   }
 );
 
+// Checkout totals priced by the server: { items: [{ perfume_id, quantity }], province }
+// Signed-in customers can leave out items to price their cart
+export const getQuote = createAsyncThunk(
+  'order/getQuote',
+  async (quoteRequest = {}, { getState, rejectWithValue }) => {
+    try {
+      const { auth } = getState();
+      const config = {
+        headers: {
+          'Content-Type': 'application/json',
+        },
+      };
+      if (auth.userToken) {
+        config.headers.Authorization = `Bearer ${auth.userToken}`;
+      }
+      const { data } = await axios.post(getApiUrl('/api/orders/quote/'), quoteRequest, config);
+      return data;
+    } catch (error) {
+      if (error.response && error.response.data.items) {
+        return rejectWithValue(String(error.response.data.items));
+      } else if (error.response && error.response.data.message) {
+        return rejectWithValue(error.response.data.message);
+      } else {
+        return rejectWithValue(error.message);
+      }
+    }
+  }
+);
+
+// Dashboard figures (admin), aggregated server-side
+export const getDashboardStats = createAsyncThunk(
+  'order/getDashboardStats',
+  async ({ days = 30 } = {}, { getState, rejectWithValue }) => {
+    try {
+      const { auth } = getState();
+      const config = {
+        headers: {
+          Authorization: `Bearer ${auth.userToken}`,
+        },
+      };
+      const { data } = await axios.get(getApiUrl(`/api/orders/dashboard/?days=${days}`), config);
+      return data;
+    } catch (error) {
+      if (error.response && error.response.data.message) {
+        return rejectWithValue(error.response.data.message);
+      } else {
+        return rejectWithValue(error.message);
+      }
+    }
+  }
+);
+
 // Update order status (admin)
 export const updateOrderStatus = createAsyncThunk(
   'order/updateOrderStatus',
@@ -281,6 +331,22 @@ const orderSlice = createSlice({
     clearOrderDetails: (state) => {
       state.order = null;
     },
+    // Live change from the order event stream (see useOrderStream)
+    orderEventReceived: (state, { payload }) => {
+      const changes = {
+        status: payload.status,
+        status_display: payload.status_display,
+        payment_status: payload.payment_status,
+        updated_at: payload.updated_at,
+      };
+      const orderIndex = state.orders.findIndex(order => order.id === payload.id);
+      if (orderIndex !== -1) {
+        state.orders[orderIndex] = { ...state.orders[orderIndex], ...changes };
+      }
+      if (state.order && state.order.id === payload.id) {
+        state.order = { ...state.order, ...changes };
+      }
+    },
   },
   extraReducers: (builder) => {
     builder
@@ -353,18 +419,43 @@ const orderSlice = createSlice({
       .addCase(getAllOrders.pending, (state) => {
         state.loading = true;
       })
-      .addCase(getAllOrders.fulfilled, (state, { payload }) => {
+      .addCase(getAllOrders.fulfilled, (state, { payload, meta }) => {
         state.loading = false;
         // Ensure orders is always an array
         state.orders = Array.isArray(payload) ? payload : (payload?.results || payload?.orders || []);
         // Set totalPages from API response, default to 1 if not provided
-        state.totalPages = payload?.total_pages || Math.ceil((payload?.count || state.orders.length) / 10) || 1;
+        const pageSize = meta.arg?.page_size || 10;
+        state.totalPages = payload?.total_pages || Math.ceil((payload?.count || state.orders.length) / pageSize) || 1;
       })
       .addCase(getAllOrders.rejected, (state, { payload }) => {
         state.loading = false;
         state.error = payload;
         state.orders = []; // Reset to empty array on error
       })
+      // Checkout quote
+      .addCase(getQuote.pending, (state) => {
+        state.quoteLoading = true;
+      })
+      .addCase(getQuote.fulfilled, (state, { payload }) => {
+        state.quoteLoading = false;
+        state.quote = payload;
+      })
+      .addCase(getQuote.rejected, (state) => {
+        state.quoteLoading = false;
+        state.quote = null;
+      })
+      // Dashboard figures (admin)
+      .addCase(getDashboardStats.pending, (state) => {
+        state.dashboardLoading = true;
+      })
+      .addCase(getDashboardStats.fulfilled, (state, { payload }) => {
+        state.dashboardLoading = false;
+        state.dashboard = payload;
+      })
+      .addCase(getDashboardStats.rejected, (state, { payload }) => {
+        state.dashboardLoading = false;
+        state.error = payload;
+      })
       // Update order status (admin)
       .addCase(updateOrderStatus.pending, (state) => {
         state.updatingStatus = true;
@@ -410,6 +501,6 @@ const orderSlice = createSlice({
   },
 });
 
-export const { clearOrderError, resetOrderSuccess, clearOrderDetails } =
+export const { clearOrderError, resetOrderSuccess, clearOrderDetails, orderEventReceived } =
   orderSlice.actions;
 export default orderSlice.reducer;
\ No newline at end of file
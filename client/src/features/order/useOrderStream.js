@@ -0,0 +1,93 @@
+import { useEffect } from 'react';
+import { useDispatch } from 'react-redux';
+import axios from 'axios';
+import { getApiUrl } from '../../utils/api';
+import { orderEventReceived } from './orderSlice';
+
+const RETRY_DELAY = 3000;
+
+// Keeps the order slice current from /api/orders/stream/ (Server-Sent Events).
+// EventSource cannot send headers and an access token in the URL would be
+// logged, so each connection opens with a short-lived single-use ticket from
+// /api/orders/stream_ticket/. A used ticket cannot reconnect, so on any error
+// the stream is reopened with a fresh one, resuming after the last event id.
+const useOrderStream = (enabled = true) => {
+  const dispatch = useDispatch();
+
+  useEffect(() => {
+    if (!enabled || typeof EventSource === 'undefined') {
+      return undefined;
+    }
+    let token = null;
+    try {
+      token = localStorage.getItem('userToken');
+    } catch (error) {
+      console.warn('Failed to read token from localStorage:', error);
+    }
+    if (!token) {
+      return undefined;
+    }
+
+    let source = null;
+    let retryTimer = null;
+    let lastEventId = null;
+    let stopped = false;
+
+    const retry = () => {
+      if (!stopped) {
+        retryTimer = setTimeout(connect, RETRY_DELAY);
+      }
+    };
+
+    const connect = async () => {
+      let ticket;
+      try {
+        const config = {
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        };
+        const { data } = await axios.post(getApiUrl('/api/orders/stream_ticket/'), {}, config);
+        ticket = data.ticket;
+      } catch (error) {
+        // A rejected token will not get better by retrying
+        if (error.response?.status !== 401) {
+          retry();
+        }
+        return;
+      }
+      if (stopped) {
+        return;
+      }
+
+      const params = new URLSearchParams({ ticket });
+      if (lastEventId) {
+        params.set('last_event_id', lastEventId);
+      }
+      source = new EventSource(`${getApiUrl('/api/orders/stream/')}?${params}`);
+      source.addEventListener('order', (event) => {
+        lastEventId = event.lastEventId;
+        try {
+          dispatch(orderEventReceived(JSON.parse(event.data)));
+        } catch (error) {
+          console.warn('Ignoring malformed order event:', error);
+        }
+      });
+      source.onerror = () => {
+        source.close();
+        retry();
+      };
+    };
+
+    connect();
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      if (source) {
+        source.close();
+      }
+    };
+  }, [dispatch, enabled]);
+};
+
+export default useOrderStream;
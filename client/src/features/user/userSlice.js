@@ -11,7 +11,7 @@ const initialState = {
 // Get all users (admin only)
 export const getAllUsers = createAsyncThunk(
   'user/getAllUsers',
-  async (_, { getState, rejectWithValue }) => {
+  async (params = {}, { getState, rejectWithValue }) => {
     try {
       const { auth } = getState();
       const config = {
@@ -20,8 +20,13 @@ export const getAllUsers = createAsyncThunk(
         },
       };
       
-      // Fetch all users by setting a high page size
-      const { data } = await axios.get(getApiUrl('/api/users/?page_size=10000'), config);
+      // One page at a time (the API caps page_size at 100); totals come from /api/orders/dashboard/
+      const queryParams = new URLSearchParams();
+      if (params.page) queryParams.append('page', params.page);
+      if (params.page_size) queryParams.append('page_size', params.page_size);
+      if (params.search) queryParams.append('search', params.search);
+      const queryString = queryParams.toString();
+      const { data } = await axios.get(getApiUrl(queryString ? `/api/users/profile/?${queryString}` : '/api/users/profile/'), config);
       return data;
     } catch (error) {
       if (error.response && error.response.data.message) {
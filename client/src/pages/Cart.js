@@ -227,7 +227,7 @@ const Cart = () => {
                             </Typography>
                           </Link>
                           <Typography variant="body2" color="textSecondary" className="brand-name" sx={{ fontSize: '0.9rem' }}>
-                            {(item.perfume_details?.brand?.name || item.perfume?.brand?.name) || ''}
+                            {(item.perfume_details?.brand_name || item.perfume_details?.brand?.name || item.perfume?.brand?.name) || ''}
                           </Typography>
                         </Box>
                       </Box>
@@ -20,7 +20,7 @@ import {
   CircularProgress,
 } from '@mui/material';
 import { getCart, loadGuestCart } from '../features/cart/cartSlice';
-import { createOrder, createGuestOrder, clearOrderError, resetOrderSuccess } from '../features/order/orderSlice';
+import { createOrder, createGuestOrder, clearOrderError, resetOrderSuccess, getQuote } from '../features/order/orderSlice';
 import GuestCheckoutForm from '../components/checkout/GuestCheckoutForm';
 
 const steps = ['Contact Info', 'Payment Method', 'Review Order'];
@@ -44,7 +44,7 @@ const Checkout = () => {
   
   const { cartItems, cartTotal, loading: cartLoading } = useSelector((state) => state.cart);
   const { isAuthenticated, userInfo: user } = useSelector((state) => state.auth);
-  const { loading: orderLoading, success: orderSuccess, error: orderError } = useSelector((state) => state.order);
+  const { loading: orderLoading, success: orderSuccess, error: orderError, quote } = useSelector((state) => state.order);
 
   useEffect(() => {
     // Clear any previous order state when entering checkout
@@ -60,6 +60,19 @@ const Checkout = () => {
     }
   }, [dispatch, isAuthenticated]);
 
+  // Totals come from the server's pricing engine, refreshed on the review step
+  useEffect(() => {
+    if (activeStep !== steps.length - 1 || !cartItems || cartItems.length === 0) return;
+    const quoteRequest = { province: isAuthenticated ? '' : guestInfo.province };
+    if (!isAuthenticated) {
+      quoteRequest.items = cartItems.map(item => ({
+        perfume_id: item.perfume ? item.perfume.id : (item.perfume_details ? item.perfume_details.id : null),
+        quantity: item.quantity
+      }));
+    }
+    dispatch(getQuote(quoteRequest));
+  }, [dispatch, activeStep, cartItems, isAuthenticated, guestInfo.province]);
+
   useEffect(() => {
     if (orderSuccess) {
       // Show confirmation message
@@ -118,28 +131,13 @@ const Checkout = () => {
       return;
     }
     
-    // Calculate order totals - ensure cartTotal is a number
-    const subtotal = Number(cartTotal) || 0;
-    const tax = subtotal * 0.1; // 10% tax
-    const shipping = 0; // Free shipping
-    const total = subtotal + tax + shipping;
-
+    // Subtotal, shipping, tax and total are priced by the server
     const orderData = {
-      payment_method: paymentMethod,
-      subtotal: subtotal.toFixed(2),
-      tax: tax.toFixed(2),
-      shipping: shipping.toFixed(2),
-      total: total.toFixed(2)
+      payment_method: paymentMethod
     };
     
-    if (isAuthenticated) {
-      // For authenticated users, use 'items' field
-      orderData.items = cartItems.map(item => ({
-        perfume_id: item.perfume ? item.perfume.id : (item.perfume_details ? item.perfume_details.id : null),
-        quantity: item.quantity,
-        price: item.perfume ? (item.perfume.discount_price || item.perfume.price) : (item.perfume_details ? (item.perfume_details.discount_price || item.perfume_details.price) : 0)
-      }));
-    } else {
+    // Signed-in orders are built from the server-side cart
+    if (!isAuthenticated) {
       // For guest users, use 'cart_items' field and individual guest fields
       orderData.cart_items = cartItems.map(item => ({
         perfume: {
@@ -286,18 +284,25 @@ const Checkout = () => {
                   <Typography variant="subtitle1" gutterBottom>
                     Order Total
                   </Typography>
-                  <Box
-                    sx={{
-                      display: 'flex',
-                      justifyContent: 'space-between',
-                      mb: 1,
-                    }}
-                  >
-                    <Typography variant="body1">Subtotal</Typography>
-                    <Typography variant="body1">
-                      RWF {Number(cartTotal || 0).toLocaleString()}
-                    </Typography>
-                  </Box>
+                  {[
+                    ['Subtotal', quote ? quote.subtotal : cartTotal],
+                    ['Shipping', quote ? quote.shipping : null],
+                    ['Tax', quote ? quote.tax : null],
+                  ].map(([label, amount]) => (
+                    <Box
+                      key={label}
+                      sx={{
+                        display: 'flex',
+                        justifyContent: 'space-between',
+                        mb: 1,
+                      }}
+                    >
+                      <Typography variant="body1">{label}</Typography>
+                      <Typography variant="body1">
+                        {amount === null ? '…' : `RWF ${Number(amount || 0).toLocaleString()}`}
+                      </Typography>
+                    </Box>
+                  ))}
 
                   <Divider sx={{ my: 1 }} />
                   <Box
@@ -309,7 +314,7 @@ const Checkout = () => {
                   >
                     <Typography variant="h6">Total</Typography>
                     <Typography variant="h6" color="primary">
-                      RWF {Number(cartTotal || 0).toLocaleString()}
+                      RWF {Number(quote ? quote.total : cartTotal || 0).toLocaleString()}
                     </Typography>
                   </Box>
                 </Paper>
@@ -122,6 +122,7 @@ const Home = () => {
       )}
       <OptimizedImage
         src={perfume.image}
+        srcSet={perfume.image_srcset}
         alt={perfume.name}
         height={200}
         sx={{
@@ -27,6 +27,7 @@ import {
 } from '@mui/material';
 import { getOrderDetails, cancelOrder, updatePaymentReceived } from '../features/order/orderSlice';
 import { getImageUrl } from '../utils/api';
+import useOrderStream from '../features/order/useOrderStream';
 
 const OrderDetail = () => {
   const dispatch = useDispatch();
@@ -35,6 +36,7 @@ const OrderDetail = () => {
 
   const { order, loading, error } = useSelector((state) => state.order);
   const { isAuthenticated, userInfo: user } = useSelector((state) => state.auth);
+  useOrderStream(isAuthenticated);
 
   useEffect(() => {
     if (!isAuthenticated) {
@@ -18,6 +18,7 @@ import {
 } from '@mui/material';
 import { ShoppingBag } from '@mui/icons-material';
 import { getUserOrders } from '../features/order/orderSlice';
+import useOrderStream from '../features/order/useOrderStream';
 
 const OrdersList = () => {
   const dispatch = useDispatch();
@@ -25,6 +26,7 @@ const OrdersList = () => {
   
   const { orders, loading, error } = useSelector((state) => state.order);
   const { isAuthenticated } = useSelector((state) => state.auth);
+  useOrderStream(isAuthenticated);
 
   useEffect(() => {
     if (!isAuthenticated) {
@@ -333,6 +333,7 @@ const PerfumeList = () => {
         )}
         <OptimizedImage
           src={perfume.images && perfume.images.length > 0 ? perfume.images[0].image : perfume.image}
+          srcSet={perfume.images && perfume.images.length > 0 ? perfume.images[0].image_srcset : perfume.image_srcset}
           alt={perfume.name}
           height={200}
           onClick={() => navigate(`/perfumes/${perfume.id}`)}
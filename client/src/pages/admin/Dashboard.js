@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
 import { useNavigate } from 'react-router-dom';
 import {
@@ -25,31 +25,17 @@ import {
   AttachMoney,
   TrendingUp,
 } from '@mui/icons-material';
-import { getAllOrders } from '../../features/order/orderSlice';
-import { getAllUsers } from '../../features/user/userSlice';
+import { getDashboardStats } from '../../features/order/orderSlice';
 import AdminLayout from '../../components/admin/AdminLayout';
 
 const Dashboard = () => {
   const dispatch = useDispatch();
   const navigate = useNavigate();
   
-  const { orders, loading } = useSelector((state) => state.order);
-  const { users, loading: usersLoading } = useSelector((state) => state.user);
+  // Figures are aggregated by /api/orders/dashboard/ instead of summing every order here
+  const { dashboard, dashboardLoading } = useSelector((state) => state.order);
   const { userInfo, isAuthenticated } = useSelector((state) => state.auth);
 
-  const [stats, setStats] = useState({
-    totalSales: 0,
-    totalOrders: 0,
-    pendingOrders: 0,
-    processingOrders: 0,
-    shippedOrders: 0,
-    deliveredOrders: 0,
-    cancelledOrders: 0,
-    salesGrowth: 0,
-    ordersGrowth: 0,
-    customersGrowth: 0,
-  });
-
   useEffect(() => {
     if (!isAuthenticated) {
       navigate('/login');
@@ -61,79 +47,29 @@ const Dashboard = () => {
       return;
     }
 
-    dispatch(getAllOrders({ getAllForStats: true }));
-    dispatch(getAllUsers());
+    dispatch(getDashboardStats({ days: 30 }));
   }, [dispatch, isAuthenticated, navigate, userInfo]);
 
-  useEffect(() => {
-    if (orders) {
-      const now = new Date();
-      const lastMonth = new Date(now.getFullYear(), now.getMonth() - 1, now.getDate());
-      
-      // Current period stats
-      const totalSales = orders.reduce(
-        (sum, order) => sum + (order.total_amount || order.total_price || 0),
-        0
-      );
-      const pendingOrders = orders.filter(
-        (order) => order.status === 'pending' || order.status === 'P'
-      ).length;
-      const processingOrders = orders.filter(
-        (order) => order.status === 'processing' || order.status === 'C'
-      ).length;
-      const shippedOrders = orders.filter(
-        (order) => order.status === 'shipped' || order.status === 'S'
-      ).length;
-      const deliveredOrders = orders.filter(
-        (order) => order.status === 'delivered' || order.status === 'D'
-      ).length;
-      const cancelledOrders = orders.filter(
-        (order) => order.status === 'cancelled' || order.status === 'X'
-      ).length;
-      
-      // Last month stats for growth calculation
-      const lastMonthOrders = orders.filter(
-        (order) => new Date(order.created_at) < lastMonth
-      );
-      const lastMonthSales = lastMonthOrders.reduce(
-        (sum, order) => sum + (order.total_amount || order.total_price || 0),
-        0
-      );
-      const lastMonthOrdersCount = lastMonthOrders.length;
-      
-      // Calculate growth percentages
-      const salesGrowth = lastMonthSales > 0 
-        ? Math.round(((totalSales - lastMonthSales) / lastMonthSales) * 100)
-        : 0;
-      const ordersGrowth = lastMonthOrdersCount > 0
-        ? Math.round(((orders.length - lastMonthOrdersCount) / lastMonthOrdersCount) * 100)
-        : 0;
-      
-      setStats({
-        totalSales,
-        totalOrders: orders.length,
-        pendingOrders,
-        processingOrders,
-        shippedOrders,
-        deliveredOrders,
-        cancelledOrders,
-        salesGrowth,
-        ordersGrowth,
-        customersGrowth: users && users.length > 0 ? Math.round((users.length / 10) * 100) / 100 : 0, // Simple growth calculation
-      });
-    }
-  }, [orders, users]);
+  const orderStats = dashboard?.orders;
+  const byStatus = orderStats?.by_status || {};
+  const stats = {
+    totalSales: parseFloat(orderStats?.revenue?.total || 0),
+    totalOrders: orderStats?.total || 0,
+    totalCustomers: dashboard?.customers?.total || 0,
+    pendingOrders: byStatus.P || 0,
+    processingOrders: byStatus.C || 0,
+    shippedOrders: byStatus.S || 0,
+    deliveredOrders: byStatus.D || 0,
+    cancelledOrders: byStatus.X || 0,
+    // null when there is nothing to compare against
+    salesGrowth: orderStats?.period?.revenue_growth ?? 0,
+    ordersGrowth: orderStats?.period?.orders_growth ?? 0,
+    customersGrowth: dashboard?.customers?.growth ?? 0,
+  };
 
-  const recentOrders = orders
-    ? [...orders]
-        .sort(
-          (a, b) =>
-            new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
-        )
-        .slice(0, 5)
-    : [];
+  const recentOrders = dashboard?.recent_orders || [];
 
-  if (loading || usersLoading) {
+  if (dashboardLoading && !dashboard) {
     return (
       <AdminLayout>
         <Box sx={{ display: 'flex', justifyContent: 'center', mt: 4 }}>
@@ -250,7 +186,7 @@ const Dashboard = () => {
                     {stats.salesGrowth >= 0 ? '+' : ''}{stats.salesGrowth}%
                   </Typography>
                   <Typography color="textSecondary" variant="caption">
-                    Since last month
+                    Last 30 days
                   </Typography>
                 </Box>
               </CardContent>
@@ -300,7 +236,7 @@ const Dashboard = () => {
                     {stats.ordersGrowth >= 0 ? '+' : ''}{stats.ordersGrowth}%
                   </Typography>
                   <Typography color="textSecondary" variant="caption">
-                    Since last month
+                    Last 30 days
                   </Typography>
                 </Box>
               </CardContent>
@@ -364,7 +300,7 @@ const Dashboard = () => {
                     <Typography color="textSecondary" gutterBottom variant="body2">
                       TOTAL CUSTOMERS
                     </Typography>
-                    <Typography variant="h4">{users ? users.length : 0}</Typography>
+                    <Typography variant="h4">{stats.totalCustomers}</Typography>
                   </Box>
                   <Avatar
                     sx={{
@@ -392,7 +328,7 @@ const Dashboard = () => {
                     {stats.customersGrowth >= 0 ? '+' : ''}{stats.customersGrowth}%
                   </Typography>
                   <Typography color="textSecondary" variant="caption">
-                    Since last month
+                    Last 30 days
                   </Typography>
                 </Box>
               </CardContent>
@@ -453,11 +389,11 @@ const Dashboard = () => {
                       <ListItem alignItems="flex-start">
                         <ListItemAvatar>
                           <Avatar sx={{ bgcolor: 'primary.main' }}>
-                            {order.id}
+                            {order.item_count}
                           </Avatar>
                         </ListItemAvatar>
                         <ListItemText
-                          primary={`Order #${order.id}`}
+                          primary={`Order ${order.order_number || `#${order.id}`} — ${order.customer_name}`}
                           secondary={
                             <React.Fragment>
                               <Typography
@@ -466,7 +402,7 @@ const Dashboard = () => {
                                 variant="body2"
                                 color="text.primary"
                               >
-                                ${(order.total_price || 0).toFixed(2)}
+                                ${parseFloat(order.total || 0).toFixed(2)}
                               </Typography>
                               {` — ${new Date(
                                 order.created_at
@@ -28,7 +28,8 @@ import {
   Alert,
 } from '@mui/material';
 import { format } from 'date-fns';
-import { getAllOrders, updateOrderStatus, updatePaymentReceived, resetOrderSuccess } from '../../features/order/orderSlice';
+import { getAllOrders, getOrderDetails, updateOrderStatus, updatePaymentReceived, resetOrderSuccess } from '../../features/order/orderSlice';
+import useOrderStream from '../../features/order/useOrderStream';
 import AdminLayout from '../../components/admin/AdminLayout';
 import { 
   getDisplayStatus, 
@@ -41,7 +42,8 @@ import {
 
 const Orders = () => {
   const dispatch = useDispatch();
-  const { orders, totalPages, success, updatingStatus } = useSelector((state) => state.order);
+  const { orders, order: orderDetails, totalPages, success, updatingStatus } = useSelector((state) => state.order);
+  useOrderStream();
 
   const [page, setPage] = useState(0);
   const [rowsPerPage, setRowsPerPage] = useState(10);
@@ -54,7 +56,7 @@ const Orders = () => {
   useEffect(() => {
     dispatch(getAllOrders({ 
       page: page + 1, 
-      limit: rowsPerPage,
+      page_size: rowsPerPage,
       status: statusFilter,
       order_id: orderIdFilter,
       _t: Date.now() // Cache busting
@@ -78,6 +80,8 @@ const Orders = () => {
   const handleOpenDialog = (order) => {
     setSelectedOrder(order);
     setOpenDialog(true);
+    // List rows carry no lines; fetch them for the dialog
+    dispatch(getOrderDetails(order.id));
   };
 
   const handleCloseDialog = () => {
@@ -193,11 +197,7 @@ const Orders = () => {
               {orders.map((order) => (
                 <TableRow key={order.id}>
                   <TableCell>{order.id}</TableCell>
-                  <TableCell>
-                    {order.user
-                      ? `${order.user.first_name} ${order.user.last_name}`
-                      : (order.guest_name || 'N/A')}
-                  </TableCell>
+                  <TableCell>{order.customer_name || 'N/A'}</TableCell>
                   <TableCell>
                     {format(new Date(order.created_at), 'MMM dd, yyyy')}
                   </TableCell>
@@ -217,7 +217,7 @@ const Orders = () => {
                     />
                   </TableCell>
                   <TableCell align="center">
-                    {order.order_items ? order.order_items.length : 0}
+                    {order.item_count ?? 0}
                   </TableCell>
                   <TableCell align="center">
                     <Button
@@ -254,14 +254,10 @@ const Orders = () => {
                 <Grid container spacing={2} sx={{ mt: 1 }}>
                   <Grid item xs={12} sm={6}>
                     <Typography variant="subtitle1">Customer Information</Typography>
-                    <Typography>
-                      {selectedOrder.user
-                        ? `${selectedOrder.user.first_name} ${selectedOrder.user.last_name}`
-                        : (selectedOrder.guest_name || 'N/A')}
-                    </Typography>
-                    <Typography>{selectedOrder.user?.email || selectedOrder.guest_email || 'N/A'}</Typography>
-                    {(selectedOrder.user?.phone || selectedOrder.guest_phone) && (
-                      <Typography>Phone: {selectedOrder.user?.phone || selectedOrder.guest_phone}</Typography>
+                    <Typography>{selectedOrder.customer_name || 'N/A'}</Typography>
+                    <Typography>{selectedOrder.customer_email || 'N/A'}</Typography>
+                    {orderDetails?.id === selectedOrder.id && orderDetails.guest_phone && (
+                      <Typography>Phone: {orderDetails.guest_phone}</Typography>
                     )}
                   </Grid>
                   <Grid item xs={12} sm={6}>
@@ -320,9 +316,9 @@ const Orders = () => {
                           </TableRow>
                         </TableHead>
                         <TableBody>
-                          {selectedOrder.order_items?.map((item) => (
+                          {(orderDetails?.id === selectedOrder.id ? orderDetails.items : []).map((item) => (
                             <TableRow key={item.id}>
-                              <TableCell>{item.perfume?.name || 'N/A'}</TableCell>
+                              <TableCell>{item.perfume_details?.name || 'N/A'}</TableCell>
                               <TableCell align="right">${item.price}</TableCell>
                               <TableCell align="right">{item.quantity}</TableCell>
                               <TableCell align="right">
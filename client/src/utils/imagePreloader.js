@@ -1,5 +1,17 @@
 // Mobile-optimized image preloader utility
 
+// URL of a media image resized by the server (/media/<path>?w=&h=&fmt=).
+// Keeps aspect ratio and never upscales; renders are cached server-side.
+export const getResizedImageUrl = (src, { width, height, format } = {}) => {
+  if (!src || !(width || height || format) || !src.includes('/media/')) return src;
+  const url = new URL(src, window.location.origin);
+  const ratio = window.devicePixelRatio || 1;
+  if (width) url.searchParams.set('w', Math.round(width * ratio));
+  if (height) url.searchParams.set('h', Math.round(height * ratio));
+  if (format) url.searchParams.set('fmt', format);
+  return url.toString();
+};
+
 class ImagePreloader {
   constructor() {
     this.cache = new Map();
@@ -7,9 +19,11 @@ class ImagePreloader {
     this.maxCacheSize = 50; // Limit cache size for mobile
   }
 
-  // Preload image with mobile optimizations
-  preloadImage(src, priority = 'low') {
+  // Preload image with mobile optimizations; `size` ({ width, height, format })
+  // fetches a server-resized copy instead of the original
+  preloadImage(src, priority = 'low', size) {
     if (!src) return Promise.resolve(null);
+    src = getResizedImageUrl(src, size);
     
     // Return cached promise if already loading
     if (this.loadingPromises.has(src)) {
@@ -68,9 +82,9 @@ class ImagePreloader {
   }
 
   // Preload multiple images with priority
-  preloadImages(sources, priority = 'low') {
+  preloadImages(sources, priority = 'low', size) {
     return Promise.allSettled(
-      sources.map(src => this.preloadImage(src, priority))
+      sources.map(src => this.preloadImage(src, priority, size))
     );
   }
 
@@ -90,8 +104,8 @@ class ImagePreloader {
 const imagePreloader = new ImagePreloader();
 
 // Utility functions
-export const preloadImage = (src, priority) => imagePreloader.preloadImage(src, priority);
-export const preloadImages = (sources, priority) => imagePreloader.preloadImages(sources, priority);
+export const preloadImage = (src, priority, size) => imagePreloader.preloadImage(src, priority, size);
+export const preloadImages = (sources, priority, size) => imagePreloader.preloadImages(sources, priority, size);
 export const clearImageCache = () => imagePreloader.clearCache();
 export const getImageCacheSize = () => imagePreloader.getCacheSize();
 
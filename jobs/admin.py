@@ -0,0 +1,19 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'max_attempts', 'run_after', 'duration_ms', 'created_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'last_error')
+    readonly_fields = ('locked_by', 'locked_at', 'wait_ms', 'duration_ms', 'created_at', 'finished_at', 'last_error')
+    actions = ['retry']
+    
+    @admin.action(description='Retry selected jobs now')
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f'{updated} job(s) queued')
@@ -0,0 +1,79 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import queue
+
+
+def work_in_child(index, options):
+    """Process body: one worker loop on its own database connection, stopped by SIGTERM"""
+    stop = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        queue.work(f'{queue.worker_name()}-{index}', options['batch'], options['burst'], options['poll'], stop.is_set)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the job table (jobs.queue.enqueue) in one or more worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes (1 runs jobs in this process)')
+        parser.add_argument('--batch', type=int, default=1, help='Jobs claimed per query')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+        parser.add_argument('--stats', action='store_true', help='Print per-task counts and timings, then exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        if options['processes'] <= 1:
+            try:
+                processed = queue.work(queue.worker_name(), options['batch'], options['burst'], options['poll'])
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(f'Ran {processed} job(s)')
+            return
+
+        # Children must not share the parent's connection
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=work_in_child, args=(index, options), name=f'job-worker-{index}')
+            for index in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f'Started {len(children)} worker processes')
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
+            for child in children:
+                child.join()
+
+    def print_stats(self):
+        rows = queue.stats()
+        if not rows:
+            self.stdout.write('No jobs')
+            return
+        self.stdout.write(
+            f'{"task":<48}{"queued":>8}{"running":>8}{"done":>8}{"failed":>8}{"avg ms":>10}{"max ms":>10}{"wait ms":>10}'
+        )
+        for row in rows:
+            timings = ''.join(
+                f'{row[key]:>10.1f}' if row[key] is not None else f'{"-":>10}'
+                for key in ('avg_duration_ms', 'max_duration_ms', 'avg_wait_ms')
+            )
+            self.stdout.write(
+                f'{row["task"]:<48}{row["queued"]:>8}{row["running"]:>8}{row["done"]:>8}{row["failed"]:>8}{timings}'
+            )
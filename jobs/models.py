@@ -0,0 +1,46 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """A call of `task` (a dotted path to a function) with `kwargs`, run by manage.py run_workers"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    
+    task = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # Not claimed before this time (enqueue delay, retry backoff)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    # Timing of the last attempt: time spent waiting once due, and running
+    wait_ms = models.FloatField(blank=True, null=True)
+    duration_ms = models.FloatField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The claim query: due jobs, oldest first
+            models.Index(fields=['run_after', 'id'], name='job_ready_idx',
+                         condition=models.Q(status='queued')),
+            models.Index(fields=['locked_at'], name='job_running_idx',
+                         condition=models.Q(status='running')),
+            models.Index(fields=['task', 'status'], name='job_task_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,202 @@
+"""
+Persistent job queue on the Job table, no broker needed.
+
+    enqueue(refresh_many, {'model': 'perfumes.perfumeimage', 'pks': [1, 2]})
+
+Jobs are inserted in the caller's transaction, so a job for rows that are
+rolled back is never run. Workers (manage.py run_workers) claim due jobs
+with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports it,
+so any number of them can poll the table without blocking one another; on
+SQLite each job is claimed with a conditional UPDATE instead. Failed runs
+are retried with exponential backoff until `max_attempts`, and a job whose
+worker died is requeued once its lease expires.
+
+A worker that merely ran past its lease (JOBS_LEASE) is not stopped, so
+the requeued job can run twice at the same time; only the holder of the
+current lease records the outcome. Task functions must therefore be
+idempotent: running one twice must leave the same result as running it once.
+
+Periodic tasks are listed in JOBS_PERIODIC ({dotted path: interval in
+seconds}); workers queue the next run of each one `interval` seconds after
+its last run finished.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task_path(func):
+    return func if isinstance(func, str) else f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, kwargs=None, *, delay=0, max_attempts=None):
+    """
+    Queue a call of `func` (a module-level function or its dotted path) with
+    JSON-serializable `kwargs`, due in `delay` seconds. Returns the Job.
+    """
+    return Job.objects.create(
+        task=task_path(func),
+        kwargs=kwargs or {},
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 5),
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker, limit=1):
+    """Mark up to `limit` due jobs as running for `worker` and return them, oldest first"""
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    start = {'status': Job.RUNNING, 'locked_by': worker, 'locked_at': now, 'attempts': F('attempts') + 1}
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            # Rows another worker holds are skipped rather than waited for
+            pks = list(ready.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Job.objects.filter(pk__in=pks).update(**start)
+    else:
+        # No row locks (SQLite): claim one by one, a job another worker took first updates nothing
+        pks = [
+            pk for pk in ready.values_list('pk', flat=True)[:limit]
+            if Job.objects.filter(pk=pk, status=Job.QUEUED).update(**start)
+        ]
+    return list(Job.objects.filter(pk__in=pks).order_by('run_after', 'id'))
+
+
+def backoff(attempts):
+    """Seconds before retry number `attempts`: JOBS_RETRY_BACKOFF doubled per attempt, capped"""
+    base = getattr(settings, 'JOBS_RETRY_BACKOFF', 10)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'JOBS_RETRY_BACKOFF_MAX', 3600))
+
+
+def finish(job, **outcome):
+    """
+    Record the outcome of a run if `job`'s worker still holds its lease; the
+    claim is identified by worker and attempt number, both set by claim().
+    Returns False when the lease was lost to requeue_stale().
+    """
+    held = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by, attempts=job.attempts
+    ).update(**outcome)
+    if not held:
+        logger.warning('Job %s %s: lease of %s lost, outcome of attempt %s discarded',
+                       job.pk, job.task, job.locked_by, job.attempts)
+    return bool(held)
+
+
+def run(job):
+    """Run a claimed job and record the outcome; returns True when it succeeded and the lease was still held"""
+    wait_ms = max((job.locked_at - job.run_after).total_seconds() * 1000, 0)
+    start = time.perf_counter()
+    try:
+        import_string(job.task)(**job.kwargs)
+    except Exception:
+        duration_ms = (time.perf_counter() - start) * 1000
+        error = traceback.format_exc()
+        outcome = {'last_error': error, 'wait_ms': wait_ms, 'duration_ms': duration_ms, 'locked_by': ''}
+        if job.attempts >= job.max_attempts:
+            outcome.update(status=Job.FAILED, finished_at=timezone.now())
+        else:
+            delay = backoff(job.attempts)
+            outcome.update(status=Job.QUEUED, run_after=timezone.now() + timedelta(seconds=delay))
+        if finish(job, **outcome):
+            if outcome['status'] == Job.FAILED:
+                logger.error('Job %s %s failed after %s attempts\n%s', job.pk, job.task, job.attempts, error)
+            else:
+                logger.warning('Job %s %s failed (attempt %s of %s), retrying in %ss',
+                               job.pk, job.task, job.attempts, job.max_attempts, delay)
+        return False
+    duration_ms = (time.perf_counter() - start) * 1000
+    if not finish(job, status=Job.DONE, finished_at=timezone.now(), wait_ms=wait_ms, duration_ms=duration_ms,
+                  last_error='', locked_by=''):
+        return False
+    logger.info('Job %s %s done in %.1f ms (waited %.1f ms)', job.pk, job.task, duration_ms, wait_ms)
+    return True
+
+
+def requeue_stale(lease=None):
+    """
+    Put back jobs left running longer than `lease` seconds (JOBS_LEASE by
+    default), i.e. whose worker died; a job that used its last attempt fails.
+    Returns the number of jobs touched.
+    """
+    lease = getattr(settings, 'JOBS_LEASE', 600) if lease is None else lease
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=lease))
+    error = f'Worker lease of {lease}s expired'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), last_error=error, locked_by=''
+    )
+    return failed + stale.update(status=Job.QUEUED, run_after=timezone.now(), last_error=error, locked_by='')
+
+
+def schedule_periodic(now=None):
+    """
+    Queue the next run of every JOBS_PERIODIC task that has none queued or
+    running, due `interval` seconds after its last run finished. Returns
+    the jobs queued.
+    """
+    now = now or timezone.now()
+    queued = []
+    for task, interval in getattr(settings, 'JOBS_PERIODIC', {}).items():
+        runs = Job.objects.filter(task=task)
+        if runs.filter(status__in=(Job.QUEUED, Job.RUNNING)).exists():
+            continue
+        last_run = runs.aggregate(last=Max('finished_at'))['last']
+        delay = (last_run + timedelta(seconds=interval) - now).total_seconds() if last_run else 0
+        queued.append(enqueue(task, delay=max(delay, 0)))
+    return queued
+
+
+def work(worker, batch=1, burst=False, poll=1.0, should_stop=lambda: False):
+    """
+    Worker loop: claim, run, repeat; sleeps `poll` seconds when idle and
+    returns once the queue is empty in `burst` mode. Returns the jobs run.
+    """
+    processed = 0
+    last_reap = 0.0
+    while not should_stop():
+        if time.monotonic() - last_reap > 60:
+            requeue_stale()
+            schedule_periodic()
+            last_reap = time.monotonic()
+        jobs = claim(worker, batch)
+        if not jobs:
+            if burst:
+                break
+            time.sleep(poll)
+            continue
+        for job in jobs:
+            run(job)
+            processed += 1
+    return processed
+
+
+def stats():
+    """Per task: job counts by status and timing of the last attempts, from one grouped query"""
+    return list(
+        Job.objects.order_by('task').values('task').annotate(
+            total=Count('id'),
+            queued=Count('id', filter=Q(status=Job.QUEUED)),
+            running=Count('id', filter=Q(status=Job.RUNNING)),
+            done=Count('id', filter=Q(status=Job.DONE)),
+            failed=Count('id', filter=Q(status=Job.FAILED)),
+            avg_duration_ms=Avg('duration_ms'),
+            max_duration_ms=Max('duration_ms'),
+            avg_wait_ms=Avg('wait_ms'),
+        )
+    )
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from perfumes.models import Brand, Category, Perfume, PerfumeImage
+from perfumes_project import images
+from .models import Job
+from . import queue
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+
+
+def explode(message):
+    raise RuntimeError(message)
+
+
+def tick():
+    CALLS.append('tick')
+
+
+@override_settings(JOBS_RETRY_BACKOFF=10, JOBS_RETRY_BACKOFF_MAX=60, JOBS_PERIODIC={})
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_enqueue_and_run(self):
+        job = queue.enqueue(record, {'value': 'first'})
+        queue.enqueue('jobs.tests.record', {'value': 'second'})
+        self.assertEqual((job.task, job.status), ('jobs.tests.record', Job.QUEUED))
+
+        self.assertEqual(queue.work('test-worker', burst=True), 2)
+        self.assertEqual(CALLS, ['first', 'second'])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.DONE, 1, ''))
+        self.assertIsNotNone(job.duration_ms)
+        self.assertIsNotNone(job.wait_ms)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claims_are_exclusive_and_due_only(self):
+        jobs = [queue.enqueue(record, {'value': n}) for n in range(3)]
+        later = queue.enqueue(record, {'value': 'later'}, delay=60)
+        first = queue.claim('worker-a', limit=2)
+        second = queue.claim('worker-b', limit=2)
+        self.assertEqual([job.pk for job in first], [jobs[0].pk, jobs[1].pk])
+        self.assertEqual([job.pk for job in second], [jobs[2].pk])
+        self.assertEqual(queue.claim('worker-c', limit=2), [])
+        self.assertEqual(second[0].locked_by, 'worker-b')
+        later.refresh_from_db()
+        self.assertEqual(later.status, Job.QUEUED)
+
+    def test_retries_with_backoff_then_fails(self):
+        job = queue.enqueue(explode, {'message': 'boom'}, max_attempts=3)
+        self.assertEqual(queue.work('test-worker', burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertAlmostEqual((job.run_after - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertEqual(queue.backoff(2), 20)
+        self.assertEqual(queue.backoff(10), 60)
+
+        for attempt in (2, 3):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            queue.work('test-worker', burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stale_jobs_are_requeued(self):
+        lost = queue.enqueue(record, {'value': 'lost'})
+        spent = queue.enqueue(record, {'value': 'spent'}, max_attempts=1)
+        queue.claim('dead-worker', limit=2)
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=30))
+        self.assertEqual(queue.requeue_stale(lease=600), 2)
+        lost.refresh_from_db()
+        spent.refresh_from_db()
+        self.assertEqual((lost.status, lost.attempts), (Job.QUEUED, 1))
+        self.assertEqual(spent.status, Job.FAILED)
+
+        queue.work('test-worker', burst=True)
+        self.assertEqual(CALLS, ['lost'])
+
+    def test_worker_that_lost_its_lease_records_nothing(self):
+        job = queue.enqueue(explode, {'message': 'late'})
+        [slow] = queue.claim('worker')
+        Job.objects.update(locked_at=timezone.now() - timedelta(minutes=30))
+        queue.requeue_stale(lease=600)
+        # Reclaimed under the same worker name: the attempt number tells the claims apart
+        [fast] = queue.claim('worker')
+        self.assertEqual((slow.attempts, fast.attempts), (1, 2))
+
+        with self.assertLogs('jobs.queue', 'WARNING') as logs:
+            self.assertFalse(queue.run(slow))
+        self.assertIn('lease of worker lost', logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.last_error), (Job.RUNNING, 'worker', 'Worker lease of 600s expired'))
+
+        fast.task, fast.kwargs = 'jobs.tests.record', {'value': 'fast'}
+        self.assertTrue(queue.run(fast))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        # The stale holder cannot overwrite the finished job either
+        slow.task, slow.kwargs = 'jobs.tests.record', {'value': 'slow'}
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertFalse(queue.run(slow))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    @override_settings(JOBS_PERIODIC={'jobs.tests.tick': 60})
+    def test_periodic_tasks_are_queued_after_the_last_run(self):
+        self.assertEqual(queue.work('test-worker', burst=True), 1)
+        self.assertEqual(CALLS, ['tick'])
+        # The next run is due an interval after the last one finished, and queued only once
+        [job] = queue.schedule_periodic()
+        last_run = Job.objects.get(status=Job.DONE)
+        self.assertAlmostEqual((job.run_after - last_run.finished_at).total_seconds(), 60, delta=1)
+        self.assertEqual(queue.schedule_periodic(), [])
+        self.assertEqual(queue.work('test-worker', burst=True), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(queue.work('test-worker', burst=True), 1)
+        self.assertEqual(CALLS, ['tick', 'tick'])
+
+    def test_stats(self):
+        queue.enqueue(record, {'value': 1})
+        queue.enqueue(explode, {'message': 'boom'}, max_attempts=1)
+        queue.work('test-worker', burst=True)
+        queue.enqueue(record, {'value': 2}, delay=60)
+        stats = {row['task']: row for row in queue.stats()}
+        self.assertEqual((stats['jobs.tests.record']['done'], stats['jobs.tests.record']['queued']), (1, 1))
+        self.assertEqual(stats['jobs.tests.explode']['failed'], 1)
+
+        out = StringIO()
+        call_command('run_workers', '--stats', stdout=out)
+        self.assertIn('jobs.tests.record', out.getvalue())
+        out = StringIO()
+        call_command('run_workers', '--burst', stdout=out)
+        self.assertIn('Ran 0 job(s)', out.getvalue())
+
+    def test_upload_derivatives_are_built_inline_by_default(self):
+        category = Category.objects.create(name='Men', slug='men')
+        brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+        perfume = Perfume.objects.create(name='Oud Wood', brand=brand, category=category, price=250, stock=1)
+        image = PerfumeImage.objects.bulk_create([PerfumeImage(perfume=perfume, image='perfumes/missing.jpg')])[0]
+        # No worker runs unless one is configured, so nothing may be left in the queue
+        with self.assertLogs('perfumes_project.images', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                images.schedule_derivatives(PerfumeImage, [image.pk])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(IMAGE_DERIVATIVES_IN_BACKGROUND=True)
+    def test_upload_derivatives_are_queued(self):
+        category = Category.objects.create(name='Men', slug='men')
+        brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+        perfume = Perfume.objects.create(name='Oud Wood', brand=brand, category=category, price=250, stock=1)
+        image = PerfumeImage.objects.bulk_create([PerfumeImage(perfume=perfume, image='perfumes/missing.jpg')])[0]
+        images.schedule_derivatives(PerfumeImage, [image.pk])
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.kwargs),
+                         ('perfumes_project.images.refresh_job', {'model': 'perfumes.perfumeimage', 'pks': [image.pk]}))
+        # A missing file is logged and skipped, not retried
+        with self.assertLogs('perfumes_project.images', 'WARNING'):
+            queue.work('test-worker', burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
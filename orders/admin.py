@@ -1,6 +1,8 @@
+from django import forms
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Order, OrderItem, Cart, CartItem
+from .models import Order, OrderEvent, OrderItem, Cart, CartItem, ShippingRate, TaxRate
+from .state_machine import IllegalTransition, can_transition, transition
 
 
 class OrderItemInline(admin.TabularInline):
@@ -14,8 +16,23 @@ class OrderItemInline(admin.TabularInline):
     total.short_description = 'Total'
 
 
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = '__all__'
+    
+    def clean_status(self):
+        target = self.cleaned_data['status']
+        if self.instance.pk:
+            current = self.instance.get_original_value('status')
+            if not can_transition(current, target):
+                raise forms.ValidationError(str(IllegalTransition(current, target)))
+        return target
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    form = OrderAdminForm
     list_display = (
         'order_number', 'user_display', 'status', 'payment_method', 
         'payment_status_display', 'total', 'created_at'
@@ -56,6 +73,17 @@ class OrderAdmin(admin.ModelAdmin):
     
     actions = ['mark_payment_paid', 'mark_payment_unpaid']
     
+    def save_model(self, request, obj, form, change):
+        # Existing orders only write the columns that were edited; a status
+        # edit runs through the state machine so its inventory effect applies
+        if change:
+            target = obj.status
+            obj.status = obj.get_original_value('status')
+            obj.save_changes()
+            transition(obj, target)
+        else:
+            obj.save()
+    
     def user_display(self, obj):
         if obj.user:
             return f"{obj.user.first_name} {obj.user.last_name}"
@@ -73,7 +101,7 @@ class OrderAdmin(admin.ModelAdmin):
     payment_status_display.short_description = 'Payment Status'
     
     def mark_payment_paid(self, request, queryset):
-        updated = queryset.update(payment_status=True)
+        updated = queryset.set_payment_status(True)
         self.message_user(
             request, 
             f'{updated} order(s) marked as paid.'
@@ -81,7 +109,7 @@ class OrderAdmin(admin.ModelAdmin):
     mark_payment_paid.short_description = "Mark selected orders as paid"
     
     def mark_payment_unpaid(self, request, queryset):
-        updated = queryset.update(payment_status=False)
+        updated = queryset.set_payment_status(False)
         self.message_user(
             request, 
             f'{updated} order(s) marked as unpaid.'
@@ -129,4 +157,32 @@ class CartItemAdmin(admin.ModelAdmin):
     
     def total(self, obj):
         return obj.total
-    total.short_description = 'Total'
\ No newline at end of file
+    total.short_description = 'Total'
+
+@admin.register(ShippingRate)
+class ShippingRateAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'province', 'fee', 'free_over')
+    list_editable = ('fee', 'free_over')
+    search_fields = ('province',)
+
+
+@admin.register(TaxRate)
+class TaxRateAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'province', 'rate')
+    list_editable = ('rate',)
+    search_fields = ('province',)
+
+
+@admin.register(OrderEvent)
+class OrderEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'kind', 'user', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('order__order_number',)
+    list_select_related = ('order', 'user')
+    readonly_fields = ('order', 'user', 'kind', 'payload', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
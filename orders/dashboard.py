@@ -0,0 +1,105 @@
+"""Admin dashboard figures, aggregated in the database instead of in the browser"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Order
+
+User = get_user_model()
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 365
+RECENT_ORDERS = 5
+ZERO = Decimal('0.00')
+
+
+def _money(field, **filters):
+    condition = Q(**filters) if filters else None
+    return Coalesce(
+        Sum(field, filter=condition), Value(ZERO),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+def _growth(current, previous):
+    """Percent change between two periods, None without a previous figure"""
+    if not previous:
+        return None
+    return round(float((current - previous) * 100 / previous), 1)
+
+
+def order_stats(days):
+    """
+    Counts by status and payment state, revenue, and the current vs previous
+    `days`-long period, from one grouped query (one row per status/payment pair).
+    Revenue leaves cancelled orders out; amounts are strings, as in the order serializers.
+    """
+    now = timezone.now()
+    current_start, previous_start = now - timedelta(days=days), now - timedelta(days=2 * days)
+    current = Q(created_at__gte=current_start)
+    previous = Q(created_at__gte=previous_start, created_at__lt=current_start)
+    rows = Order.objects.order_by().values('status', 'payment_status').annotate(
+        count=Count('id'),
+        revenue=_money('total'),
+        current_count=Count('id', filter=current),
+        current_revenue=_money('total', created_at__gte=current_start),
+        previous_count=Count('id', filter=previous),
+        previous_revenue=_money('total', created_at__gte=previous_start, created_at__lt=current_start),
+    )
+
+    by_status = {code: 0 for code, _ in Order.STATUS_CHOICES}
+    by_payment = {'paid': 0, 'unpaid': 0}
+    totals = dict.fromkeys(('count', 'current_count', 'previous_count'), 0)
+    revenue = dict.fromkeys(('total', 'paid', 'outstanding', 'current', 'previous'), ZERO)
+    for row in rows:
+        by_status[row['status']] += row['count']
+        by_payment['paid' if row['payment_status'] else 'unpaid'] += row['count']
+        for key in totals:
+            totals[key] += row[key]
+        if row['status'] == 'X':
+            continue
+        revenue['total'] += row['revenue']
+        revenue['paid' if row['payment_status'] else 'outstanding'] += row['revenue']
+        revenue['current'] += row['current_revenue']
+        revenue['previous'] += row['previous_revenue']
+
+    return {
+        'total': totals['count'],
+        'by_status': by_status,
+        'by_payment': by_payment,
+        'revenue': {
+            'total': str(revenue['total']),
+            'paid': str(revenue['paid']),
+            'outstanding': str(revenue['outstanding']),
+        },
+        'period': {
+            'days': days,
+            'orders': totals['current_count'],
+            'previous_orders': totals['previous_count'],
+            'orders_growth': _growth(totals['current_count'], totals['previous_count']),
+            'revenue': str(revenue['current']),
+            'previous_revenue': str(revenue['previous']),
+            'revenue_growth': _growth(revenue['current'], revenue['previous']),
+        },
+    }
+
+
+def customer_stats(days):
+    """Customer accounts (staff excluded), with sign-ups in the current and previous period, in one query"""
+    now = timezone.now()
+    current_start, previous_start = now - timedelta(days=days), now - timedelta(days=2 * days)
+    stats = User.objects.filter(is_staff=False).aggregate(
+        total=Count('id'),
+        new=Count('id', filter=Q(date_joined__gte=current_start)),
+        previous_new=Count('id', filter=Q(date_joined__gte=previous_start, date_joined__lt=current_start)),
+    )
+    stats['growth'] = _growth(stats['new'], stats['previous_new'])
+    return stats
+
+
+def recent_orders(limit=RECENT_ORDERS):
+    return Order.objects.for_list().order_by('-created_at')[:limit]
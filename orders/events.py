@@ -0,0 +1,233 @@
+"""
+Live order updates over Server-Sent Events (``GET /api/orders/stream/``).
+
+Changes are read from the OrderEvent outbox, so only committed changes are
+published. One poller per event loop reads the outbox every
+ORDER_EVENTS_POLL_INTERVAL seconds and hands each event to the open streams
+allowed to see it (the order's customer, every staff member); an idle
+stream costs no queries, only a heartbeat comment now and then. Serve the
+project over ASGI so each stream is a coroutine rather than a worker.
+
+The poller looks back ORDER_EVENTS_LOOKBACK seconds on every read, so an
+event whose transaction commits after one with a higher id is still
+delivered. Clients resume after a reconnect from the Last-Event-ID header
+(EventSource sends it, or ``?last_event_id=`` when reconnecting by hand).
+
+EventSource cannot set headers, so browsers authenticate with
+``?ticket=``: a signed ticket from ``POST /api/orders/stream_ticket/``
+that opens one stream within ORDER_EVENTS_TICKET_MAX_AGE seconds. An
+access token in the URL would end up in proxy and access logs; a ticket
+there is useless by the time anyone reads them. Other clients may send the
+access token in the Authorization header instead.
+
+Outbox rows are kept ORDER_EVENTS_RETENTION seconds, long enough for any
+reconnect to replay what it missed, and deleted by prune_events, a periodic
+job (JOBS_PERIODIC).
+"""
+import asyncio
+import json
+import secrets
+import time
+import weakref
+from collections import deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .models import OrderEvent
+
+EVENT_FIELDS = ('id', 'user_id', 'kind', 'payload', 'created_at')
+TICKET_SALT = 'orders.events.stream'
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def format_event(event):
+    data = json.dumps({'kind': event['kind'], **event['payload']}, separators=(',', ':'))
+    return f'id: {event["id"]}\nevent: order\ndata: {data}\n\n'
+
+
+class Subscriber:
+    def __init__(self, user_id, is_staff):
+        self.user_id = user_id
+        self.is_staff = is_staff
+        self.queue = asyncio.Queue(maxsize=setting('ORDER_EVENTS_QUEUE_SIZE', 1000))
+
+    def wants(self, event):
+        return self.is_staff or event['user_id'] == self.user_id
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client drops events rather than memory; it catches up on reconnect
+            pass
+
+
+class EventHub:
+    """Fans outbox rows out to the subscribers of one event loop; polls only while someone listens"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+        # Ids delivered within the lookback window, so re-read rows are not sent twice
+        self.seen = {}
+
+    def subscribe(self, user_id, is_staff):
+        subscriber = Subscriber(user_id, is_staff)
+        self.subscribers.add(subscriber)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.poll())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def poll(self):
+        interval = setting('ORDER_EVENTS_POLL_INTERVAL', 1.0)
+        lookback = timedelta(seconds=setting('ORDER_EVENTS_LOOKBACK', 5))
+        # Only changes made from now on: earlier ones are each stream's replay
+        since = timezone.now()
+        try:
+            while self.subscribers:
+                now = timezone.now()
+                events = [
+                    event async for event in OrderEvent.objects.filter(
+                        created_at__gte=max(since, now - lookback)
+                    ).order_by('id').values(*EVENT_FIELDS)
+                ]
+                for event in events:
+                    if event['id'] in self.seen:
+                        continue
+                    self.seen[event['id']] = event['created_at']
+                    for subscriber in list(self.subscribers):
+                        if subscriber.wants(event):
+                            subscriber.deliver(event)
+                self.seen = {pk: created for pk, created in self.seen.items() if created >= now - lookback}
+                await asyncio.sleep(interval)
+        finally:
+            self.task = None
+            self.seen = {}
+
+
+_hubs = weakref.WeakKeyDictionary()
+
+
+def get_hub():
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = EventHub()
+    return hub
+
+
+def prune_events(retention=None):
+    """Delete outbox rows older than `retention` seconds (ORDER_EVENTS_RETENTION). Returns the count."""
+    retention = setting('ORDER_EVENTS_RETENTION', 24 * 60 * 60) if retention is None else retention
+    deleted, _ = OrderEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=retention)).delete()
+    return deleted
+
+
+async def replay(user, after):
+    """Events after id `after` the user may see, oldest first (at most ORDER_EVENTS_REPLAY)"""
+    events = OrderEvent.objects.filter(id__gt=after)
+    if not user.is_staff:
+        events = events.filter(user=user)
+    limit = setting('ORDER_EVENTS_REPLAY', 100)
+    return [event async for event in events.order_by('id').values(*EVENT_FIELDS)[:limit]]
+
+
+async def event_stream(user, last_event_id):
+    hub = get_hub()
+    # Subscribe before replaying, so nothing committed in between is lost
+    subscriber = hub.subscribe(user.pk, user.is_staff)
+    heartbeat = setting('ORDER_EVENTS_HEARTBEAT', 15)
+    deadline = time.monotonic() + setting('ORDER_EVENTS_MAX_AGE', 300)
+    sent = deque(maxlen=1000)
+    try:
+        yield f'retry: {setting("ORDER_EVENTS_RETRY_MS", 3000)}\n\n'
+        if last_event_id is not None:
+            for event in await replay(user, last_event_id):
+                sent.append(event['id'])
+                yield format_event(event)
+        # Streams end after ORDER_EVENTS_MAX_AGE; EventSource reconnects with Last-Event-ID
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if event['id'] in sent or (last_event_id is not None and event['id'] <= last_event_id):
+                continue
+            sent.append(event['id'])
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+def issue_ticket(user):
+    """A ticket that opens one of `user`'s streams within ORDER_EVENTS_TICKET_MAX_AGE seconds"""
+    return signing.dumps({'user': user.pk, 'nonce': secrets.token_urlsafe(12)}, salt=TICKET_SALT)
+
+
+async def redeem_ticket(ticket):
+    """User of a valid, unexpired and unused ticket, else None"""
+    max_age = setting('ORDER_EVENTS_TICKET_MAX_AGE', 30)
+    try:
+        claims = signing.loads(ticket, salt=TICKET_SALT, max_age=max_age)
+    except signing.BadSignature:
+        return None
+    # Single use: only the first redemption records the nonce (across processes with a shared cache)
+    if not await cache.aadd(f'orders:stream-ticket:{claims["nonce"]}', True, max_age):
+        return None
+    return await get_user_model().objects.filter(pk=claims['user']).afirst()
+
+
+async def authenticate(request):
+    """User of the ?ticket= or of the access token in the Authorization header, None when missing or invalid"""
+    ticket = request.GET.get('ticket')
+    if ticket:
+        return await redeem_ticket(ticket)
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+        return await sync_to_async(authentication.get_user)(token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def parse_last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def order_stream(request):
+    """Server-Sent Events of the user's order changes (every order's for staff)"""
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user = await authenticate(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    response = StreamingHttpResponse(event_stream(user, parse_last_event_id(request)),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Let nginx pass events through as they are written
+    response['X-Accel-Buffering'] = 'no'
+    return response
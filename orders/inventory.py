@@ -0,0 +1,70 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from django.utils import timezone
+
+from perfumes.cache import bump_catalog_version
+from perfumes.models import Perfume
+
+
+class InsufficientStock(Exception):
+    """Raised when a conditional stock decrement does not match every requested perfume"""
+
+    def __init__(self, perfume_id, quantity):
+        self.perfume_id = perfume_id
+        self.quantity = quantity
+        super().__init__(f'Insufficient stock for perfume {perfume_id} (requested {quantity})')
+
+
+def lock_perfumes(perfume_ids):
+    """
+    Fetch the active perfumes of an order in one query, locking their rows (in
+    id order, so concurrent checkouts cannot deadlock) until the transaction
+    ends. Inactive perfumes are left out, as in pricing.load_perfumes().
+    """
+    return Perfume.objects.filter(is_active=True).select_for_update().order_by('pk').in_bulk(perfume_ids)
+
+
+def reserve_stock_many(quantities):
+    """
+    Take stock for several perfumes in a single UPDATE:
+
+        UPDATE perfume SET stock = CASE id WHEN a THEN stock - n ... END
+        WHERE (id = a AND stock >= n) OR ...
+
+    Every line must match or InsufficientStock is raised, so call inside
+    transaction.atomic() and let the exception roll back the partial update.
+    """
+    quantities = {perfume_id: quantity for perfume_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+
+    condition = reduce(or_, (Q(pk=perfume_id, stock__gte=quantity) for perfume_id, quantity in quantities.items()))
+    try:
+        # Savepoint, so a partial match is undone before we look for the culprit
+        with transaction.atomic():
+            updated = Perfume.objects.filter(condition).update(
+                stock=Case(
+                    *(When(pk=perfume_id, then=F('stock') - quantity) for perfume_id, quantity in quantities.items()),
+                    default=F('stock'),
+                    output_field=PositiveIntegerField(),
+                ),
+                updated_at=timezone.now(),
+            )
+            if updated != len(quantities):
+                raise InsufficientStock(None, None)
+    except InsufficientStock:
+        available = dict(Perfume.objects.filter(pk__in=quantities).values_list('pk', 'stock'))
+        for perfume_id, quantity in quantities.items():
+            if available.get(perfume_id, 0) < quantity:
+                raise InsufficientStock(perfume_id, quantity)
+        raise
+    # update() sends no signals, so invalidate cached catalog responses ourselves
+    transaction.on_commit(bump_catalog_version)
+
+
+def reserve_stock(perfume_id, quantity):
+    """Take `quantity` units of one perfume (``SET stock = stock - n WHERE stock >= n``)"""
+    reserve_stock_many({perfume_id: quantity})
@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from orders.models import Cart, CartItem
+from orders.views import CartViewSet
+from perfumes.models import Brand, Category, Perfume, PerfumeImage
+from perfumes_project.benchmarks import rolled_back, timed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare cart payload size and serialization time of the line summary and ?expand=perfume (synthetic data, rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=30, help='Cart lines')
+        parser.add_argument('--images', type=int, default=4, help='Gallery images per perfume')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run(options['lines'], options['images'], options['repeat'])
+
+    def _run(self, lines, images, repeat):
+        user = User.objects.create_user(email='cart-benchmark@example.com', password='benchmark')
+        brand = Brand.objects.create(name='Benchmark Brand', slug='benchmark-brand')
+        category = Category.objects.create(name='Benchmark Category', slug='benchmark-category')
+        perfumes = Perfume.objects.bulk_create([
+            Perfume(
+                name=f'Benchmark {i}', slug=f'benchmark-{i}', brand=brand, category=category,
+                description='Notes of oud, amber and rose. ' * 40,
+                price=Decimal('120.00'), discount_price=Decimal('99.00') if i % 2 else None,
+                stock=50, image=f'perfumes/benchmark-{i}.jpg'
+            )
+            for i in range(lines)
+        ])
+        PerfumeImage.objects.bulk_create([
+            PerfumeImage(perfume=perfume, image=f'perfumes/gallery/benchmark-{perfume.pk}-{n}.jpg')
+            for perfume in perfumes for n in range(images)
+        ])
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, perfume=perfume, quantity=1) for perfume in perfumes])
+
+        view = CartViewSet.as_view({'get': 'my_cart'})
+        factory = APIRequestFactory(HTTP_HOST='localhost')
+
+        def fetch(params):
+            request = factory.get('/api/orders/cart/my_cart/', params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            assert response.status_code == 200, response.status_code
+            return response
+
+        self.stdout.write(f'Cart with {lines} lines, {images} gallery images per perfume:')
+        self.stdout.write(f'{"representation":<22}{"bytes":>10}{"queries":>10}{"median ms":>12}')
+        for label, params in (('summary (default)', {}), ('?expand=perfume', {'expand': 'perfume'})):
+            with CaptureQueriesContext(connection) as context:
+                size = len(fetch(params).content)
+            median, _ = timed(lambda: fetch(params), repeat)
+            self.stdout.write(f'{label:<22}{size:>10}{len(context.captured_queries):>10}{median:>12.1f}')
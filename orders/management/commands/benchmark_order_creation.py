@@ -0,0 +1,49 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from orders.serializers import GuestOrderCreateSerializer
+from perfumes.models import Brand, Category, Perfume
+from perfumes_project.benchmarks import rolled_back
+
+
+class Command(BaseCommand):
+    help = 'Measure queries and latency of guest order creation as the cart grows (synthetic data, rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,5,10,20,50', help='Comma separated cart sizes')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        with rolled_back():
+            self._run(sizes)
+
+    def _run(self, sizes):
+        brand = Brand.objects.create(name='Benchmark Brand', slug='benchmark-brand')
+        category = Category.objects.create(name='Benchmark Category', slug='benchmark-category')
+        perfumes = Perfume.objects.bulk_create([
+            Perfume(
+                name=f'Benchmark {i}', slug=f'benchmark-{i}', brand=brand, category=category,
+                description='', price=Decimal('50.00'), stock=10000, image='perfumes/bench.jpg'
+            )
+            for i in range(max(sizes))
+        ])
+
+        self.stdout.write(f'{"cart lines":>10}{"queries":>10}{"ms":>10}')
+        for size in sizes:
+            serializer = GuestOrderCreateSerializer(data={
+                'payment_method': 'cash_on_delivery',
+                'subtotal': '0.00', 'tax': '0.00', 'shipping': '0.00', 'total': '0.00',
+                'guest_name': 'Benchmark', 'guest_email': 'bench@example.com', 'guest_phone': '0',
+                'guest_address': 'Street', 'guest_city': 'Kigali', 'guest_province': 'Kigali',
+                'cart_items': [{'perfume': {'id': perfume.id}, 'quantity': 1} for perfume in perfumes[:size]],
+            })
+            serializer.is_valid(raise_exception=True)
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                serializer.save()
+                elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(f'{size:>10}{len(context.captured_queries):>10}{elapsed:>10.1f}')
@@ -0,0 +1,73 @@
+from decimal import Decimal
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from orders.models import Order
+from orders.views import OrderViewSet
+from perfumes_project.benchmarks import rolled_back, timed
+from perfumes_project.pagination import CreatedAtCursorPagination
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare deep-page latency of page-number and cursor pagination on the orders list (synthetic data, rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=20000, help='Number of synthetic orders')
+        parser.add_argument('--page', type=int, default=1000, help='Page to fetch')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._run(options['orders'], options['page'], options['repeat'])
+
+    def _run(self, order_count, page, repeat):
+        self.stdout.write(f'Creating {order_count} synthetic orders...')
+        admin = User.objects.create_user(
+            email='pagination-benchmark@example.com',
+            password='benchmark',
+            is_staff=True
+        )
+        Order.objects.bulk_create([
+            Order(
+                user=admin,
+                order_number=f'BENCH-{i:08d}',
+                payment_method='mobile_money',
+                subtotal=Decimal('100.00'),
+                tax=Decimal('10.00'),
+                shipping=Decimal('0.00'),
+                total=Decimal('110.00'),
+            )
+            for i in range(order_count)
+        ], batch_size=1000)
+
+        view = OrderViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory(HTTP_HOST='localhost')
+        page_size = CreatedAtCursorPagination.page_size
+
+        def fetch(params):
+            request = factory.get('/api/orders/', params)
+            force_authenticate(request, user=admin)
+            response = view(request)
+            response.render()
+            assert response.status_code == 200, response.status_code
+
+        # The cursor a client would hold after following `next` links up to
+        # the requested page: positioned on the last row of the previous page
+        previous = Order.objects.order_by('-created_at', 'id')[(page - 1) * page_size - 1]
+        paginator = CreatedAtCursorPagination()
+        paginator.base_url = '/api/orders/'
+        next_url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=str(previous.created_at)))
+        cursor = parse_qs(urlparse(next_url).query)['cursor'][0]
+
+        page_median, page_best = timed(lambda: fetch({'page': page}), repeat)
+        cursor_median, cursor_best = timed(lambda: fetch({'cursor': cursor}), repeat)
+
+        self.stdout.write(f'Page {page} of {order_count} orders ({page_size} per page):')
+        self.stdout.write(f'  page-number: median {page_median:.1f} ms, best {page_best:.1f} ms')
+        self.stdout.write(f'  cursor:      median {cursor_median:.1f} ms, best {cursor_best:.1f} ms')
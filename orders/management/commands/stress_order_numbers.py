@@ -0,0 +1,60 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from orders.models import Order
+
+STRESS_EMAIL = 'order-number-stress@example.com'
+
+
+def create_orders(count):
+    """Worker body: create `count` guest orders and return their numbers"""
+    connections.close_all()
+    numbers = []
+    for _ in range(count):
+        while True:
+            try:
+                order = Order.objects.create(
+                    payment_method='cash_on_delivery',
+                    subtotal='0.00', tax='0.00', shipping='0.00', total='0.00',
+                    guest_name='Stress', guest_email=STRESS_EMAIL,
+                )
+                numbers.append(order.order_number)
+                break
+            except OperationalError:
+                # SQLite reports lock contention instead of waiting
+                time.sleep(0.001)
+    connections.close_all()
+    return numbers
+
+
+class Command(BaseCommand):
+    help = 'Create orders from several processes at once and check every order number is unique (cleans up after itself)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=500, help='Orders per process')
+        parser.add_argument('--keep', action='store_true', help='Do not delete the generated orders')
+
+    def handle(self, *args, **options):
+        processes, per_process = options['processes'], options['orders']
+        connections.close_all()
+        start = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            results = pool.map(create_orders, [per_process] * processes)
+        elapsed = time.perf_counter() - start
+
+        numbers = [number for batch in results for number in batch]
+        stored = Order.objects.filter(guest_email=STRESS_EMAIL)
+        distinct = stored.values('order_number').distinct().count()
+        self.stdout.write(
+            f'{len(numbers)} orders from {processes} processes in {elapsed:.2f}s '
+            f'({len(numbers) / elapsed:.0f} orders/s), {len(set(numbers))} distinct numbers'
+        )
+        if not options['keep']:
+            stored.delete()
+        if len(set(numbers)) != len(numbers) or distinct != len(numbers):
+            raise CommandError('Duplicate order numbers were issued')
+        self.stdout.write(self.style.SUCCESS('All order numbers unique'))
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:55
+
+from django.db import migrations, models
+from django.db.models import Max
+
+# Frozen copies of orders.numbering.SEQUENCE_NAME / BLOCK_SIZE
+SEQUENCE_NAME = 'orders_order_number_seq'
+BLOCK_SIZE = 50
+
+
+def first_free_number(Order):
+    """Continue after both the old id-based numbers and any ORD-nnnnnn already issued"""
+    highest = Order.objects.aggregate(highest=Max('id'))['highest'] or 0
+    for order_number in Order.objects.filter(order_number__startswith='ORD-').values_list('order_number', flat=True):
+        suffix = order_number[4:]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest + 1
+
+
+def create_sequence(apps, schema_editor):
+    start = first_free_number(apps.get_model('orders', 'Order'))
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE_NAME} INCREMENT BY {BLOCK_SIZE} START WITH {start}'
+        )
+    else:
+        OrderNumberSequence = apps.get_model('orders', 'OrderNumberSequence')
+        OrderNumberSequence.objects.update_or_create(name=SEQUENCE_NAME, defaults={'next_value': start})
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_number_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShippingRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('province', models.CharField(blank=True, max_length=100, unique=True)),
+                ('fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('free_over', models.DecimalField(blank=True, decimal_places=2, help_text='Subtotal from which delivery is free', max_digits=10, null=True)),
+            ],
+            options={
+                'ordering': ['province'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('province', models.CharField(blank=True, max_length=100, unique=True)),
+                ('rate', models.DecimalField(decimal_places=4, help_text='0.1000 for 10%', max_digits=5)),
+            ],
+            options={
+                'ordering': ['province'],
+            },
+        ),
+    ]
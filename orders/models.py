@@ -1,9 +1,82 @@
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import Count, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, NullIf
 from django.contrib.auth import get_user_model
-from perfumes.models import Perfume
+from django.utils import timezone
+from perfumes.models import Perfume, PerfumeImage
+from .numbering import next_order_number
 
 User = get_user_model()
 
+
+def with_perfume(queryset, detail=False):
+    """
+    Line queryset with the perfume relations the serializers read: just the
+    brand for the summary, category and images too with `detail`
+    """
+    queryset = queryset.defer('perfume__search_vector').order_by('id')
+    if not detail:
+        return queryset.select_related('perfume__brand')
+    return queryset.select_related('perfume__brand', 'perfume__category').prefetch_related(
+        models.Prefetch('perfume__images', queryset=PerfumeImage.objects.all())
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+    def for_list(self, fields=None):
+        """
+        Table rows: line count and customer name/email computed in SQL, so a
+        page of orders is one query whatever it contains. `fields` limits the
+        annotations to the ones rendered.
+        """
+        line_count = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+            count=Count('pk')
+        ).values('count')
+        annotations = {
+            'item_count': Coalesce(Subquery(line_count), Value(0)),
+            # Registered customers by name (email when the name is blank), guests by the name they gave
+            'customer_name': Coalesce(
+                NullIf(Concat('user__first_name', Value(' '), 'user__last_name'), Value(' ')),
+                'guest_name', 'user__email', Value(''),
+                output_field=models.CharField()
+            ),
+            'customer_email': Coalesce('user__email', 'guest_email', Value(''), output_field=models.CharField()),
+        }
+        if fields is not None:
+            annotations = {name: value for name, value in annotations.items() if name in fields}
+        return self.annotate(**annotations)
+
+    def for_detail(self, detail=False):
+        """Addresses joined and lines prefetched with their perfumes (full catalog data with `detail`)"""
+        return self.select_related('shipping_address', 'billing_address').prefetch_related(
+            models.Prefetch('items', queryset=with_perfume(OrderItem.objects.all(), detail))
+        )
+
+    def set_payment_status(self, paid):
+        """
+        Mark the orders paid or unpaid in one UPDATE, which skips save(): the
+        OrderEvent of every order that actually changes is inserted in the
+        same transaction. Returns the number of orders changed.
+        """
+        now = timezone.now()
+        pks = list(self.exclude(payment_status=paid).values_list('pk', flat=True))
+        with transaction.atomic():
+            # Locked on their own rows, whatever joins the caller's queryset has
+            orders = list(
+                Order.objects.filter(pk__in=pks).exclude(payment_status=paid).select_for_update()
+                .only('id', 'order_number', 'user', 'status', 'payment_status', 'total', 'updated_at')
+            )
+            if not orders:
+                return 0
+            Order.objects.filter(pk__in=[order.pk for order in orders]).update(payment_status=paid, updated_at=now)
+            OrderEvent.objects.bulk_create([
+                OrderEvent.build(order, OrderEvent.UPDATED, ['payment_status'], payment_status=paid, updated_at=now)
+                for order in orders
+            ])
+        return len(orders)
+
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('P', 'Pending'),
@@ -50,59 +123,100 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = OrderQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            models.Index(fields=['-created_at'], name='order_paid_created_idx',
+                         condition=models.Q(payment_status=True)),
+            models.Index(fields=['-created_at'], name='order_unpaid_created_idx',
+                         condition=models.Q(payment_status=False)),
+        ]
     
     def __str__(self):
         return f"Order {self.order_number}"
     
+    # Per-instance snapshot of loaded values; replaced, never mutated in place
+    _loaded_values = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot(fields)
+
+    def _snapshot(self, fields=None):
+        """Remember the loaded value of every (non-deferred) concrete field"""
+        loaded = dict(self._loaded_values)
+        deferred = self.get_deferred_fields()
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred or (fields is not None and field.name not in fields and field.attname not in fields):
+                continue
+            loaded[field.attname] = getattr(self, field.attname)
+        self._loaded_values = loaded
+
+    def get_original_value(self, field_name):
+        """Value of a field as last loaded from or saved to the database (KeyError if unknown)"""
+        return self._loaded_values[self._meta.get_field(field_name).attname]
+
+    def has_changed(self, field_name):
+        attname = self._meta.get_field(field_name).attname
+        loaded = self._loaded_values
+        return attname not in loaded or loaded[attname] != getattr(self, attname)
+
+    @property
+    def changed_fields(self):
+        """Names of concrete fields whose value differs from the loaded snapshot"""
+        loaded = self._loaded_values
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname in loaded and loaded[field.attname] != getattr(self, field.attname)
+        ]
+
+    def save_changes(self):
+        """Write only the modified columns (plus updated_at); no-op when nothing changed"""
+        changed = self.changed_fields
+        if changed:
+            self.save(update_fields=[*changed, 'updated_at'])
+        return changed
+
     def save(self, *args, **kwargs):
-        # Check if this is an existing order and status is changing to delivered
-        is_status_change_to_delivered = False
-        if self.pk:
-            try:
-                old_order = Order.objects.get(pk=self.pk)
-                if old_order.status != 'D' and self.status == 'D':
-                    is_status_change_to_delivered = True
-            except Order.DoesNotExist:
-                pass
-        
+        # Status changes go through orders.state_machine.transition(), which
+        # checks the move and applies its inventory effect
+        update_fields = kwargs.get('update_fields')
+        if (not self._state.adding and self.has_changed('status')
+                and (update_fields is None or 'status' in update_fields)):
+            raise ValueError(
+                f'Order {self.pk}: status cannot be changed by save(); use orders.state_machine.transition()'
+            )
         if not self.order_number:
-            # Generate a unique order number
-            last_order = Order.objects.order_by('-id').first()
-            if last_order:
-                order_number = f"ORD-{last_order.id + 1:06d}"
-            else:
-                order_number = "ORD-000001"
-            self.order_number = order_number
-        
-        super().save(*args, **kwargs)
+            self.order_number = next_order_number()
         
-        # Reduce inventory if order is being marked as delivered
-        if is_status_change_to_delivered:
-            self._reduce_inventory()
-    
-    def _reduce_inventory(self):
-        """Reduce perfume inventory when order is delivered"""
-        try:
-            for order_item in self.items.all():
-                perfume = order_item.perfume
-                if perfume.stock >= order_item.quantity:
-                    perfume.stock -= order_item.quantity
-                    perfume.save()
-                else:
-                    # Log warning but don't fail the operation
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.warning(
-                        f"Insufficient stock for {perfume.name} in order {self.order_number}. "
-                        f"Current stock: {perfume.stock}, Required: {order_item.quantity}"
-                    )
-        except Exception as e:
-            # Log error but don't fail the operation
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error reducing inventory for order {self.order_number}: {str(e)}")
+        created = self._state.adding
+        changed = [name for name in self.changed_fields if name in OrderEvent.TRACKED_FIELDS]
+        # The outbox row commits or rolls back with the change it describes; no
+        # savepoint, since a failure here must abort the caller's transaction anyway
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if created or changed:
+                OrderEvent.record(self, OrderEvent.CREATED if created else OrderEvent.UPDATED, changed)
+        self._snapshot(kwargs.get('update_fields'))
+
+class OrderNumberSequence(models.Model):
+    """Order number counter for databases without sequences (see orders.numbering)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -117,27 +231,73 @@ class OrderItem(models.Model):
     def total(self):
         return self.price * self.quantity
 
+def line_total(prefix=''):
+    """
+    SQL for a cart line's price: (discount_price, or price when there is no
+    discount) * quantity. `prefix` is the path from the queried model to CartItem.
+    """
+    unit_price = Coalesce(
+        NullIf(F(f'{prefix}perfume__discount_price'), Value(Decimal('0'))),
+        F(f'{prefix}perfume__price'),
+    )
+    return ExpressionWrapper(unit_price * F(f'{prefix}quantity'), output_field=models.DecimalField(max_digits=10, decimal_places=2))
+
+
+class CartItemQuerySet(models.QuerySet):
+    def with_total(self):
+        return self.annotate(line_total=line_total())
+
+    def for_display(self, detail=False):
+        """Lines with their total and the perfume relations the serializers read"""
+        return with_perfume(self.with_total(), detail)
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self, detail=False):
+        """
+        Annotate subtotal and line count in the cart query itself and prefetch
+        the lines, so serializing a cart costs the same whatever its size
+        """
+        return self.annotate(
+            items_subtotal=Coalesce(
+                Sum(line_total('items__')), Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2)
+            ),
+            items_count=Count('items'),
+        ).prefetch_related(
+            models.Prefetch('items', queryset=CartItem.objects.for_display(detail))
+        )
+
+
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CartQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.user.email}'s Cart"
     
     @property
     def total_items(self):
+        if hasattr(self, 'items_count'):
+            return self.items_count
         return self.items.count()
     
     @property
     def subtotal(self):
-        return sum(item.total for item in self.items.all())
+        if hasattr(self, 'items_subtotal'):
+            return self.items_subtotal
+        return self.items.aggregate(subtotal=Sum(line_total()))['subtotal'] or Decimal('0.00')
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     perfume = models.ForeignKey(Perfume, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     
+    objects = CartItemQuerySet.as_manager()
+    
     class Meta:
         unique_together = ('cart', 'perfume')
     
@@ -146,6 +306,89 @@ class CartItem(models.Model):
     
     @property
     def total(self):
+        if hasattr(self, 'line_total'):
+            return self.line_total
         if self.perfume.discount_price:
             return self.perfume.discount_price * self.quantity
-        return self.perfume.price * self.quantity
\ No newline at end of file
+        return self.perfume.price * self.quantity
+
+class ShippingRate(models.Model):
+    """Delivery fee by province; the row with a blank province applies to every other province"""
+    province = models.CharField(max_length=100, unique=True, blank=True)
+    fee = models.DecimalField(max_digits=10, decimal_places=2)
+    free_over = models.DecimalField(
+        max_digits=10, decimal_places=2, blank=True, null=True,
+        help_text='Subtotal from which delivery is free'
+    )
+    
+    class Meta:
+        ordering = ['province']
+    
+    def __str__(self):
+        return f"{self.province or 'Default'}: {self.fee}"
+
+
+class TaxRate(models.Model):
+    """Tax charged on the subtotal by province; the row with a blank province is the default"""
+    province = models.CharField(max_length=100, unique=True, blank=True)
+    rate = models.DecimalField(max_digits=5, decimal_places=4, help_text='0.1000 for 10%')
+    
+    class Meta:
+        ordering = ['province']
+    
+    def __str__(self):
+        return f"{self.province or 'Default'}: {self.rate * 100:.2f}%"
+
+
+class OrderEvent(models.Model):
+    """
+    Outbox of order changes, inserted in the transaction that made them and
+    streamed to customers and staff by orders.events
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    KIND_CHOICES = (
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+    )
+    # Changes to these fields are published
+    TRACKED_FIELDS = ('status', 'payment_status')
+    
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='events')
+    # The order's customer (None for guest orders, which only staff see)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'id'], name='order_event_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.order_id} #{self.pk}"
+    
+    @classmethod
+    def build(cls, order, kind, changed=(), **values):
+        """Unsaved event for `order`; `values` override fields not yet assigned on the instance"""
+        state = {name: getattr(order, name) for name in ('status', 'payment_status', 'updated_at')}
+        state.update(values)
+        return cls(order=order, user_id=order.user_id, kind=kind, payload={
+            'id': order.pk,
+            'order_number': order.order_number,
+            'status': state['status'],
+            'status_display': dict(Order.STATUS_CHOICES)[state['status']],
+            'payment_status': state['payment_status'],
+            'total': str(order.total),
+            'updated_at': state['updated_at'].isoformat() if state['updated_at'] else None,
+            'changed': list(changed),
+        })
+    
+    @classmethod
+    def record(cls, order, kind, changed=(), **values):
+        """Insert the event for `order` (see build())"""
+        event = cls.build(order, kind, changed, **values)
+        event.save()
+        return event
@@ -0,0 +1,92 @@
+import os
+import threading
+
+from django.db import connection, transaction
+from django.db.models import F
+
+ORDER_NUMBER_PREFIX = 'ORD-'
+SEQUENCE_NAME = 'orders_order_number_seq'
+
+# Numbers reserved per round trip. The PostgreSQL sequence is created with
+# INCREMENT BY BLOCK_SIZE, so changing this needs an ALTER SEQUENCE as well.
+BLOCK_SIZE = 50
+
+
+def format_order_number(value):
+    return f'{ORDER_NUMBER_PREFIX}{value:06d}'
+
+
+class OrderNumberAllocator:
+    """
+    Hands out order numbers from blocks reserved in the database, so most
+    orders get their number without touching the database at all.
+
+    On PostgreSQL a block is one ``nextval()`` on a sequence, which never
+    blocks and is not rolled back. Other backends bump a row in
+    OrderNumberSequence; if the surrounding transaction rolls back, so does
+    the bump, so the rest of such a block is only kept once it committed.
+
+    Numbers are unique but not gap-free: a worker that exits leaves the
+    rest of its block unused. Blocks are per process (checked by pid, so a
+    forked worker never reuses its parent's block) and shared by threads.
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = []
+        self._pid = os.getpid()
+
+    def reset(self):
+        with self._lock:
+            self._blocks = []
+
+    def next_value(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._blocks = []
+            if self._blocks:
+                start, end = self._blocks[0]
+                if start + 1 < end:
+                    self._blocks[0] = (start + 1, end)
+                else:
+                    self._blocks.pop(0)
+                return start
+
+        start, end = self._reserve_block()
+        if start + 1 < end:
+            leftover = (start + 1, end)
+            if connection.vendor == 'postgresql':
+                self._add_block(leftover)
+            else:
+                transaction.on_commit(lambda: self._add_block(leftover))
+        return start
+
+    def _add_block(self, block):
+        with self._lock:
+            self._blocks.append(block)
+
+    def _reserve_block(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT nextval(%s)', [SEQUENCE_NAME])
+                start = cursor.fetchone()[0]
+            return start, start + self.block_size
+
+        from .models import OrderNumberSequence
+        with transaction.atomic():
+            updated = OrderNumberSequence.objects.filter(name=SEQUENCE_NAME).update(
+                next_value=F('next_value') + self.block_size
+            )
+            if not updated:
+                OrderNumberSequence.objects.create(name=SEQUENCE_NAME, next_value=1 + self.block_size)
+            end = OrderNumberSequence.objects.values_list('next_value', flat=True).get(name=SEQUENCE_NAME)
+        return end - self.block_size, end
+
+
+allocator = OrderNumberAllocator()
+
+
+def next_order_number():
+    return format_order_number(allocator.next_value())
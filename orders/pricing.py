@@ -0,0 +1,154 @@
+"""
+Checkout pricing: line prices, subtotal, shipping and tax computed on the
+server from the perfumes' current prices and the shipping/tax rate tables.
+
+Both checkout paths and the quote endpoint price through quote(), so what a
+customer is shown is what the order records. The rate tables are small and
+read on every quote, so they are kept whole in the cache and dropped when a
+rate changes.
+"""
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+
+from perfumes.models import Perfume
+from .models import ShippingRate, TaxRate
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+RATES_KEY = 'pricing:rates'
+
+
+def money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def normalize_province(province):
+    return ' '.join((province or '').split()).casefold()
+
+
+def get_cache():
+    return caches[getattr(settings, 'PRICING_CACHE_ALIAS', 'default')]
+
+
+def get_rates():
+    """
+    ``{'shipping': {province: (fee, free_over)}, 'tax': {province: rate}}``
+    keyed on normalized province names, '' for the default rows
+    """
+    cache = get_cache()
+    rates = cache.get(RATES_KEY)
+    if rates is None:
+        rates = {
+            'shipping': {
+                normalize_province(province): (fee, free_over)
+                for province, fee, free_over in ShippingRate.objects.values_list('province', 'fee', 'free_over')
+            },
+            'tax': {
+                normalize_province(province): rate
+                for province, rate in TaxRate.objects.values_list('province', 'rate')
+            },
+        }
+        cache.set(RATES_KEY, rates, None)
+    return rates
+
+
+def invalidate_rates(**kwargs):
+    get_cache().delete(RATES_KEY)
+
+
+def _lookup(table, province, default):
+    province = normalize_province(province)
+    if province in table:
+        return table[province]
+    return table.get('', default)
+
+
+def shipping_for(subtotal, province, rates):
+    fee, free_over = _lookup(rates['shipping'], province, (Decimal(str(settings.ORDER_SHIPPING_FEE)), None))
+    if not subtotal or (free_over is not None and subtotal >= free_over):
+        return ZERO
+    return money(fee)
+
+
+def tax_rate_for(province, rates):
+    return _lookup(rates['tax'], province, Decimal(str(settings.ORDER_TAX_RATE)))
+
+
+@dataclass
+class QuoteLine:
+    perfume: Perfume
+    quantity: int
+
+    @property
+    def unit_price(self):
+        # Same rule as the cart's SQL line totals
+        return self.perfume.effective_price
+
+    @property
+    def total(self):
+        return self.unit_price * self.quantity
+
+    def as_dict(self):
+        return {
+            'perfume_id': self.perfume.pk,
+            'name': self.perfume.name,
+            'quantity': self.quantity,
+            'price': str(self.perfume.price),
+            'unit_price': str(self.unit_price),
+            'total': str(money(self.total)),
+            'in_stock': self.perfume.stock >= self.quantity,
+        }
+
+
+@dataclass
+class Quote:
+    province: str
+    lines: list = field(default_factory=list)
+    subtotal: Decimal = ZERO
+    shipping: Decimal = ZERO
+    tax_rate: Decimal = ZERO
+    tax: Decimal = ZERO
+    total: Decimal = ZERO
+
+    def order_fields(self):
+        """Totals in the shape Order.objects.create() takes"""
+        return {'subtotal': self.subtotal, 'tax': self.tax, 'shipping': self.shipping, 'total': self.total}
+
+    def as_dict(self):
+        return {
+            'lines': [line.as_dict() for line in self.lines],
+            'province': self.province,
+            'subtotal': str(self.subtotal),
+            'shipping': str(self.shipping),
+            'tax_rate': str(self.tax_rate),
+            'tax': str(self.tax),
+            'total': str(self.total),
+        }
+
+
+def load_perfumes(perfume_ids):
+    """The active perfumes among `perfume_ids`, by id, in one query"""
+    return Perfume.objects.filter(is_active=True).only(
+        'id', 'name', 'price', 'discount_price', 'stock'
+    ).in_bulk(perfume_ids)
+
+
+def quote(perfumes, quantities, province=''):
+    """
+    Price `quantities` ({perfume_id: quantity}) with `perfumes` ({perfume_id:
+    Perfume}, e.g. from load_perfumes() or lock_perfumes()). Shipping and tax
+    follow `province`; tax is charged on the subtotal.
+    """
+    rates = get_rates()
+    lines = [QuoteLine(perfumes[perfume_id], quantity) for perfume_id, quantity in quantities.items()]
+    subtotal = money(sum((line.total for line in lines), ZERO))
+    shipping = shipping_for(subtotal, province, rates)
+    tax_rate = tax_rate_for(province, rates)
+    tax = money(subtotal * tax_rate)
+    return Quote(
+        province=province or '', lines=lines, subtotal=subtotal, shipping=shipping,
+        tax_rate=tax_rate, tax=tax, total=subtotal + shipping + tax,
+    )
@@ -1,19 +1,35 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Order, OrderItem, Cart, CartItem
+from .inventory import lock_perfumes, reserve_stock_many, InsufficientStock
+from . import pricing
 from perfumes.models import Perfume
-from perfumes.serializers import PerfumeSerializer
+from perfumes.serializers import PerfumeSerializer, PerfumeSummarySerializer
+from perfumes_project.serializers import DynamicFieldsMixin, ExpandableFieldsMixin
+from users.models import Address
 from users.serializers import AddressSerializer
 
-class CartItemSerializer(serializers.ModelSerializer):
-    perfume_details = PerfumeSerializer(source='perfume', read_only=True)
+def create_order_items(order, quote):
+    """Insert all lines of an order in one query, at the prices of its quote"""
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, perfume=line.perfume, price=line.unit_price, quantity=line.quantity)
+        for line in quote.lines
+    ])
+
+class CartItemSerializer(DynamicFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
+    perfume_details = PerfumeSummarySerializer(source='perfume', read_only=True)
     total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
         model = CartItem
         fields = ['id', 'perfume', 'perfume_details', 'quantity', 'total']
         read_only_fields = ['total']
+        # ?expand=perfume embeds the full catalog representation
+        expandable_fields = {
+            'perfume': ('perfume_details', PerfumeSerializer, {'source': 'perfume', 'read_only': True}),
+        }
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
@@ -23,16 +39,98 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ['id', 'items', 'subtotal', 'total_items', 'created_at', 'updated_at']
         read_only_fields = ['subtotal', 'total_items']
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    perfume_details = PerfumeSerializer(source='perfume', read_only=True)
+class CartOperationSerializer(serializers.Serializer):
+    OPERATIONS = (
+        ('add', 'Add quantity to the line'),
+        ('set', 'Set the line quantity (0 removes it)'),
+        ('remove', 'Remove the line'),
+    )
+    
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    perfume_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+    
+    def validate(self, data):
+        if data['op'] == 'add' and data['quantity'] == 0:
+            raise serializers.ValidationError({"quantity": "Quantity must be greater than zero"})
+        return data
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Apply several cart operations at once, in order, all or nothing. Used
+    for bulk edits and for merging a guest cart into the user's cart after login.
+    """
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
+    
+    def create(self, validated_data):
+        cart = validated_data['cart']
+        operations = validated_data['operations']
+        perfume_ids = {operation['perfume_id'] for operation in operations}
+        
+        with transaction.atomic():
+            # Serialize concurrent batches on the same cart
+            Cart.objects.select_for_update().values_list('pk', flat=True).get(pk=cart.pk)
+            lines = {item.perfume_id: item for item in cart.items.filter(perfume_id__in=perfume_ids)}
+            
+            quantities = {perfume_id: item.quantity for perfume_id, item in lines.items()}
+            for operation in operations:
+                perfume_id = operation['perfume_id']
+                if operation['op'] == 'add':
+                    quantities[perfume_id] = quantities.get(perfume_id, 0) + operation['quantity']
+                elif operation['op'] == 'set':
+                    quantities[perfume_id] = operation['quantity']
+                else:
+                    quantities[perfume_id] = 0
+            
+            # One stock check for every line that stays in the cart
+            wanted = {perfume_id: quantity for perfume_id, quantity in quantities.items() if quantity}
+            stock = dict(
+                Perfume.objects.filter(pk__in=wanted, is_active=True).values_list('id', 'stock')
+            )
+            errors = {}
+            for perfume_id, quantity in wanted.items():
+                if perfume_id not in stock:
+                    errors[str(perfume_id)] = "Perfume not found"
+                elif quantity > stock[perfume_id]:
+                    errors[str(perfume_id)] = f"Only {stock[perfume_id]} items available"
+            if errors:
+                raise serializers.ValidationError({"operations": errors})
+            
+            to_create, to_update, to_delete = [], [], []
+            for perfume_id, quantity in quantities.items():
+                item = lines.get(perfume_id)
+                if item is None:
+                    if quantity:
+                        to_create.append(CartItem(cart=cart, perfume_id=perfume_id, quantity=quantity))
+                elif not quantity:
+                    to_delete.append(item.pk)
+                elif quantity != item.quantity:
+                    item.quantity = quantity
+                    to_update.append(item)
+            
+            if to_delete:
+                CartItem.objects.filter(pk__in=to_delete).delete()
+            if to_update:
+                CartItem.objects.bulk_update(to_update, ['quantity'])
+            if to_create:
+                CartItem.objects.bulk_create(to_create)
+        
+        return cart
+
+class OrderItemSerializer(DynamicFieldsMixin, ExpandableFieldsMixin, serializers.ModelSerializer):
+    perfume_details = PerfumeSummarySerializer(source='perfume', read_only=True)
     total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
         model = OrderItem
         fields = ['id', 'perfume', 'perfume_details', 'price', 'quantity', 'total']
         read_only_fields = ['total']
+        expandable_fields = {
+            'perfume': ('perfume_details', PerfumeSerializer, {'source': 'perfume', 'read_only': True}),
+        }
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     shipping_address_details = AddressSerializer(source='shipping_address', read_only=True)
     billing_address_details = AddressSerializer(source='billing_address', read_only=True)
@@ -45,7 +143,26 @@ class OrderSerializer(serializers.ModelSerializer):
             'subtotal', 'tax', 'shipping', 'total', 'items', 'created_at', 'updated_at',
             'guest_name', 'guest_email', 'guest_phone', 'guest_address', 'guest_city', 'guest_province', 'guest_notes'
         ]
-        read_only_fields = ['order_number', 'user']
+        # Totals are priced at checkout (orders.pricing); status and payment only change
+        # through the cancel/update_order_status/update_payment_status actions
+        read_only_fields = [
+            'order_number', 'user', 'status', 'payment_status', 'subtotal', 'tax', 'shipping', 'total'
+        ]
+
+class OrderListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Order table row: no lines or addresses, counts and customer come from OrderQuerySet.for_list()"""
+    item_count = serializers.IntegerField(read_only=True)
+    customer_name = serializers.CharField(read_only=True)
+    customer_email = serializers.CharField(read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'user', 'customer_name', 'customer_email', 'status',
+            'payment_method', 'payment_status', 'subtotal', 'tax', 'shipping', 'total',
+            'item_count', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
 
 class OrderCreateSerializer(serializers.ModelSerializer):
     shipping_address = serializers.IntegerField(required=False, allow_null=True)
@@ -57,37 +174,54 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             'payment_method', 'shipping_address', 'billing_address',
             'subtotal', 'tax', 'shipping', 'total'
         ]
+        # Totals are priced by orders.pricing; values sent by the client are ignored
+        read_only_fields = ['subtotal', 'tax', 'shipping', 'total']
+    
+    def owned_address(self, address_id):
+        if address_id is None:
+            return None
+        try:
+            return Address.objects.get(pk=address_id, user=self.context['request'].user)
+        except Address.DoesNotExist:
+            raise serializers.ValidationError("Address not found")
+    
+    def validate_shipping_address(self, value):
+        return self.owned_address(value)
+    
+    def validate_billing_address(self, value):
+        return self.owned_address(value)
     
     def create(self, validated_data):
         user = self.context['request'].user
         cart = Cart.objects.get(user=user)
+        quantities = dict(cart.items.values_list('perfume_id', 'quantity'))
         
-        if not cart.items.exists():
+        if not quantities:
             raise serializers.ValidationError({"cart": "Cart is empty"})
         
-        # Create order
-        order = Order.objects.create(
-            user=user,
-            **validated_data
-        )
-        
-        # Create order items from cart items
-        for cart_item in cart.items.all():
-            price = cart_item.perfume.discount_price or cart_item.perfume.price
-            OrderItem.objects.create(
-                order=order,
-                perfume=cart_item.perfume,
-                price=price,
-                quantity=cart_item.quantity
+        # Order, lines and stock reservations commit or roll back together
+        with transaction.atomic():
+            perfumes = lock_perfumes(quantities)
+            missing = [perfume_id for perfume_id in quantities if perfume_id not in perfumes]
+            if missing:
+                raise serializers.ValidationError({"cart": f"Perfume with id {missing[0]} not found"})
+            
+            try:
+                reserve_stock_many(quantities)
+            except InsufficientStock as exc:
+                raise serializers.ValidationError({"cart": f"Insufficient stock for {perfumes[exc.perfume_id].name}"})
+            
+            shipping_address = validated_data.get('shipping_address')
+            quote = pricing.quote(perfumes, quantities, shipping_address.state if shipping_address else '')
+            order = Order.objects.create(
+                user=user,
+                **validated_data,
+                **quote.order_fields()
             )
+            create_order_items(order, quote)
             
-            # Update perfume stock
-            perfume = cart_item.perfume
-            perfume.stock -= cart_item.quantity
-            perfume.save()
-        
-        # Clear the cart
-        cart.items.all().delete()
+            # Clear the cart
+            cart.items.all().delete()
         
         return order
 
@@ -107,6 +241,16 @@ class PaymentStatusUpdateSerializer(serializers.Serializer):
         return value
 
 
+class GuestPerfumeRefSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+
+
+class GuestCartItemSerializer(serializers.Serializer):
+    """A guest cart line as the client sends it: ``{"perfume": {"id": 1}, "quantity": 2}``"""
+    perfume = GuestPerfumeRefSerializer()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
 class GuestOrderCreateSerializer(serializers.ModelSerializer):
     # Guest contact information
     guest_name = serializers.CharField(max_length=100)
@@ -118,10 +262,7 @@ class GuestOrderCreateSerializer(serializers.ModelSerializer):
     guest_notes = serializers.CharField(max_length=500, required=False, allow_blank=True)
     
     # Cart items data
-    cart_items = serializers.ListField(
-        child=serializers.DictField(),
-        write_only=True
-    )
+    cart_items = GuestCartItemSerializer(many=True, write_only=True)
     
     class Meta:
         model = Order
@@ -130,6 +271,8 @@ class GuestOrderCreateSerializer(serializers.ModelSerializer):
             'guest_name', 'guest_email', 'guest_phone', 'guest_address',
             'guest_city', 'guest_province', 'guest_notes', 'cart_items'
         ]
+        # Totals are priced by orders.pricing; values sent by the client are ignored
+        read_only_fields = ['subtotal', 'tax', 'shipping', 'total']
     
     def create(self, validated_data):
         # Extract guest info and cart items
@@ -147,36 +290,79 @@ class GuestOrderCreateSerializer(serializers.ModelSerializer):
         if not cart_items_data:
             raise serializers.ValidationError({"cart_items": "Cart is empty"})
         
-        # Create order without user
-        order = Order.objects.create(
-            user=None,
-            **validated_data,
-            **guest_info
-        )
-        
-        # Create order items from cart items data
+        # Merge repeated perfumes so each one is reserved once
+        quantities = {}
         for item_data in cart_items_data:
-            perfume_id = item_data.get('perfume', {}).get('id')
-            quantity = item_data.get('quantity', 1)
+            perfume_id = item_data['perfume']['id']
+            quantities[perfume_id] = quantities.get(perfume_id, 0) + item_data['quantity']
+        
+        # Order, lines and stock reservations commit or roll back together
+        with transaction.atomic():
+            perfumes = lock_perfumes(quantities)
+            missing = [perfume_id for perfume_id in quantities if perfume_id not in perfumes]
+            if missing:
+                raise serializers.ValidationError({"cart_items": f"Perfume with id {missing[0]} not found"})
             
             try:
-                perfume = Perfume.objects.get(id=perfume_id)
-            except Perfume.DoesNotExist:
-                raise serializers.ValidationError({"cart_items": f"Perfume with id {perfume_id} not found"})
-            
-            if perfume.stock < quantity:
-                raise serializers.ValidationError({"cart_items": f"Insufficient stock for {perfume.name}"})
+                reserve_stock_many(quantities)
+            except InsufficientStock as exc:
+                raise serializers.ValidationError({"cart_items": f"Insufficient stock for {perfumes[exc.perfume_id].name}"})
             
-            price = perfume.discount_price or perfume.price
-            OrderItem.objects.create(
-                order=order,
-                perfume=perfume,
-                price=price,
-                quantity=quantity
+            quote = pricing.quote(perfumes, quantities, guest_info['guest_province'])
+            # Create order without user
+            order = Order.objects.create(
+                user=None,
+                **validated_data,
+                **guest_info,
+                **quote.order_fields()
             )
-            
-            # Update perfume stock
-            perfume.stock -= quantity
-            perfume.save()
+            create_order_items(order, quote)
         
-        return order
\ No newline at end of file
+        return order
+
+
+class QuoteLineSerializer(serializers.Serializer):
+    perfume_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    """
+    Lines to price and the delivery province. Signed-in customers may leave
+    out `items` to price their cart, and give a saved `shipping_address`
+    instead of a province.
+    """
+    items = QuoteLineSerializer(many=True, required=False)
+    province = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    shipping_address = serializers.IntegerField(required=False, allow_null=True)
+    
+    def get_quantities(self):
+        """{perfume_id: quantity}, repeated perfumes merged"""
+        items = self.validated_data.get('items')
+        if items is None:
+            user = self.context['request'].user
+            if not user.is_authenticated:
+                raise serializers.ValidationError({"items": "This field is required."})
+            return dict(CartItem.objects.filter(cart__user=user).values_list('perfume_id', 'quantity'))
+        quantities = {}
+        for item in items:
+            quantities[item['perfume_id']] = quantities.get(item['perfume_id'], 0) + item['quantity']
+        return quantities
+    
+    def get_province(self):
+        address_id = self.validated_data.get('shipping_address')
+        user = self.context['request'].user
+        if address_id is not None and user.is_authenticated:
+            state = Address.objects.filter(pk=address_id, user=user).values_list('state', flat=True).first()
+            if state is None:
+                raise serializers.ValidationError({"shipping_address": "Address not found"})
+            return state
+        return self.validated_data.get('province', '')
+    
+    def get_quote(self):
+        quantities = self.get_quantities()
+        perfumes = pricing.load_perfumes(quantities)
+        missing = [perfume_id for perfume_id in quantities if perfume_id not in perfumes]
+        if missing:
+            raise serializers.ValidationError({"items": f"Perfume with id {missing[0]} not found"})
+        return pricing.quote(perfumes, quantities, self.get_province())
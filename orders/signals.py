@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from .models import ShippingRate, TaxRate
+from .pricing import invalidate_rates
+
+
+def rates_changed(sender, **kwargs):
+    """Drop the cached rate tables once the change is committed"""
+    transaction.on_commit(invalidate_rates)
+
+
+for model in (ShippingRate, TaxRate):
+    post_save.connect(rates_changed, sender=model, dispatch_uid=f'pricing_rates_save_{model.__name__}')
+    post_delete.connect(rates_changed, sender=model, dispatch_uid=f'pricing_rates_delete_{model.__name__}')
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from perfumes.cache import bump_catalog_version
+from perfumes.models import Perfume
+
+from .models import Order, OrderEvent, OrderItem
+
+# Legal moves: Pending -> Confirmed -> Shipped -> Delivered, and Pending -> Cancelled
+TRANSITIONS = {
+    'P': ('C', 'X'),
+    'C': ('S',),
+    'S': ('D',),
+    'D': (),
+    'X': (),
+}
+
+
+class IllegalTransition(Exception):
+    def __init__(self, current, target):
+        self.current = current
+        self.target = target
+        names = dict(Order.STATUS_CHOICES)
+        super().__init__(f'Cannot change status from {names[current]} to {names[target]}')
+
+
+def can_transition(current, target):
+    return current == target or target in TRANSITIONS[current]
+
+
+def restock_items(order_id):
+    """
+    Put every line of an order back on the shelf in one statement:
+
+        UPDATE perfume SET stock = stock + (SELECT SUM(quantity) FROM items WHERE perfume = perfume.id)
+        WHERE id IN (SELECT perfume FROM items)
+    """
+    items = OrderItem.objects.filter(order_id=order_id)
+    quantity = items.filter(perfume=OuterRef('pk')).values('perfume').annotate(total=Sum('quantity')).values('total')
+    updated = Perfume.objects.filter(pk__in=items.values('perfume')).update(
+        stock=F('stock') + Subquery(quantity), updated_at=timezone.now()
+    )
+    if updated:
+        # update() sends no signals, so invalidate cached catalog responses ourselves
+        transaction.on_commit(bump_catalog_version)
+
+
+# Stock is reserved when the order is placed (see orders.inventory), so only
+# cancelling has an inventory effect
+EFFECTS = {
+    ('P', 'X'): restock_items,
+}
+
+
+def transition(order, target):
+    """
+    Move `order` to status `target` and run the inventory effect of that move.
+
+    The status is switched with ``UPDATE ... WHERE status = <current>`` and
+    the effect runs in the same transaction only when that UPDATE matched,
+    so replaying a transition (double click, retried request, two admins)
+    neither repeats the effect nor writes anything. Returns True when this
+    call performed the transition and False when the order was already in
+    `target`; raises IllegalTransition for moves outside TRANSITIONS.
+    """
+    current = order.status
+    if current == target:
+        return False
+    if not can_transition(current, target):
+        raise IllegalTransition(current, target)
+
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, status=current).update(status=target, updated_at=now)
+        if updated:
+            OrderEvent.record(order, OrderEvent.UPDATED, ['status'], status=target, updated_at=now)
+            effect = EFFECTS.get((current, target))
+            if effect:
+                effect(order.pk)
+
+    if not updated:
+        # Someone else moved the order first; judge the request against the real status
+        order.refresh_from_db(fields=['status', 'updated_at'])
+        if order.status == target:
+            return False
+        return transition(order, target)
+
+    order.status = target
+    order.updated_at = now
+    order._snapshot(['status', 'updated_at'])
+    return True
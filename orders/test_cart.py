@@ -0,0 +1,211 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from perfumes.models import Perfume, PerfumeImage, Category, Brand
+from .models import Cart, CartItem, Order, OrderItem
+
+User = get_user_model()
+
+
+class CartTotalsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='shopper@example.com', password='testpass123', first_name='Test', last_name='User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Test Category', slug='test-category')
+        self.brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.cart = Cart.objects.create(user=self.user)
+
+    def make_perfume(self, name, price, discount_price=None):
+        perfume = Perfume.objects.create(
+            name=name, brand=self.brand, category=self.category,
+            price=Decimal(price), discount_price=discount_price and Decimal(discount_price), stock=50
+        )
+        PerfumeImage.objects.create(perfume=perfume, image='perfumes/gallery/test.jpg')
+        return perfume
+
+    def fill_cart(self, lines):
+        start = self.cart.items.count()
+        for i in range(start, start + lines):
+            CartItem.objects.create(cart=self.cart, perfume=self.make_perfume(f'Perfume {i}', '10.00'), quantity=2)
+
+    def test_subtotal_uses_discount_price_in_sql(self):
+        CartItem.objects.create(cart=self.cart, perfume=self.make_perfume('Full', '100.00'), quantity=2)
+        CartItem.objects.create(cart=self.cart, perfume=self.make_perfume('Sale', '100.00', '75.00'), quantity=1)
+        CartItem.objects.create(cart=self.cart, perfume=self.make_perfume('Zero', '40.00', '0.00'), quantity=1)
+
+        cart = Cart.objects.with_totals().get(pk=self.cart.pk)
+        self.assertEqual(cart.subtotal, Decimal('315.00'))
+        self.assertEqual(cart.total_items, 3)
+        self.assertEqual([item.total for item in cart.items.all()], [Decimal('200.00'), Decimal('75.00'), Decimal('40.00')])
+
+        # Plain instances compute the same totals without annotations
+        plain = Cart.objects.get(pk=self.cart.pk)
+        self.assertEqual(plain.subtotal, Decimal('315.00'))
+        self.assertEqual(plain.total_items, 3)
+
+    def test_empty_cart_totals(self):
+        response = self.client.get('/api/orders/cart/my_cart/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(response.data['subtotal']), Decimal('0'))
+        self.assertEqual(response.data['total_items'], 0)
+
+    def test_new_cart_is_created_on_first_read(self):
+        other = User.objects.create_user(
+            email='new@example.com', password='testpass123', first_name='New', last_name='User'
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get('/api/orders/cart/my_cart/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['items'], [])
+        self.assertTrue(Cart.objects.filter(user=other).exists())
+
+    def test_lines_embed_perfume_summary_unless_expanded(self):
+        CartItem.objects.create(cart=self.cart, perfume=self.make_perfume('Sale', '100.00', '75.00'), quantity=1)
+
+        summary = self.client.get('/api/orders/cart/my_cart/').data['items'][0]['perfume_details']
+        self.assertEqual(set(summary), {
+            'id', 'slug', 'name', 'brand_name', 'image', 'image_srcset',
+            'price', 'discount_price', 'effective_price', 'stock', 'is_in_stock'
+        })
+        self.assertEqual(summary['brand_name'], 'Test Brand')
+        self.assertEqual(Decimal(summary['effective_price']), Decimal('75.00'))
+
+        detail = self.client.get('/api/orders/cart/my_cart/', {'expand': 'perfume'}).data['items'][0]['perfume_details']
+        self.assertIn('description', detail)
+        self.assertEqual(len(detail['images']), 1)
+
+    def test_cart_lines_carry_what_the_cart_page_reads(self):
+        # Cart.js caps quantities at perfume_details.stock and shows name, brand, image and prices
+        CartItem.objects.create(cart=self.cart, perfume=self.make_perfume('Sale', '100.00', '75.00'), quantity=2)
+
+        item = self.client.get('/api/orders/cart/my_cart/').data['items'][0]
+        self.assertEqual(item['quantity'], 2)
+        details = item['perfume_details']
+        self.assertEqual(details['stock'], 50)
+        self.assertTrue(details['is_in_stock'])
+        self.assertEqual((details['name'], details['brand_name']), ('Sale', 'Test Brand'))
+        self.assertEqual((Decimal(details['price']), Decimal(details['discount_price'])),
+                         (Decimal('100.00'), Decimal('75.00')))
+        self.assertIn('image', details)
+
+    def test_order_lines_embed_perfume_summary_unless_expanded(self):
+        perfume = self.make_perfume('Full', '100.00')
+        order = Order.objects.create(
+            user=self.user, payment_method='cash_on_delivery',
+            subtotal=Decimal('100.00'), tax=Decimal('0.00'), shipping=Decimal('0.00'), total=Decimal('100.00'),
+        )
+        OrderItem.objects.create(order=order, perfume=perfume, price=Decimal('100.00'), quantity=1)
+
+        line = self.client.get(f'/api/orders/{order.id}/').data['items'][0]
+        self.assertNotIn('images', line['perfume_details'])
+        line = self.client.get(f'/api/orders/{order.id}/', {'expand': 'perfume'}).data['items'][0]
+        self.assertIn('images', line['perfume_details'])
+
+    def count_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries), response
+
+    def test_my_cart_query_count_is_constant(self):
+        self.fill_cart(1)
+        small, _ = self.count_queries('get', '/api/orders/cart/my_cart/')
+        self.fill_cart(10)
+        large, response = self.count_queries('get', '/api/orders/cart/my_cart/')
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['total_items'], 11)
+        self.assertEqual(Decimal(response.data['subtotal']), Decimal('220.00'))
+
+    def test_cart_mutation_query_count_is_constant(self):
+        extra = [self.make_perfume(f'Extra {i}', '5.00') for i in range(2)]
+        self.fill_cart(1)
+        small, _ = self.count_queries('post', '/api/orders/cart/add_item/', {'perfume_id': extra[0].id})
+        self.fill_cart(10)
+        large, response = self.count_queries('post', '/api/orders/cart/add_item/', {'perfume_id': extra[1].id})
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['items']), 13)
+
+
+class CartBatchTest(TestCase):
+    url = '/api/orders/cart/batch/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='shopper@example.com', password='testpass123', first_name='Test', last_name='User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.perfumes = [
+            Perfume.objects.create(
+                name=f'Perfume {i}', brand=brand, category=category, price=Decimal('10.00'), stock=5
+            )
+            for i in range(25)
+        ]
+        self.cart = Cart.objects.create(user=self.user)
+
+    def quantities(self):
+        return dict(self.cart.items.values_list('perfume_id', 'quantity'))
+
+    def test_operations_are_applied_in_order(self):
+        first, second, third = self.perfumes[:3]
+        CartItem.objects.create(cart=self.cart, perfume=first, quantity=1)
+        CartItem.objects.create(cart=self.cart, perfume=second, quantity=1)
+
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'add', 'perfume_id': first.id, 'quantity': 2},
+            {'op': 'remove', 'perfume_id': second.id},
+            {'op': 'add', 'perfume_id': third.id, 'quantity': 1},
+            {'op': 'set', 'perfume_id': third.id, 'quantity': 4},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.quantities(), {first.id: 3, third.id: 4})
+        self.assertEqual(response.data['total_items'], 2)
+        self.assertEqual(Decimal(response.data['subtotal']), Decimal('70.00'))
+
+    def test_insufficient_stock_rejects_whole_batch(self):
+        first, second = self.perfumes[:2]
+        CartItem.objects.create(cart=self.cart, perfume=first, quantity=1)
+
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'set', 'perfume_id': first.id, 'quantity': 2},
+            {'op': 'add', 'perfume_id': second.id, 'quantity': 6},
+            {'op': 'add', 'perfume_id': 999999, 'quantity': 1},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data['operations']
+        self.assertIn('Only 5 items available', errors[str(second.id)])
+        self.assertIn('not found', errors['999999'])
+        self.assertEqual(self.quantities(), {first.id: 1})
+
+    def test_invalid_operation_is_rejected(self):
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'explode', 'perfume_id': self.perfumes[0].id},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'operations': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_guest_cart_merge_query_count_is_constant(self):
+        def merge(perfumes):
+            operations = [{'op': 'add', 'perfume_id': perfume.id, 'quantity': 1} for perfume in perfumes]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, {'operations': operations}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        small = merge(self.perfumes[:1])
+        self.cart.items.all().delete()
+        large = merge(self.perfumes[:20])
+        self.assertEqual(small, large)
+        self.assertEqual(len(self.quantities()), 20)
@@ -0,0 +1,92 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from perfumes.models import Perfume, Category, Brand
+from .models import Order, OrderItem
+
+User = get_user_model()
+
+
+def order_statements(context, verb):
+    return [query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(verb) and 'orders_order"' in query['sql']]
+
+
+class OrderChangeTrackingTest(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email='admin@example.com', password='adminpass123', first_name='Admin', last_name='User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.perfume = Perfume.objects.create(
+            name='Test Perfume', brand=brand, category=category, price=Decimal('50.00'), stock=10
+        )
+        order = Order.objects.create(
+            order_number='TRACK001', status='P', payment_method='cash_on_delivery',
+            subtotal=Decimal('100.00'), tax=Decimal('10.00'), shipping=Decimal('0.00'), total=Decimal('110.00'),
+        )
+        OrderItem.objects.create(order=order, perfume=self.perfume, price=Decimal('50.00'), quantity=2)
+        self.order = Order.objects.get(pk=order.pk)
+
+    def test_loaded_order_tracks_changes(self):
+        self.assertEqual(self.order.changed_fields, [])
+        self.order.payment_status = True
+        self.assertTrue(self.order.has_changed('payment_status'))
+        self.assertEqual(self.order.changed_fields, ['payment_status'])
+        self.assertFalse(self.order.get_original_value('payment_status'))
+
+    def test_save_resets_snapshot(self):
+        self.order.payment_status = True
+        self.order.save()
+        self.assertEqual(self.order.changed_fields, [])
+        self.assertTrue(self.order.get_original_value('payment_status'))
+
+    def test_save_refuses_status_changes(self):
+        self.order.status = 'D'
+        with self.assertRaises(ValueError):
+            self.order.save()
+        with self.assertRaises(ValueError):
+            self.order.save_changes()
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'P')
+        # Other columns can still be written while the status edit is pending
+        self.order.guest_notes = 'Leave at the door'
+        self.order.save(update_fields=['guest_notes', 'updated_at'])
+        self.assertEqual(Order.objects.get(pk=self.order.pk).guest_notes, 'Leave at the door')
+
+    def test_refresh_from_db_resets_snapshot(self):
+        Order.objects.filter(pk=self.order.pk).update(status='S')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.get_original_value('status'), 'S')
+        self.assertEqual(self.order.changed_fields, [])
+
+    def test_save_does_not_reread_order(self):
+        self.order.guest_notes = 'Ring twice'
+        with CaptureQueriesContext(connection) as context:
+            self.order.save()
+        self.assertEqual(order_statements(context, 'SELECT'), [])
+
+    def test_save_changes_writes_only_modified_columns(self):
+        self.assertEqual(self.order.save_changes(), [])
+        self.order.guest_notes = 'Leave at the door'
+        with CaptureQueriesContext(connection) as context:
+            self.order.save_changes()
+        [update] = order_statements(context, 'UPDATE')
+        self.assertIn('"guest_notes"', update)
+        self.assertNotIn('"status"', update)
+
+    def test_payment_toggle_writes_only_payment_column(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                f'/api/orders/{self.order.id}/update_payment_status/', {'payment_status': True}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        [update] = order_statements(context, 'UPDATE')
+        self.assertIn('"payment_status"', update)
+        self.assertNotIn('"total"', update)
+        self.assertEqual(len(order_statements(context, 'SELECT')), 1)
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from perfumes.models import Perfume, Category, Brand
+from perfumes_project.pagination import MAX_PAGE_SIZE
+from .models import Order, OrderItem
+
+User = get_user_model()
+
+
+class AdminDashboardTest(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email='admin@example.com', password='adminpass123', first_name='Admin', last_name='User'
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='testpass123', first_name='Jane', last_name='Doe'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.perfume = Perfume.objects.create(
+            name='Test Perfume', brand=brand, category=category, price=Decimal('50.00'), stock=100
+        )
+
+    def make_order(self, total, days_ago=0, **kwargs):
+        order = Order.objects.create(
+            user=self.customer, payment_method='cash_on_delivery', subtotal=total,
+            tax=Decimal('0.00'), shipping=Decimal('0.00'), total=total, **kwargs
+        )
+        OrderItem.objects.create(order=order, perfume=self.perfume, price=total, quantity=1)
+        if days_ago:
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return order
+
+    def test_figures_are_aggregated(self):
+        self.make_order(Decimal('100.00'), status='D', payment_status=True)
+        self.make_order(Decimal('50.00'))
+        self.make_order(Decimal('30.00'), status='X')
+        self.make_order(Decimal('40.00'), days_ago=40, status='D', payment_status=True)
+        self.make_order(Decimal('500.00'), days_ago=100)
+
+        response = self.client.get('/api/orders/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        orders = response.data['orders']
+        self.assertEqual(orders['total'], 5)
+        self.assertEqual(orders['by_status'], {'P': 2, 'C': 0, 'S': 0, 'D': 2, 'X': 1})
+        self.assertEqual(orders['by_payment'], {'paid': 2, 'unpaid': 3})
+        # Cancelled orders bring no revenue
+        self.assertEqual(orders['revenue'], {'total': '690.00', 'paid': '140.00', 'outstanding': '550.00'})
+        period = orders['period']
+        self.assertEqual((period['days'], period['orders'], period['previous_orders']), (30, 3, 1))
+        self.assertEqual((period['revenue'], period['previous_revenue']), ('150.00', '40.00'))
+        self.assertEqual(period['orders_growth'], 200.0)
+        self.assertEqual(period['revenue_growth'], 275.0)
+
+        # Staff accounts are not customers
+        self.assertEqual(response.data['customers']['total'], 1)
+        self.assertEqual(response.data['customers']['new'], 1)
+        self.assertIsNone(response.data['customers']['growth'])
+
+        recent = response.data['recent_orders']
+        self.assertEqual(len(recent), 5)
+        self.assertEqual([order['total'] for order in recent[-2:]], ['40.00', '500.00'])
+        self.assertEqual((recent[0]['customer_name'], recent[0]['item_count']), ('Jane Doe', 1))
+
+        response = self.client.get('/api/orders/dashboard/', {'days': 200})
+        self.assertEqual(response.data['orders']['period']['orders'], 5)
+        self.assertIsNone(response.data['orders']['period']['orders_growth'])
+
+    def test_query_budget_is_constant(self):
+        # order figures, customer figures, recent orders
+        with self.assertNumQueries(3):
+            self.client.get('/api/orders/dashboard/')
+        for days_ago in range(20):
+            self.make_order(Decimal('10.00'), days_ago=days_ago * 5)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/orders/dashboard/')
+        self.assertEqual(response.data['orders']['total'], 20)
+
+    def test_days_is_validated(self):
+        self.assertEqual(self.client.get('/api/orders/dashboard/', {'days': 'week'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/orders/dashboard/', {'days': 10000})
+        self.assertEqual(response.data['orders']['period']['days'], 365)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get('/api/orders/dashboard/').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/api/orders/dashboard/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_page_size_is_capped(self):
+        Order.objects.bulk_create([
+            Order(user=self.customer, payment_method='cash_on_delivery', subtotal=Decimal('1.00'),
+                  tax=Decimal('0.00'), shipping=Decimal('0.00'), total=Decimal('1.00'),
+                  order_number=f'TEST-{n}')
+            for n in range(MAX_PAGE_SIZE + 5)
+        ])
+        response = self.client.get('/api/orders/', {'page_size': 10000})
+        self.assertEqual(response.data['count'], MAX_PAGE_SIZE + 5)
+        self.assertEqual(len(response.data['results']), MAX_PAGE_SIZE)
+        response = self.client.get('/api/orders/', {'page_size': 25})
+        self.assertEqual(len(response.data['results']), 25)
+        response = self.client.get('/api/users/profile/', {'page_size': 10000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_list_sorts_on_computed_columns(self):
+        self.make_order(Decimal('10.00'))
+        second = self.make_order(Decimal('20.00'))
+        OrderItem.objects.create(order=second, perfume=self.perfume, price=Decimal('1.00'), quantity=1)
+        response = self.client.get('/api/orders/', {'ordering': '-item_count', 'fields': 'id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0], {'id': second.id})
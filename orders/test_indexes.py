@@ -0,0 +1,32 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from perfumes_project.explain import IndexUsageMixin
+from .models import Order
+
+User = get_user_model()
+
+class OrderIndexUsageTest(IndexUsageMixin, TestCase):
+    """The order listing queries must be answerable from the order indexes"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            first_name='Regular',
+            last_name='User',
+            password='testpass123'
+        )
+    
+    def test_staff_listing(self):
+        self.assertUsesIndex(Order.objects.order_by('-created_at'), 'order_created_idx')
+    
+    def test_customer_listing(self):
+        self.assertUsesIndex(Order.objects.filter(user=self.user).order_by('-created_at'), 'order_user_created_idx')
+    
+    def test_status_filter(self):
+        self.assertUsesIndex(Order.objects.filter(status='P').order_by('-created_at'), 'order_status_created_idx')
+    
+    def test_payment_status_filter(self):
+        paid = Order.objects.filter(payment_status=True).order_by('-created_at')
+        unpaid = Order.objects.filter(payment_status=False).order_by('-created_at')
+        self.assertUsesIndex(paid, 'order_paid_created_idx')
+        self.assertUsesIndex(unpaid, 'order_unpaid_created_idx')
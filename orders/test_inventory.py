@@ -0,0 +1,159 @@
+import threading
+import time
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from perfumes.models import Perfume, Category, Brand
+from .inventory import reserve_stock, InsufficientStock
+from .models import Cart, CartItem, Order, OrderItem
+
+User = get_user_model()
+
+
+def guest_order_payload(*lines):
+    return {
+        'payment_method': 'cash_on_delivery',
+        'subtotal': '100.00',
+        'tax': '10.00',
+        'shipping': '0.00',
+        'total': '110.00',
+        'guest_name': 'Guest User',
+        'guest_email': 'guest@test.com',
+        'guest_phone': '0780000000',
+        'guest_address': 'KG 1 Ave',
+        'guest_city': 'Kigali',
+        'guest_province': 'Kigali',
+        'cart_items': [{'perfume': {'id': perfume.id}, 'quantity': quantity} for perfume, quantity in lines],
+    }
+
+
+class StockReservationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Test Category', slug='test-category')
+        self.brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.perfume = Perfume.objects.create(
+            name='Test Perfume', brand=self.brand, category=self.category,
+            price=Decimal('50.00'), stock=3
+        )
+        self.other_perfume = Perfume.objects.create(
+            name='Other Perfume', brand=self.brand, category=self.category,
+            price=Decimal('70.00'), stock=1
+        )
+
+    def test_reserve_stock_decrements_conditionally(self):
+        reserve_stock(self.perfume.id, 2)
+        with self.assertRaises(InsufficientStock):
+            reserve_stock(self.perfume.id, 2)
+        self.perfume.refresh_from_db()
+        self.assertEqual(self.perfume.stock, 1)
+
+    def test_guest_order_reserves_stock(self):
+        response = self.client.post('/api/orders/guest/', guest_order_payload((self.perfume, 2)), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.perfume.refresh_from_db()
+        self.assertEqual(self.perfume.stock, 1)
+
+    def test_failed_line_rolls_back_whole_order(self):
+        payload = guest_order_payload((self.perfume, 2), (self.other_perfume, 5))
+        response = self.client.post('/api/orders/guest/', payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Insufficient stock', str(response.data))
+        self.perfume.refresh_from_db()
+        self.assertEqual(self.perfume.stock, 3)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_non_positive_quantity_is_rejected(self):
+        response = self.client.post('/api/orders/guest/', guest_order_payload((self.perfume, -4)), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.perfume.refresh_from_db()
+        self.assertEqual(self.perfume.stock, 3)
+
+    def test_malformed_lines_are_rejected(self):
+        for cart_items in (
+            [{'perfume': self.perfume.id, 'quantity': 1}],
+            [self.perfume.id],
+            [{'perfume': {'id': 'abc'}, 'quantity': 1}],
+            [{'perfume': {}, 'quantity': 1}],
+            [{'perfume': {'id': self.perfume.id}, 'quantity': 'many'}],
+            'not a list',
+        ):
+            payload = {**guest_order_payload(), 'cart_items': cart_items}
+            response = self.client.post('/api/orders/guest/', payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, cart_items)
+            self.assertIn('cart_items', response.data)
+        self.assertFalse(Order.objects.exists())
+
+    def test_inactive_perfumes_are_rejected(self):
+        Perfume.objects.filter(pk=self.other_perfume.pk).update(is_active=False)
+        payload = guest_order_payload((self.perfume, 1), (self.other_perfume, 1))
+        response = self.client.post('/api/orders/guest/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f'Perfume with id {self.other_perfume.id} not found', str(response.data))
+
+        user = User.objects.create_user(email='user@test.com', password='testpass123')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, perfume=self.perfume, quantity=1)
+        CartItem.objects.create(cart=cart, perfume=self.other_perfume, quantity=1)
+        self.client.force_authenticate(user=user)
+        response = self.client.post('/api/orders/', {'payment_method': 'mobile_money'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f'Perfume with id {self.other_perfume.id} not found', str(response.data))
+
+        self.assertFalse(Order.objects.exists())
+        self.perfume.refresh_from_db()
+        self.assertEqual(self.perfume.stock, 3)
+
+
+class StockContentionTest(TransactionTestCase):
+    """Many concurrent checkouts of the last units must never oversell"""
+
+    threads = 16
+    attempts_per_thread = 5
+    initial_stock = 20
+
+    def setUp(self):
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.perfume = Perfume.objects.create(
+            name='Test Perfume', brand=brand, category=category,
+            price=Decimal('50.00'), stock=self.initial_stock
+        )
+
+    def _checkout(self, results):
+        try:
+            for _ in range(self.attempts_per_thread):
+                while True:
+                    try:
+                        with transaction.atomic():
+                            reserve_stock(self.perfume.id, 1)
+                        results.append(True)
+                        break
+                    except InsufficientStock:
+                        results.append(False)
+                        break
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; retry like a client would
+                        time.sleep(0.001)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    def test_no_overselling_under_contention(self):
+        results = []
+        workers = [threading.Thread(target=self._checkout, args=(results,)) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.perfume.refresh_from_db()
+        sold = results.count(True)
+        self.assertEqual(len(results), self.threads * self.attempts_per_thread)
+        self.assertEqual(sold, self.initial_stock)
+        self.assertEqual(self.perfume.stock, 0)
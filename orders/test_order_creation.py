@@ -0,0 +1,81 @@
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from perfumes.models import Perfume, Category, Brand
+from . import pricing
+from .models import Cart, CartItem
+from .serializers import GuestOrderCreateSerializer, OrderCreateSerializer
+from .test_inventory import guest_order_payload
+
+User = get_user_model()
+
+class OrderCreationQueryCountTest(TestCase):
+    """Order creation must issue the same number of queries whatever the cart size"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Test Category', slug='test-category')
+        self.brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.perfumes = [
+            Perfume.objects.create(
+                name=f'Perfume {i}', brand=self.brand, category=self.category,
+                price=Decimal('50.00'), discount_price=Decimal('40.00') if i % 2 else None, stock=100
+            )
+            for i in range(20)
+        ]
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            first_name='Regular',
+            last_name='User',
+            password='testpass123'
+        )
+        # Rate tables are cached between checkouts; load them up front so both runs hit the cache
+        pricing.invalidate_rates()
+        pricing.get_rates()
+    
+    def _guest_queries(self, size):
+        payload = guest_order_payload(*[(perfume, 2) for perfume in self.perfumes[:size]])
+        serializer = GuestOrderCreateSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as context:
+            order = serializer.save()
+        return len(context.captured_queries), order
+    
+    def test_guest_checkout_query_count_is_constant(self):
+        small, _ = self._guest_queries(1)
+        large, order = self._guest_queries(20)
+        self.assertEqual(small, large)
+        
+
+        self.assertEqual(order.items.count(), 20)
+        self.assertEqual(order.items.get(perfume=self.perfumes[1]).price, Decimal('40.00'))
+        self.perfumes[0].refresh_from_db()
+        self.assertEqual(self.perfumes[0].stock, 96)
+    
+    def test_repeated_lines_are_merged(self):
+        payload = guest_order_payload((self.perfumes[0], 1), (self.perfumes[0], 2))
+        response = self.client.post('/api/orders/guest/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.perfumes[0].refresh_from_db()
+        self.assertEqual(self.perfumes[0].stock, 97)
+    
+    def _checkout_queries(self, size):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        for perfume in self.perfumes[:size]:
+            CartItem.objects.create(cart=cart, perfume=perfume, quantity=1)
+        request = APIRequestFactory().post('/api/orders/')
+        request.user = self.user
+        payload = {'payment_method': 'mobile_money', 'subtotal': '50.00', 'tax': '5.00', 'shipping': '0.00', 'total': '55.00'}
+        serializer = OrderCreateSerializer(data=payload, context={'request': request})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as context:
+            serializer.save()
+        self.assertFalse(cart.items.exists())
+        return len(context.captured_queries)
+    
+    def test_cart_checkout_query_count_is_constant(self):
+        self.assertEqual(self._checkout_queries(1), self._checkout_queries(20))
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .events import issue_ticket, prune_events
+from .models import Order, OrderEvent
+from .state_machine import transition
+
+User = get_user_model()
+
+
+def parse_stream(body):
+    """(id, payload) of every `order` event in an SSE body"""
+    events = []
+    for frame in body.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.split('\n') if ': ' in line and not line.startswith(':'))
+        if fields.get('event') == 'order':
+            events.append((int(fields['id']), json.loads(fields['data'])))
+    return events
+
+
+@override_settings(ORDER_EVENTS_POLL_INTERVAL=0.02, ORDER_EVENTS_HEARTBEAT=0.1, ORDER_EVENTS_MAX_AGE=0.6)
+class OrderEventsTest(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email='admin@example.com', password='adminpass123', first_name='Admin', last_name='User'
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='testpass123', first_name='Jane', last_name='Doe'
+        )
+        self.other = User.objects.create_user(email='other@example.com', password='testpass123')
+
+    def make_order(self, user):
+        return Order.objects.create(
+            user=user, payment_method='mobile_money', subtotal=Decimal('100.00'), tax=Decimal('10.00'),
+            shipping=Decimal('0.00'), total=Decimal('110.00')
+        )
+
+    def test_changes_are_written_to_the_outbox(self):
+        order = self.make_order(self.customer)
+        transition(order, 'C')
+        client = APIClient()
+        client.force_authenticate(user=self.admin_user)
+        client.patch(f'/api/orders/{order.id}/update_payment_status/', {'payment_status': True}, format='json')
+        order.guest_notes = 'Untracked field'
+        order.save()
+
+        events = list(OrderEvent.objects.filter(order=order).values_list('kind', 'payload'))
+        self.assertEqual([(kind, payload['changed']) for kind, payload in events],
+                         [('created', []), ('updated', ['status']), ('updated', ['payment_status'])])
+        self.assertEqual((events[1][1]['status'], events[1][1]['status_display']), ('C', 'Confirmed'))
+        self.assertEqual((events[2][1]['status'], events[2][1]['payment_status']), ('C', True))
+        self.assertEqual(OrderEvent.objects.filter(order=order).values('user').distinct().get()['user'],
+                         self.customer.id)
+
+    def test_admin_bulk_payment_actions_are_published(self):
+        paid, unpaid = self.make_order(self.customer), self.make_order(self.other)
+        Order.objects.filter(pk=paid.pk).update(payment_status=True)
+        self.client.force_login(self.admin_user)
+        response = self.client.post('/admin/orders/order/', {
+            'action': 'mark_payment_paid', '_selected_action': [paid.pk, unpaid.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+
+        unpaid.refresh_from_db()
+        self.assertTrue(unpaid.payment_status)
+        # Only the order that changed gets an event
+        event = OrderEvent.objects.get(kind=OrderEvent.UPDATED)
+        self.assertEqual((event.order_id, event.user_id), (unpaid.pk, self.other.pk))
+        self.assertEqual((event.payload['changed'], event.payload['payment_status']), (['payment_status'], True))
+        self.assertEqual(event.payload['updated_at'], unpaid.updated_at.isoformat())
+
+    def test_rolled_back_changes_publish_nothing(self):
+        order = self.make_order(self.customer)
+        try:
+            with transaction.atomic():
+                transition(order, 'X')
+                raise RuntimeError('abort')
+        except RuntimeError:
+            pass
+        self.assertEqual(list(OrderEvent.objects.values_list('kind', flat=True)), ['created'])
+
+    def test_old_events_are_pruned(self):
+        old, recent = self.make_order(self.customer), self.make_order(self.other)
+        OrderEvent.objects.filter(order=old).update(created_at=timezone.now() - timedelta(days=2))
+        with self.settings(ORDER_EVENTS_RETENTION=24 * 60 * 60):
+            self.assertEqual(prune_events(), 1)
+        self.assertEqual(list(OrderEvent.objects.values_list('order', flat=True)), [recent.pk])
+        self.assertIn('orders.events.prune_events', settings.JOBS_PERIODIC)
+
+    def test_stream_requires_a_valid_ticket(self):
+        self.assertEqual(self.client.get('/api/orders/stream/').status_code, 401)
+        self.assertEqual(self.client.get('/api/orders/stream/', {'ticket': 'garbage'}).status_code, 401)
+        # Access tokens are not accepted in the URL, where logs would keep them
+        token = str(AccessToken.for_user(self.customer))
+        self.assertEqual(self.client.get('/api/orders/stream/', {'token': token}).status_code, 401)
+        self.assertEqual(self.client.get('/api/orders/stream/', {'ticket': token}).status_code, 401)
+
+        client = APIClient()
+        self.assertEqual(client.post('/api/orders/stream_ticket/').status_code, 401)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = client.post('/api/orders/stream_ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['expires_in'], 30)
+        self.assertEqual(self.client.get('/api/orders/stream/', {'ticket': response.data['ticket']}).status_code, 200)
+        # Single use
+        self.assertEqual(self.client.get('/api/orders/stream/', {'ticket': response.data['ticket']}).status_code, 401)
+
+        stale = int(time.time()) - 31
+        with mock.patch.object(signing.TimestampSigner, 'timestamp', return_value=signing.b62_encode(stale)):
+            expired = issue_ticket(self.customer)
+        self.assertEqual(self.client.get('/api/orders/stream/', {'ticket': expired}).status_code, 401)
+
+    async def read_stream(self, user, last_event_id=None, during=None):
+        headers = {'Last-Event-ID': str(last_event_id)} if last_event_id is not None else {}
+        response = await self.async_client.get(
+            '/api/orders/stream/', {'ticket': issue_ticket(user)}, headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        task = asyncio.ensure_future(during()) if during else None
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        if task:
+            await task
+        return body
+
+    async def test_replay_is_scoped_to_the_user(self):
+        mine = await sync_to_async(self.make_order)(self.customer)
+        theirs = await sync_to_async(self.make_order)(self.other)
+        await sync_to_async(transition)(mine, 'C')
+
+        body = await self.read_stream(self.customer, last_event_id=0)
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn(': ping', body)
+        events = parse_stream(body)
+        self.assertEqual([(payload['id'], payload['kind']) for _, payload in events],
+                         [(mine.id, 'created'), (mine.id, 'updated')])
+
+        # Staff see every order; replay starts after Last-Event-ID
+        events = parse_stream(await self.read_stream(self.admin_user, last_event_id=events[0][0]))
+        self.assertEqual({payload['id'] for _, payload in events}, {mine.id, theirs.id})
+        self.assertEqual(len(events), 2)
+
+    async def test_live_changes_are_pushed(self):
+        mine = await sync_to_async(self.make_order)(self.customer)
+        theirs = await sync_to_async(self.make_order)(self.other)
+
+        async def change():
+            await asyncio.sleep(0.1)
+            await sync_to_async(transition)(theirs, 'C')
+            await sync_to_async(transition)(mine, 'C')
+
+        # Without Last-Event-ID only changes made while connected arrive
+        events = parse_stream(await self.read_stream(self.customer, during=change))
+        self.assertEqual([(payload['id'], payload['status']) for _, payload in events], [(mine.id, 'C')])
@@ -0,0 +1,106 @@
+import threading
+import time
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from .models import Order, OrderNumberSequence
+from .numbering import SEQUENCE_NAME, allocator
+
+
+def create_order(**kwargs):
+    return Order.objects.create(
+        payment_method='cash_on_delivery',
+        subtotal='100.00', tax='10.00', shipping='0.00', total='110.00',
+        guest_name='Guest User', guest_email='guest@test.com',
+        **kwargs
+    )
+
+
+class OrderNumberAllocatorTest(TestCase):
+    def setUp(self):
+        allocator.reset()
+
+    def tearDown(self):
+        allocator.reset()
+
+    def test_numbers_are_unique_and_increasing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            orders = [create_order() for _ in range(5)]
+        numbers = [order.order_number for order in orders]
+        self.assertEqual(len(set(numbers)), 5)
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertTrue(all(number.startswith('ORD-') for number in numbers))
+
+    def test_committed_block_serves_later_orders_without_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_order()
+        with CaptureQueriesContext(connection) as context:
+            create_order()
+        # The order and its outbox event (OrderEvent), nothing for the number
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertIn('INSERT INTO "orders_order"', context.captured_queries[0]['sql'])
+        self.assertIn('INSERT INTO "orders_orderevent"', context.captured_queries[1]['sql'])
+
+    def test_rolled_back_block_is_not_reused(self):
+        before = OrderNumberSequence.objects.filter(name=SEQUENCE_NAME).values_list('next_value', flat=True).first()
+        try:
+            with transaction.atomic():
+                create_order()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        after = OrderNumberSequence.objects.filter(name=SEQUENCE_NAME).values_list('next_value', flat=True).first()
+        self.assertEqual(before, after)
+        self.assertEqual(allocator._blocks, [])
+
+    def test_forked_worker_discards_parent_blocks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_order()
+        self.assertTrue(allocator._blocks)
+        allocator._pid = -1
+        with self.captureOnCommitCallbacks(execute=True):
+            create_order()
+        self.assertEqual(len(allocator._blocks), 1)
+
+    def test_explicit_order_number_is_kept(self):
+        self.assertEqual(create_order(order_number='MANUAL-1').order_number, 'MANUAL-1')
+
+
+class OrderNumberContentionTest(TransactionTestCase):
+    """Parallel checkouts must never be handed the same order number"""
+
+    threads = 8
+    orders_per_thread = 60
+
+    def setUp(self):
+        allocator.reset()
+
+    def tearDown(self):
+        allocator.reset()
+
+    def _create_orders(self, numbers):
+        try:
+            for _ in range(self.orders_per_thread):
+                while True:
+                    try:
+                        numbers.append(create_order().order_number)
+                        break
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; retry like a client would
+                        time.sleep(0.001)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    def test_parallel_inserts_get_unique_numbers(self):
+        numbers = []
+        workers = [threading.Thread(target=self._create_orders, args=(numbers,)) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        total = self.threads * self.orders_per_thread
+        self.assertEqual(len(numbers), total)
+        self.assertEqual(len(set(numbers)), total)
+        self.assertEqual(Order.objects.count(), total)
@@ -0,0 +1,105 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from perfumes.models import Perfume, PerfumeImage, Category, Brand
+from users.models import Address
+from .models import Order, OrderItem
+
+User = get_user_model()
+
+
+class OrderQueryBudgetTest(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email='admin@example.com', password='adminpass123', first_name='Admin', last_name='User'
+        )
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='testpass123', first_name='Jane', last_name='Doe'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        self.category = Category.objects.create(name='Test Category', slug='test-category')
+        self.brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.address = Address.objects.create(
+            user=self.customer, address_type='S', street_address='1 Main St', city='Nairobi',
+            state='Nairobi', country='Kenya', zip_code='00100'
+        )
+        self.perfume_count = 0
+
+    def make_perfume(self):
+        self.perfume_count += 1
+        perfume = Perfume.objects.create(
+            name=f'Perfume {self.perfume_count}', brand=self.brand, category=self.category,
+            price=Decimal('50.00'), stock=100
+        )
+        PerfumeImage.objects.bulk_create([
+            PerfumeImage(perfume=perfume, image=f'perfumes/gallery/{self.perfume_count}-{n}.jpg') for n in range(2)
+        ])
+        return perfume
+
+    def make_order(self, lines, **kwargs):
+        defaults = {'user': self.customer, 'shipping_address': self.address, 'billing_address': self.address}
+        if kwargs.get('guest_name'):
+            defaults = {}
+        order = Order.objects.create(
+            payment_method='cash_on_delivery', subtotal=Decimal('100.00'), tax=Decimal('0.00'),
+            shipping=Decimal('0.00'), total=Decimal('100.00'), **defaults, **kwargs
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, perfume=self.make_perfume(), price=Decimal('50.00'), quantity=2)
+            for _ in range(lines)
+        ])
+        return order
+
+    def test_list_rows_are_computed_in_sql(self):
+        self.make_order(3)
+        self.make_order(1, guest_name='Walk-in Guest', guest_email='guest@example.com')
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get('/api/orders/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        guest, customer = response.data['results']
+        self.assertEqual((customer['customer_name'], customer['customer_email'], customer['item_count']),
+                         ('Jane Doe', 'customer@example.com', 3))
+        self.assertEqual((guest['customer_name'], guest['customer_email'], guest['item_count']),
+                         ('Walk-in Guest', 'guest@example.com', 1))
+        self.assertNotIn('items', customer)
+
+    def test_list_query_budget_is_constant(self):
+        for _ in range(2):
+            self.make_order(2)
+        with self.assertNumQueries(2):
+            self.client.get('/api/orders/')
+        for _ in range(8):
+            self.make_order(5)
+            self.make_order(1, guest_name='Guest')
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/orders/')
+        self.assertEqual(len(response.data['results']), 10)
+
+        with self.assertNumQueries(1):  # cursor mode skips the count
+            self.client.get('/api/orders/', {'cursor': ''})
+
+    def test_detail_query_budget_is_constant(self):
+        small = self.make_order(1)
+        large = self.make_order(10)
+        # order + lines (with perfume and brand joined)
+        for order in (small, large):
+            with self.assertNumQueries(2):
+                response = self.client.get(f'/api/orders/{order.id}/')
+        self.assertEqual(len(response.data['items']), 10)
+        self.assertEqual(response.data['shipping_address_details']['city'], 'Nairobi')
+
+        # ?expand=perfume adds one query for the perfumes' images
+        for order in (small, large):
+            with self.assertNumQueries(3):
+                response = self.client.get(f'/api/orders/{order.id}/', {'expand': 'perfume'})
+        self.assertEqual(len(response.data['items'][0]['perfume_details']['images']), 2)
+
+    def test_customer_sees_own_orders_only(self):
+        self.make_order(1)
+        self.make_order(1, guest_name='Guest')
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get('/api/orders/')
+        self.assertEqual([order['customer_name'] for order in response.data['results']], ['Jane Doe'])
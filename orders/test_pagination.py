@@ -0,0 +1,57 @@
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import Order
+
+User = get_user_model()
+
+class OrderCursorPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(
+            email='admin@test.com',
+            first_name='Admin',
+            last_name='User',
+            password='testpass123',
+            is_staff=True
+        )
+        self.client.force_authenticate(user=self.admin_user)
+        
+        for i in range(25):
+            Order.objects.create(
+                user=self.admin_user,
+                payment_method='mobile_money',
+                subtotal=Decimal('50.00'),
+                tax=Decimal('5.00'),
+                shipping=Decimal('0.00'),
+                total=Decimal('55.00')
+            )
+    
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/orders/', {'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+    
+    def test_cursor_mode_walks_every_order_once(self):
+        seen = []
+        url = '/api/orders/?cursor='
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(order['id'] for order in response.data['results'])
+            url = response.data['next']
+        
+        expected = list(Order.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+    
+    def test_cursor_mode_does_not_count(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/orders/', {'cursor': ''})
+        # The rows carry a per-order line count; the paginator's total count query must not run
+        self.assertFalse(any(query['sql'].startswith('SELECT COUNT(') for query in context.captured_queries))
@@ -0,0 +1,147 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework import status
+from perfumes.models import Perfume, Category, Brand
+from users.models import Address
+from . import pricing
+from .models import Cart, CartItem, Order, ShippingRate, TaxRate
+from .test_inventory import guest_order_payload
+
+User = get_user_model()
+
+
+class PricingTest(TestCase):
+    def setUp(self):
+        pricing.invalidate_rates()
+        self.client = APIClient()
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.full_price = Perfume.objects.create(
+            name='Full Price', brand=brand, category=category, price=Decimal('50.00'), stock=10
+        )
+        self.discounted = Perfume.objects.create(
+            name='Discounted', brand=brand, category=category, price=Decimal('80.00'),
+            discount_price=Decimal('60.00'), stock=10
+        )
+        self.user = User.objects.create_user(
+            email='user@test.com', first_name='Regular', last_name='User', password='testpass123'
+        )
+
+    def set_rates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ShippingRate.objects.create(province='', fee=Decimal('5.00'))
+            ShippingRate.objects.create(province='Northern', fee=Decimal('12.00'), free_over=Decimal('200.00'))
+            TaxRate.objects.create(province='', rate=Decimal('0.1800'))
+            TaxRate.objects.create(province='Northern', rate=Decimal('0.0500'))
+
+    def quote(self, payload):
+        response = self.client.post('/api/orders/quote/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def items(self, *lines):
+        return [{'perfume_id': perfume.id, 'quantity': quantity} for perfume, quantity in lines]
+
+    def test_defaults_without_rate_tables(self):
+        # 10% tax and free delivery, as checkout charged before the rate tables existed
+        data = self.quote({'items': self.items((self.full_price, 1), (self.discounted, 2))})
+        self.assertEqual((data['subtotal'], data['shipping'], data['tax'], data['total']),
+                         ('170.00', '0.00', '17.00', '187.00'))
+        self.assertEqual([line['unit_price'] for line in data['lines']], ['50.00', '60.00'])
+        self.assertEqual(data['lines'][1]['total'], '120.00')
+
+    def test_province_rates(self):
+        self.set_rates()
+        data = self.quote({'items': self.items((self.full_price, 1)), 'province': '  northern '})
+        self.assertEqual((data['shipping'], data['tax_rate'], data['tax'], data['total']),
+                         ('12.00', '0.0500', '2.50', '64.50'))
+        # Free delivery from the province's threshold
+        data = self.quote({'items': self.items((self.full_price, 4)), 'province': 'Northern'})
+        self.assertEqual((data['subtotal'], data['shipping']), ('200.00', '0.00'))
+        # Other provinces fall back to the default rows
+        data = self.quote({'items': self.items((self.full_price, 1)), 'province': 'Kigali'})
+        self.assertEqual((data['shipping'], data['tax'], data['total']), ('5.00', '9.00', '64.00'))
+
+    def test_rate_changes_invalidate_the_cache(self):
+        self.quote({'items': self.items((self.full_price, 1))})
+        self.set_rates()
+        self.assertEqual(self.quote({'items': self.items((self.full_price, 1))})['tax'], '9.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            TaxRate.objects.filter(province='').delete()
+        self.assertEqual(self.quote({'items': self.items((self.full_price, 1))})['tax'], '5.00')
+
+    def test_quote_query_budget(self):
+        pricing.get_rates()
+        perfumes = [
+            Perfume.objects.create(name=f'Perfume {n}', brand=self.full_price.brand,
+                                   category=self.full_price.category, price=Decimal('10.00'), stock=5)
+            for n in range(10)
+        ]
+        with self.assertNumQueries(1):
+            self.quote({'items': self.items(*[(perfume, 1) for perfume in perfumes])})
+
+    def test_signed_in_quote_prices_the_cart(self):
+        self.set_rates()
+        address = Address.objects.create(
+            user=self.user, address_type='S', street_address='1 Main St', city='Musanze',
+            state='Northern', country='Rwanda', zip_code='00000'
+        )
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, perfume=self.discounted, quantity=1)
+        self.client.force_authenticate(user=self.user)
+        data = self.quote({'shipping_address': address.id})
+        self.assertEqual((data['province'], data['subtotal'], data['shipping'], data['total']),
+                         ('Northern', '60.00', '12.00', '75.00'))
+
+        other = User.objects.create_user(email='other@test.com', password='testpass123')
+        foreign = Address.objects.create(
+            user=other, address_type='S', street_address='2 Main St', city='Huye',
+            state='Southern', country='Rwanda', zip_code='00000'
+        )
+        response = self.client.post('/api/orders/quote/', {'shipping_address': foreign.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_quotes(self):
+        cases = [
+            {},  # guests must send their lines
+            {'items': [{'perfume_id': 999999, 'quantity': 1}]},
+            {'items': [{'perfume_id': self.full_price.id, 'quantity': 0}]},
+        ]
+        for payload in cases:
+            response = self.client.post('/api/orders/quote/', payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+
+    def test_checkout_ignores_client_totals(self):
+        self.set_rates()
+        payload = guest_order_payload((self.full_price, 1), (self.discounted, 1))
+        payload.update(subtotal='1.00', tax='0.00', shipping='0.00', total='1.00', guest_province='Northern')
+        response = self.client.post('/api/orders/guest/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual((order.subtotal, order.shipping, order.tax, order.total),
+                         (Decimal('110.00'), Decimal('12.00'), Decimal('5.50'), Decimal('127.50')))
+        self.assertEqual(order.items.get(perfume=self.discounted).price, Decimal('60.00'))
+
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, perfume=self.full_price, quantity=2)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/orders/', {'payment_method': 'mobile_money', 'total': '1.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.filter(user=self.user).get()
+        self.assertEqual((order.subtotal, order.shipping, order.tax, order.total),
+                         (Decimal('100.00'), Decimal('5.00'), Decimal('18.00'), Decimal('123.00')))
+
+    def test_customer_cannot_rewrite_totals_or_payment(self):
+        self.client.force_authenticate(user=self.user)
+        order = Order.objects.create(
+            user=self.user, payment_method='mobile_money', subtotal=Decimal('100.00'), tax=Decimal('18.00'),
+            shipping=Decimal('5.00'), total=Decimal('123.00')
+        )
+        payload = {'subtotal': '1.00', 'tax': '0.00', 'shipping': '0.00', 'total': '1.00', 'payment_status': True}
+        self.client.patch(f'/api/orders/{order.id}/', payload, format='json')
+        self.client.put(f'/api/orders/{order.id}/', {**payload, 'payment_method': 'mobile_money'}, format='json')
+        order.refresh_from_db()
+        self.assertEqual((order.subtotal, order.tax, order.shipping, order.total, order.payment_status),
+                         (Decimal('100.00'), Decimal('18.00'), Decimal('5.00'), Decimal('123.00'), False))
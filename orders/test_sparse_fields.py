@@ -0,0 +1,51 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from perfumes.models import Perfume, Category, Brand
+from .models import Order, OrderItem
+
+User = get_user_model()
+
+
+class OrderSparseFieldsetTest(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email='admin@example.com', password='adminpass123', first_name='Admin', last_name='User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin_user)
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        perfume = Perfume.objects.create(
+            name='Test Perfume', brand=brand, category=category, price=Decimal('50.00'), stock=10
+        )
+        for i in range(3):
+            order = Order.objects.create(
+                user=self.admin_user, payment_method='cash_on_delivery', guest_notes='Leave at the door',
+                subtotal=Decimal('100.00'), tax=Decimal('10.00'), shipping=Decimal('0.00'), total=Decimal('110.00'),
+            )
+            OrderItem.objects.create(order=order, perfume=perfume, price=Decimal('50.00'), quantity=2)
+
+    def test_table_fields_skip_items_and_unused_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/orders/', {'fields': 'id,order_number,status,total'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'order_number', 'status', 'total'})
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('orders_orderitem', sql)
+        self.assertNotIn('"guest_notes"', sql)
+
+    def test_omit_nested_field(self):
+        order = Order.objects.first()
+        response = self.client.get(f'/api/orders/{order.id}/', {'omit': 'items.perfume_details'})
+        item = response.data['items'][0]
+        self.assertNotIn('perfume_details', item)
+        self.assertEqual(item['quantity'], 2)
+
+    def test_user_fields(self):
+        response = self.client.get('/api/users/profile/me/', {'fields': 'id,email'})
+        self.assertEqual(response.data, {'id': self.admin_user.id, 'email': 'admin@example.com'})
@@ -0,0 +1,105 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from perfumes.models import Perfume, Category, Brand
+from .models import Order, OrderItem
+from .state_machine import IllegalTransition, transition
+
+User = get_user_model()
+
+
+class OrderStateMachineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='customer@example.com', password='testpass123', first_name='Test', last_name='User'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        brand = Brand.objects.create(name='Test Brand', slug='test-brand')
+        self.rose = Perfume.objects.create(
+            name='Rose', brand=brand, category=category, price=Decimal('50.00'), stock=5
+        )
+        self.oud = Perfume.objects.create(
+            name='Oud', brand=brand, category=category, price=Decimal('80.00'), stock=1
+        )
+        self.order = Order.objects.create(
+            user=self.user, order_number='SM001', status='P', payment_method='cash_on_delivery',
+            subtotal=Decimal('180.00'), tax=Decimal('0.00'), shipping=Decimal('0.00'), total=Decimal('180.00'),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=self.order, perfume=self.rose, price=Decimal('50.00'), quantity=2),
+            OrderItem(order=self.order, perfume=self.oud, price=Decimal('80.00'), quantity=1),
+        ])
+
+    def assertStock(self, rose, oud):
+        self.rose.refresh_from_db()
+        self.oud.refresh_from_db()
+        self.assertEqual((self.rose.stock, self.oud.stock), (rose, oud))
+
+    def test_cancel_restocks_every_line_once(self):
+        self.assertTrue(transition(self.order, 'X'))
+        self.assertStock(7, 2)
+        self.assertFalse(transition(self.order, 'X'))
+        self.assertStock(7, 2)
+
+    def test_cancel_restock_is_a_single_statement(self):
+        with CaptureQueriesContext(connection) as context:
+            transition(self.order, 'X')
+        perfume_updates = [query for query in context.captured_queries
+                           if query['sql'].startswith('UPDATE "perfumes_perfume"')]
+        self.assertEqual(len(perfume_updates), 1)
+
+    def test_replay_with_stale_instance_does_nothing(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        transition(self.order, 'X')
+        with CaptureQueriesContext(connection) as context:
+            self.assertFalse(transition(stale, 'X'))
+        self.assertFalse(any(query['sql'].startswith('UPDATE "perfumes_perfume"') for query in context.captured_queries))
+        self.assertStock(7, 2)
+
+    def test_stale_instance_cannot_cancel_confirmed_order(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        transition(self.order, 'C')
+        with self.assertRaises(IllegalTransition):
+            transition(stale, 'X')
+        self.assertStock(5, 1)
+
+    def test_delivery_does_not_touch_stock(self):
+        for target in ('C', 'S', 'D'):
+            transition(self.order, target)
+        self.assertStock(5, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'D')
+
+    def test_illegal_transitions_are_rejected(self):
+        with self.assertRaises(IllegalTransition):
+            transition(self.order, 'S')
+        transition(self.order, 'C')
+        with self.assertRaises(IllegalTransition):
+            transition(self.order, 'X')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'C')
+
+    def test_cancel_endpoint_is_idempotent(self):
+        url = f'/api/orders/{self.order.id}/cancel/'
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'X')
+        self.assertStock(7, 2)
+
+    def test_cancel_endpoint_rejects_confirmed_order(self):
+        transition(self.order, 'C')
+        response = self.client.post(f'/api/orders/{self.order.id}/cancel/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertStock(5, 1)
+
+    def test_generic_update_cannot_change_status(self):
+        self.client.patch(f'/api/orders/{self.order.id}/', {'status': 'D'}, format='json')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'P')
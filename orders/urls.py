@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import events, views
 
 router = DefaultRouter()
 router.register('cart', views.CartViewSet, basename='cart')
 router.register('', views.OrderViewSet, basename='order')
 
 urlpatterns = [
+    # Before the router, whose detail route would take "stream" for an order id
+    path('stream/', events.order_stream, name='order-stream'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
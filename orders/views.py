@@ -2,13 +2,19 @@ from rest_framework import viewsets, generics, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from perfumes_project.mixins import SparseFieldsetMixin
+from perfumes_project.pagination import HybridPagination
+from perfumes_project.serializers import get_expanded
+from . import dashboard, events
 from .models import Order, OrderItem, Cart, CartItem
+from .state_machine import IllegalTransition, transition
 from perfumes.models import Perfume
 from .serializers import (
-    OrderSerializer, OrderItemSerializer, CartSerializer,
+    OrderSerializer, OrderListSerializer, OrderItemSerializer, CartSerializer,
     CartItemSerializer, OrderCreateSerializer, GuestOrderCreateSerializer,
-    PaymentStatusUpdateSerializer
+    PaymentStatusUpdateSerializer, CartBatchSerializer, QuoteRequestSerializer
 )
 
 class CartViewSet(viewsets.GenericViewSet):
@@ -23,9 +29,20 @@ class CartViewSet(viewsets.GenericViewSet):
         cart, created = Cart.objects.get_or_create(user=self.request.user)
         return cart
     
+    @property
+    def expand_perfume(self):
+        return 'perfume' in get_expanded(self.request)
+    
+    def cart_response(self, cart):
+        """Re-read the cart with SQL totals and prefetched lines, then serialize it"""
+        cart = Cart.objects.with_totals(self.expand_perfume).get(pk=cart.pk)
+        serializer = self.get_serializer(cart)
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def my_cart(self, request):
-        cart = self.get_object()
+        # A brand-new cart has no annotations; its empty totals are computed on access
+        cart, created = Cart.objects.with_totals(self.expand_perfume).get_or_create(user=request.user)
         serializer = self.get_serializer(cart)
         return Response(serializer.data)
     
@@ -73,8 +90,7 @@ class CartViewSet(viewsets.GenericViewSet):
                 )
             cart_item.save()
         
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return self.cart_response(cart)
     
     @action(detail=False, methods=['post'])
     def update_item(self, request):
@@ -93,8 +109,7 @@ class CartViewSet(viewsets.GenericViewSet):
         if quantity <= 0:
             # Remove item if quantity is zero or negative
             cart_item.delete()
-            serializer = CartSerializer(cart)
-            return Response(serializer.data)
+            return self.cart_response(cart)
         
         # Check if requested quantity is available
         if quantity > cart_item.perfume.stock:
@@ -106,8 +121,7 @@ class CartViewSet(viewsets.GenericViewSet):
         cart_item.quantity = quantity
         cart_item.save()
         
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return self.cart_response(cart)
     
     @action(detail=False, methods=['post'])
     def remove_item(self, request):
@@ -123,23 +137,34 @@ class CartViewSet(viewsets.GenericViewSet):
             )
         
         cart_item.delete()
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return self.cart_response(cart)
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Apply a list of operations in one transaction and return the cart once:
+        {"operations": [{"op": "add" | "set" | "remove", "perfume_id": 1, "quantity": 2}, ...]}
+        """
+        cart = self.get_object()
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(cart=cart)
+        return self.cart_response(cart)
     
     @action(detail=False, methods=['post'])
     def clear(self, request):
         cart = self.get_object()
         cart.items.all().delete()
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return self.cart_response(cart)
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_status']
     search_fields = ['id', 'user__first_name', 'user__last_name', 'user__email']
-    ordering_fields = ['created_at', 'total']
+    ordering_fields = ['created_at', 'total', 'status', 'customer_name', 'item_count']
+    pagination_class = HybridPagination
     
     def get_queryset(self):
         user = self.request.user
@@ -149,12 +174,21 @@ class OrderViewSet(viewsets.ModelViewSet):
         order_id = self.request.query_params.get('order_id')
         if order_id:
             queryset = queryset.filter(id__icontains=order_id)
-            
+        
+        if self.action == 'list':
+            # Annotations are needed for the columns rendered and the ones sorted on
+            ordering = self.request.query_params.get('ordering', '')
+            fields = set(self.get_serializer().fields) | {name.strip().lstrip('-') for name in ordering.split(',')}
+            queryset = queryset.for_list(fields)
+        else:
+            queryset = queryset.for_detail('perfume' in get_expanded(self.request))
         return queryset.order_by('-created_at')
     
     def get_serializer_class(self):
         if self.action == 'create':
             return OrderCreateSerializer
+        if self.action == 'list':
+            return OrderListSerializer
         return OrderSerializer
     
     def perform_create(self, serializer):
@@ -164,27 +198,19 @@ class OrderViewSet(viewsets.ModelViewSet):
     def cancel(self, request, pk=None):
         order = self.get_object()
         
-        # Only pending orders can be cancelled
-        if order.status != 'P':
+        # Only pending orders can be cancelled; cancelling twice is a no-op
+        try:
+            transition(order, 'X')
+        except IllegalTransition:
             return Response(
                 {"detail": "Only pending orders can be cancelled"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update order status
-        order.status = 'X'
-        order.save()
-        
-        # Return stock to inventory
-        for item in order.items.all():
-            perfume = item.perfume
-            perfume.stock += item.quantity
-            perfume.save()
-        
         serializer = self.get_serializer(order)
         return Response(serializer.data)
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def update_order_status(self, request, pk=None):
         """Update the status of an order"""
         order = self.get_object()
@@ -205,14 +231,16 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update order status (inventory reduction is handled in the model's save method)
-        order.status = new_status
-        order.save()
+        # Inventory effects of the move run inside the transition
+        try:
+            transition(order, new_status)
+        except IllegalTransition as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = self.get_serializer(order)
         return Response(serializer.data)
     
-    @action(detail=True, methods=['patch'])
+    @action(detail=True, methods=['patch'], permission_classes=[permissions.IsAdminUser])
     def update_payment_status(self, request, pk=None):
         """Update the payment status of an order"""
         order = self.get_object()
@@ -224,11 +252,48 @@ class OrderViewSet(viewsets.ModelViewSet):
         # Update payment status
         payment_status = serializer.validated_data['payment_status']
         order.payment_status = payment_status
-        order.save()
+        order.save(update_fields=['payment_status', 'updated_at'])
         
         serializer = self.get_serializer(order)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def dashboard(self, request):
+        """
+        Admin dashboard figures computed in the database: order counts by status
+        and payment state, revenue, customers and growth over the last ?days=
+        (default 30, at most 365) against the period before, plus the latest orders.
+        """
+        try:
+            days = int(request.query_params.get('days', dashboard.DEFAULT_DAYS))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        days = min(max(days, 1), dashboard.MAX_DAYS)
+        recent = OrderListSerializer(dashboard.recent_orders(), many=True, context=self.get_serializer_context())
+        return Response({
+            'orders': dashboard.order_stats(days),
+            'customers': dashboard.customer_stats(days),
+            'recent_orders': recent.data,
+        })
+    
+    @action(detail=False, methods=['post'], permission_classes=[])
+    def quote(self, request):
+        """
+        Preview checkout totals without placing an order:
+        {"items": [{"perfume_id": 1, "quantity": 2}], "province": "Kigali"}
+        """
+        serializer = QuoteRequestSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.get_quote().as_dict())
+    
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """Short-lived single-use ticket for GET /api/orders/stream/?ticket="""
+        return Response({
+            'ticket': events.issue_ticket(request.user),
+            'expires_in': getattr(settings, 'ORDER_EVENTS_TICKET_MAX_AGE', 30),
+        })
+    
     @action(detail=False, methods=['post'], permission_classes=[])
     def guest(self, request):
         """
@@ -0,0 +1,153 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+VERSION_KEY = 'catalog:version'
+# When the version was last bumped: Last-Modified of every catalog response
+MODIFIED_KEY = 'catalog:modified'
+# Bumped only when names change (perfumes.suggest), not on stock or price updates
+NAMES_VERSION_KEY = 'catalog:names:version'
+HITS_KEY = 'catalog:stats:hits'
+MISSES_KEY = 'catalog:stats:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _incr(key, initial):
+    """Increment a counter, (re)initialising it if the backend evicted it"""
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, initial, timeout=None)
+        return cache.get(key, initial)
+
+
+def _initial_version():
+    # Seed from the clock so a counter lost to eviction never reuses an old version
+    return int(time.time() * 1000)
+
+
+def _get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_catalog_version():
+    return _get_version(VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response"""
+    version = _incr(VERSION_KEY, _initial_version())
+    get_cache().set(MODIFIED_KEY, time.time(), timeout=None)
+    return version
+
+
+def get_catalog_modified():
+    """
+    Unix time of the last catalog change. Covers what no row's updated_at
+    shows: deleted or deactivated perfumes, renamed brands and categories,
+    image changes. Unknown (never bumped or evicted) counts as now.
+    """
+    cache = get_cache()
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        cache.add(MODIFIED_KEY, time.time(), timeout=None)
+        modified = cache.get(MODIFIED_KEY)
+    return modified
+
+
+def get_names_version():
+    return _get_version(NAMES_VERSION_KEY)
+
+
+def bump_names_version():
+    """Invalidate every process's suggest index"""
+    return _incr(NAMES_VERSION_KEY, _initial_version())
+
+
+def get_cache_stats():
+    cache = get_cache()
+    return {
+        'version': get_catalog_version(),
+        'hits': cache.get(HITS_KEY, 0),
+        'misses': cache.get(MISSES_KEY, 0),
+    }
+
+
+def reset_cache_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def normalize_query_params(query_params):
+    """Order-independent, blank-free encoding of the request query string"""
+    items = []
+    for key in sorted(query_params.keys()):
+        for value in sorted(query_params.getlist(key)):
+            if value != '':
+                items.append((key, value))
+    return urlencode(items)
+
+
+def catalog_cache_key(request, prefix):
+    """Cache key for a catalog request, scoped to the current catalog version"""
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        normalize_query_params(request.query_params),
+    ])
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'catalog:{get_catalog_version()}:{prefix}:{digest}'
+
+
+class CatalogCacheMixin:
+    """Read-through cache for public catalog reads, invalidated by the catalog version counter"""
+    cached_actions = ('list', 'retrieve', 'featured', 'on_sale')
+
+    def get_cache_key(self, request):
+        return catalog_cache_key(request, f'{self.basename}:{self.action}')
+
+    def should_cache(self, request):
+        # Staff see inactive products, so their responses are never shared
+        return (
+            request.method == 'GET'
+            and self.action in self.cached_actions
+            and not request.user.is_staff
+        )
+
+    def cached_response(self, request, build_response):
+        if not self.should_cache(request):
+            return build_response()
+
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            _incr(HITS_KEY, 1)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _incr(MISSES_KEY, 1)
+        response = build_response()
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,34 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose entries live in one process's memory
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register()
+def catalog_cache_is_shared(app_configs, **kwargs):
+    """
+    The catalog version (perfumes.cache) must live in a cache every process
+    sees once more than one process bumps it: several web workers
+    (WEB_CONCURRENCY), or a job worker building image derivatives. Otherwise a
+    bump in one process never invalidates the responses cached by another.
+    """
+    alias = getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    processes = []
+    if int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+        processes.append('WEB_CONCURRENCY > 1')
+    if getattr(settings, 'IMAGE_DERIVATIVES_IN_BACKGROUND', False):
+        processes.append('IMAGE_DERIVATIVES_IN_BACKGROUND')
+    if not processes:
+        return []
+    return [Error(
+        f'The catalog cache "{alias}" is local to each process, but {" and ".join(processes)} '
+        'means the catalog version is bumped from several processes.',
+        hint='Set REDIS_URL (or point CATALOG_CACHE_ALIAS at another shared cache).',
+        id='perfumes.E001',
+    )]
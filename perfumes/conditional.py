@@ -0,0 +1,85 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .cache import get_cache, catalog_cache_key, get_catalog_modified, get_catalog_version, normalize_query_params
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag / Last-Modified support for catalog viewsets.
+
+    The ETag comes from the catalog version and one aggregate query
+    (max(updated_at) and row count) over the filtered queryset; Last-Modified
+    is the time of the last catalog version bump, since a result set's own
+    max(updated_at) misses rows that left it and changes to related rows. A
+    matching If-None-Match or If-Modified-Since is answered with 304 before
+    any serialization happens.
+    """
+    conditional_actions = ('list', 'retrieve')
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def compute_validators(self, request):
+        stats = self.get_conditional_queryset().order_by().aggregate(
+            last_modified=Max('updated_at'),
+            count=Count('pk'),
+        )
+        last_modified = stats['last_modified']
+        raw = '|'.join([
+            self.basename,
+            self.action,
+            request.path,
+            normalize_query_params(request.query_params),
+            str(request.user.is_staff),
+            str(get_catalog_version()),
+            str(stats['count']),
+            last_modified.isoformat() if last_modified else '',
+        ])
+        etag = '"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        return etag, int(get_catalog_modified())
+
+    def get_validators(self, request):
+        # Validators only change with the catalog version, so public ones are cached with it
+        if request.user.is_staff:
+            return self.compute_validators(request)
+
+        cache = get_cache()
+        key = catalog_cache_key(request, f'{self.basename}:{self.action}:validators')
+        validators = cache.get(key)
+        if validators is None:
+            validators = self.compute_validators(request)
+            cache.set(key, validators, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+        return validators
+
+    def conditional_response(self, request, build_response):
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return build_response()
+
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build_response()
+            if response.status_code != 200:
+                return response
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+
+        # Let browsers keep the body but always revalidate it
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
@@ -0,0 +1,84 @@
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from PIL import Image
+
+from perfumes_project.benchmarks import timed
+from perfumes_project.image_cache import get_resize_cache
+from perfumes_project.media_views import MediaServeView
+
+
+class Command(BaseCommand):
+    help = 'Measure cold (render) vs warm (disk cache hit) latency of /media/<path>?w= on a synthetic photo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='3000x2000', help='Source image WIDTHxHEIGHT')
+        parser.add_argument('--width', type=int, default=400, help='Requested width')
+        parser.add_argument('--format', default='webp')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent requests for one cold variant')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE_HEADER=''):
+                self._run(media_root, options)
+        finally:
+            shutil.rmtree(media_root)
+
+    def _run(self, media_root, options):
+        width, height = (int(value) for value in options['size'].split('x'))
+        os.makedirs(os.path.join(media_root, 'perfumes'))
+        # Noise compresses like a photo; a flat colour would flatter both encoders
+        Image.effect_noise((width, height), 64).convert('RGB').save(
+            os.path.join(media_root, 'perfumes/benchmark.jpg'), 'JPEG', quality=90
+        )
+
+        view = MediaServeView.as_view()
+        factory = RequestFactory()
+
+        def fetch(params):
+            response = view(factory.get('/media/perfumes/benchmark.jpg', params), path='perfumes/benchmark.jpg')
+            assert response.status_code == 200, response.status_code
+            return b''.join(response.streaming_content)
+
+        original = fetch({})
+        cold_widths = iter(range(options['width'], options['width'] + options['repeat'] * 2))
+        # Every cold request asks for a width that has not been rendered yet
+        cold, _ = timed(lambda: fetch({'w': next(cold_widths), 'fmt': options['format']}), options['repeat'])
+        params = {'w': options['width'], 'fmt': options['format']}
+        variant = fetch(params)
+        warm, _ = timed(lambda: fetch(params), options['repeat'])
+
+        self.stdout.write(f'Source {width}x{height} JPEG, {len(original)} bytes; '
+                          f'variant w={options["width"]} {options["format"]}, {len(variant)} bytes')
+        self.stdout.write(f'{"request":<24}{"median ms":>12}')
+        self.stdout.write(f'{"original (no resize)":<24}{timed(lambda: fetch({}), options["repeat"])[0]:>12.1f}')
+        self.stdout.write(f'{"cold (render + store)":<24}{cold:>12.1f}')
+        self.stdout.write(f'{"warm (cache hit)":<24}{warm:>12.1f}')
+
+        cache = get_resize_cache()
+        renders = cache.stats['renders']
+        params = {'w': options['width'] - 1, 'fmt': options['format']}
+        latencies = []
+
+        def request():
+            start = time.perf_counter()
+            fetch(params)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        threads = [threading.Thread(target=request) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(
+            f'{options["threads"]} concurrent cold requests: {cache.stats["renders"] - renders} render(s), '
+            f'median {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms'
+        )
@@ -0,0 +1,82 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from perfumes.models import Brand, Category, Perfume
+from perfumes.search import PerfumeSearchFilter, update_search_vectors
+from perfumes.views import PerfumeViewSet
+from perfumes_project.benchmarks import rolled_back, timed
+
+WORDS = [
+    'oud', 'rose', 'amber', 'musk', 'vanilla', 'citrus', 'jasmine', 'cedar', 'saffron', 'leather',
+    'noir', 'royal', 'velvet', 'intense', 'elixir', 'night', 'desert', 'ocean', 'smoke', 'silk',
+]
+
+QUERIES = ['oud', 'royal amber', 'vanila', 'brand 7', 'saffron leather']
+
+
+class Command(BaseCommand):
+    help = 'Compare ICONTAINS search with the full-text search backend on a synthetic catalog (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfumes', type=int, default=100000, help='Size of the synthetic catalog')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'Not running on PostgreSQL: the full-text backend falls back to ICONTAINS, '
+                'so both columns measure the same query.'
+            ))
+        with rolled_back():
+            self._run(options['perfumes'], options['repeat'])
+
+    def _run(self, count, repeat):
+        self.stdout.write(f'Creating {count} synthetic perfumes...')
+        rng = random.Random(42)
+        brands = Brand.objects.bulk_create([Brand(name=f'Brand {i}', slug=f'bench-brand-{i}') for i in range(50)])
+        categories = Category.objects.bulk_create([
+            Category(name=f'Category {i}', slug=f'bench-category-{i}') for i in range(10)
+        ])
+        Perfume.objects.bulk_create([
+            Perfume(
+                name=' '.join(rng.sample(WORDS, 2)).title(),
+                slug=f'bench-perfume-{i}',
+                brand=rng.choice(brands),
+                category=rng.choice(categories),
+                description=' '.join(rng.choices(WORDS, k=30)),
+                price=Decimal(rng.randint(20, 400)),
+                stock=rng.randint(0, 50),
+                image='perfumes/bench.jpg',
+            )
+            for i in range(count)
+        ], batch_size=2000)
+        update_search_vectors()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE perfumes_perfume')
+
+        factory = APIRequestFactory()
+
+        def run_search(backend, terms):
+            view = PerfumeViewSet()
+            view.request = Request(factory.get('/api/perfumes/', {'search': terms}))
+            view.format_kwarg = None
+            view.action = 'list'
+            queryset = backend().filter_queryset(view.request, Perfume.objects.active(), view)
+            return queryset.count(), list(queryset[:10])
+
+        self.stdout.write(f'{"query":<18}{"icontains (ms)":>16}{"full-text (ms)":>16}{"hits":>14}')
+        for terms in QUERIES:
+            baseline, _ = timed(lambda: run_search(filters.SearchFilter, terms), repeat)
+            candidate, _ = timed(lambda: run_search(PerfumeSearchFilter, terms), repeat)
+            baseline_hits = run_search(filters.SearchFilter, terms)[0]
+            candidate_hits = run_search(PerfumeSearchFilter, terms)[0]
+            self.stdout.write(
+                f'{terms:<18}{baseline:>16.1f}{candidate:>16.1f}{f"{baseline_hits}/{candidate_hits}":>14}'
+            )
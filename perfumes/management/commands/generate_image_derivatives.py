@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from PIL import Image
+
+from perfumes_project import images
+
+
+def build(task):
+    """Worker body: build one image's derivatives; failures are returned, not raised"""
+    key, name = task
+    try:
+        return key, images.build_derivatives(name), None
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        return key, None, f'{name}: {exc}'
+
+
+class Command(BaseCommand):
+    help = 'Generate resized image derivatives for stored images that have none or whose image changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (1 builds in this process)')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that look up to date')
+        parser.add_argument('--models', nargs='*', default=None,
+                            help='Limit to these models, e.g. perfumes.perfume users.user')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        sources = images.REGISTRY
+        if options['models']:
+            labels = {label.lower() for label in options['models']}
+            sources = [source for source in sources if source.model._meta.label_lower in labels]
+            if not sources:
+                raise CommandError(f'No images are registered for {", ".join(sorted(labels))}')
+
+        tasks = []
+        for index, source in enumerate(sources):
+            rows = source.model._default_manager.exclude(**{source.image_field: ''}).exclude(
+                **{f'{source.image_field}__isnull': True}
+            ).values_list('pk', source.image_field, source.derivatives_field)
+            for pk, name, derivatives in rows.iterator():
+                if options['force'] or images.needs_refresh(name, derivatives):
+                    tasks.append(((index, pk), name))
+        if not tasks:
+            self.stdout.write('All image derivatives are up to date')
+            return
+
+        workers = max(1, min(options['workers'], len(tasks)))
+        self.stdout.write(f'Building derivatives of {len(tasks)} images with {workers} worker(s)...')
+        pending = {index: [] for index in range(len(sources))}
+        changed, failed = set(), 0
+        start = time.perf_counter()
+
+        def flush(index):
+            source = sources[index]
+            source.model._default_manager.bulk_update(pending[index], [source.derivatives_field])
+            pending[index] = []
+            changed.add(index)
+
+        # Workers only touch storage; the parent writes the maps in batches
+        if workers == 1:
+            results = map(build, tasks)
+            pool = None
+        else:
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(workers)
+            results = pool.imap_unordered(build, tasks, chunksize=4)
+        try:
+            for (index, pk), derivatives, error in results:
+                if error:
+                    failed += 1
+                    self.stderr.write(f'Skipped {error}')
+                    continue
+                source = sources[index]
+                pending[index].append(source.model(pk=pk, **{source.derivatives_field: derivatives}))
+                if len(pending[index]) >= options['batch_size']:
+                    flush(index)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        for index, objs in pending.items():
+            if objs:
+                flush(index)
+        for index in changed:
+            if sources[index].on_change is not None:
+                sources[index].on_change()
+
+        elapsed = time.perf_counter() - start
+        done = len(tasks) - failed
+        self.stdout.write(self.style.SUCCESS(
+            f'Built derivatives of {done} images in {elapsed:.1f}s ({done / elapsed:.1f} images/s), {failed} failed'
+        ))
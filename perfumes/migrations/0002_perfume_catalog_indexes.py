@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfumes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='perfume',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at'], name='perfume_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfume',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_featured', True)), fields=['-created_at'], name='perfume_active_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfume',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price'], name='perfume_active_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfume',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['brand', '-created_at'], name='perfume_active_brand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfume',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-created_at'], name='perfume_active_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfume',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['gender', '-created_at'], name='perfume_active_gender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfume',
+            index=models.Index(condition=models.Q(('is_active', True), ('stock__gt', 0)), fields=['-created_at'], name='perfume_in_stock_idx'),
+        ),
+    ]
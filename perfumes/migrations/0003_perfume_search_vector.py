@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:48
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+# GIN and trigram indexes only exist on PostgreSQL; other backends keep using ICONTAINS search
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS perfume_search_vector_idx ON perfumes_perfume USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS perfume_name_trgm_idx ON perfumes_perfume USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS brand_name_trgm_idx ON perfumes_brand USING gin (name gin_trgm_ops)',
+]
+
+# Same document as perfumes.search.search_vector_expression
+BACKFILL = """
+    UPDATE perfumes_perfume AS p SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, coalesce(p.name, '')), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce(b.name, '')), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce(c.name, '')), 'B') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce(p.description, '')), 'C')
+    FROM perfumes_brand AS b, perfumes_category AS c
+    WHERE b.id = p.brand_id AND c.id = p.category_id
+"""
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS brand_name_trgm_idx',
+    'DROP INDEX IF EXISTS perfume_name_trgm_idx',
+    'DROP INDEX IF EXISTS perfume_search_vector_idx',
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in POSTGRES_FORWARD:
+        schema_editor.execute(statement)
+    schema_editor.execute(BACKFILL, {'config': getattr(settings, 'PERFUME_SEARCH_CONFIG', 'english')})
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in POSTGRES_BACKWARD:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfumes', '0002_perfume_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfume',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfumes', '0003_perfume_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brand',
+            name='logo_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='perfume',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='perfumeimage',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.text import slugify
 
@@ -25,6 +26,8 @@ class Brand(models.Model):
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     logo = models.ImageField(upload_to='brands/', blank=True, null=True)
+    # Resized copies of the logo, maintained by perfumes_project.images
+    logo_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -39,6 +42,26 @@ class Brand(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+class PerfumeQuerySet(models.QuerySet):
+    """Catalog-aware queryset for Perfume"""
+    
+    def active(self):
+        return self.filter(is_active=True)
+    
+    def featured(self):
+        return self.active().filter(is_featured=True)
+    
+    def on_sale(self):
+        return self.filter(
+            discount_price__isnull=False
+        ).exclude(discount_price__gte=models.F('price'))
+    
+    def for_catalog(self):
+        """Load every relation the perfume serializers read in a constant number of queries"""
+        return self.select_related('brand', 'category').defer('search_vector').prefetch_related(
+            models.Prefetch('images', queryset=PerfumeImage.objects.all())
+        )
+
 class Perfume(models.Model):
     GENDER_CHOICES = (
         ('M', 'Male'),
@@ -56,13 +79,37 @@ class Perfume(models.Model):
     stock = models.PositiveIntegerField(default=0)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, default='U')
     image = models.ImageField(upload_to='perfumes/')
+    # Resized copies of the image, maintained by perfumes_project.images
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     is_featured = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Full-text document (PostgreSQL only), maintained by perfumes.search
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    
+    objects = PerfumeQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        # Public catalog queries always filter is_active, so the hot indexes are partial on it.
+        # Boolean filters are expressed as index conditions: SQLite cannot seek on a bare boolean column.
+        indexes = [
+            models.Index(fields=['-created_at'], name='perfume_active_created_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['-created_at'], name='perfume_active_featured_idx',
+                         condition=models.Q(is_active=True, is_featured=True)),
+            models.Index(fields=['price'], name='perfume_active_price_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['brand', '-created_at'], name='perfume_active_brand_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['category', '-created_at'], name='perfume_active_category_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['gender', '-created_at'], name='perfume_active_gender_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['-created_at'], name='perfume_in_stock_idx',
+                         condition=models.Q(is_active=True, stock__gt=0)),
+        ]
     
     def __str__(self):
         return f"{self.brand.name} - {self.name}"
@@ -79,10 +126,16 @@ class Perfume(models.Model):
     @property
     def is_on_sale(self):
         return self.discount_price is not None and self.discount_price < self.price
+    
+    @property
+    def effective_price(self):
+        """Price a customer pays for one unit"""
+        return self.discount_price or self.price
 
 class PerfumeImage(models.Model):
     perfume = models.ForeignKey(Perfume, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='perfumes/')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
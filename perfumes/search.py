@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Greatest
+from rest_framework import filters
+
+from .models import Brand, Category, Perfume
+
+
+def get_search_config():
+    return getattr(settings, 'PERFUME_SEARCH_CONFIG', 'english')
+
+
+def is_postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def search_vector_expression():
+    """Weighted document: name and brand rank above category, description lowest"""
+    config = get_search_config()
+    brand_name = Subquery(Brand.objects.filter(pk=OuterRef('brand_id')).values('name')[:1])
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1])
+    return (
+        SearchVector('name', weight='A', config=config)
+        + SearchVector(brand_name, weight='A', config=config)
+        + SearchVector(category_name, weight='B', config=config)
+        + SearchVector('description', weight='C', config=config)
+    )
+
+
+def update_search_vectors(queryset=None):
+    """Recompute search_vector in a single UPDATE (no-op outside PostgreSQL)"""
+    if queryset is None:
+        queryset = Perfume.objects.all()
+    if not is_postgres(queryset):
+        return 0
+    return queryset.order_by().update(search_vector=search_vector_expression())
+
+
+class PerfumeSearchFilter(filters.SearchFilter):
+    """
+    Ranked full-text search over the maintained search_vector column, with a
+    trigram fallback for misspelt queries. Backends other than PostgreSQL
+    fall back to the stock ICONTAINS search over search_fields.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms or not is_postgres(queryset):
+            return super().filter_queryset(request, queryset, view)
+
+        query = SearchQuery(terms, search_type='websearch', config=get_search_config())
+        matches = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-created_at')
+        if matches.exists():
+            return matches
+
+        # The % operator (trigram_similar) can use the trigram GIN indexes
+        return queryset.filter(
+            Q(name__trigram_similar=terms) | Q(brand__name__trigram_similar=terms)
+        ).annotate(
+            search_rank=Greatest(
+                TrigramSimilarity('name', terms),
+                TrigramSimilarity('brand__name', terms),
+            )
+        ).order_by('-search_rank', '-created_at')
@@ -1,25 +1,31 @@
 from rest_framework import serializers
+from perfumes_project.serializers import DynamicFieldsMixin, SrcsetField
 from .models import Category, Brand, Perfume, PerfumeImage
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'description']
 
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    logo_srcset = SrcsetField(source='logo_derivatives')
+    
     class Meta:
         model = Brand
-        fields = ['id', 'name', 'slug', 'description', 'logo']
+        fields = ['id', 'name', 'slug', 'description', 'logo', 'logo_srcset']
 
-class PerfumeImageSerializer(serializers.ModelSerializer):
+class PerfumeImageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    image_srcset = SrcsetField(source='image_derivatives')
+    
     class Meta:
         model = PerfumeImage
-        fields = ['id', 'image', 'is_primary']
+        fields = ['id', 'image', 'image_srcset', 'is_primary']
 
-class PerfumeSerializer(serializers.ModelSerializer):
+class PerfumeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     brand_name = serializers.CharField(source='brand.name', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     images = PerfumeImageSerializer(many=True, read_only=True)
+    image_srcset = SrcsetField(source='image_derivatives')
     slug = serializers.SlugField(read_only=True)  # Make slug read-only since it's auto-generated
     
     class Meta:
@@ -27,19 +33,36 @@ class PerfumeSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'slug', 'brand', 'brand_name', 'category', 'category_name',
             'description', 'price', 'discount_price', 'stock', 'gender',
-            'image', 'is_featured', 'is_active', 'images', 'is_in_stock', 'is_on_sale'
+            'image', 'image_srcset', 'is_featured', 'is_active', 'images', 'is_in_stock', 'is_on_sale'
+        ]
+        field_dependencies = {'is_in_stock': ['stock'], 'is_on_sale': ['price', 'discount_price']}
+
+class PerfumeSummarySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Compact perfume embedded in cart and order lines (only needs brand loaded)"""
+    brand_name = serializers.CharField(source='brand.name', read_only=True)
+    effective_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    image_srcset = SrcsetField(source='image_derivatives')
+    
+    class Meta:
+        model = Perfume
+        fields = [
+            'id', 'slug', 'name', 'brand_name', 'image', 'image_srcset',
+            'price', 'discount_price', 'effective_price', 'stock', 'is_in_stock'
         ]
+        field_dependencies = {'effective_price': ['price', 'discount_price'], 'is_in_stock': ['stock']}
 
-class PerfumeDetailSerializer(serializers.ModelSerializer):
+class PerfumeDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     brand = BrandSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     images = PerfumeImageSerializer(many=True, read_only=True)
+    image_srcset = SrcsetField(source='image_derivatives')
     
     class Meta:
         model = Perfume
         fields = [
             'id', 'name', 'slug', 'brand', 'category', 'description',
-            'price', 'discount_price', 'stock', 'gender', 'image',
+            'price', 'discount_price', 'stock', 'gender', 'image', 'image_srcset',
             'is_featured', 'is_active', 'images', 'is_in_stock', 'is_on_sale',
             'created_at', 'updated_at'
-        ]
\ No newline at end of file
+        ]
+        field_dependencies = {'is_in_stock': ['stock'], 'is_on_sale': ['price', 'discount_price']}
\ No newline at end of file
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from perfumes_project import images
+from .models import Category, Brand, Perfume, PerfumeImage
+from .cache import bump_catalog_version
+from .search import update_search_vectors
+from . import suggest
+
+CATALOG_MODELS = (Category, Brand, Perfume, PerfumeImage)
+
+
+def invalidate_catalog_cache(sender, **kwargs):
+    """
+    Any admin change to the catalog invalidates cached catalog responses once
+    it commits; bumping earlier would let a concurrent request cache the old
+    rows under the new version
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_catalog_cache, sender=model, dispatch_uid=f'catalog_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_catalog_cache, sender=model, dispatch_uid=f'catalog_cache_delete_{model.__name__}')
+
+
+def refresh_perfume_search_vector(sender, instance, **kwargs):
+    update_search_vectors(Perfume.objects.filter(pk=instance.pk))
+
+
+def refresh_brand_search_vectors(sender, instance, **kwargs):
+    update_search_vectors(Perfume.objects.filter(brand=instance))
+
+
+def refresh_category_search_vectors(sender, instance, **kwargs):
+    update_search_vectors(Perfume.objects.filter(category=instance))
+
+
+post_save.connect(refresh_perfume_search_vector, sender=Perfume, dispatch_uid='search_vector_perfume')
+post_save.connect(refresh_brand_search_vectors, sender=Brand, dispatch_uid='search_vector_brand')
+post_save.connect(refresh_category_search_vectors, sender=Category, dispatch_uid='search_vector_category')
+
+
+# Suggest index updates, applied on commit under their own names version (perfumes.cache)
+post_save.connect(suggest.perfume_saved, sender=Perfume, dispatch_uid='suggest_perfume_save')
+post_delete.connect(suggest.perfume_deleted, sender=Perfume, dispatch_uid='suggest_perfume_delete')
+for model in (Brand, Category):
+    post_save.connect(suggest.named_saved, sender=model, dispatch_uid=f'suggest_save_{model.__name__}')
+    post_delete.connect(suggest.invalidate, sender=model, dispatch_uid=f'suggest_delete_{model.__name__}')
+
+
+def catalog_images_changed():
+    transaction.on_commit(bump_catalog_version)
+
+
+# Registered last: derivatives are written with update(), after the save's own cache bump
+images.register(Perfume, 'image', 'image_derivatives', on_change=catalog_images_changed)
+images.register(PerfumeImage, 'image', 'image_derivatives', on_change=catalog_images_changed)
+images.register(Brand, 'logo', 'logo_derivatives', on_change=catalog_images_changed)
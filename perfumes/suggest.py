@@ -0,0 +1,195 @@
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from django.db import transaction
+
+from .cache import bump_names_version, get_names_version
+from .models import Brand, Category, Perfume
+
+KIND_PRIORITY = {'brand': 0, 'category': 1, 'perfume': 2}
+
+# Upper bound on index entries inspected per lookup, keeps one-letter prefixes cheap
+MAX_SCAN = 256
+
+
+def normalize(text):
+    """Lowercase, accent-free, single-spaced form used for both indexing and lookups"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+class PrefixIndex:
+    """
+    Per-process typeahead index: a sorted array of (term, kind, key, position)
+    searched with bisect. Every word of a name starts a term, so "ford" finds
+    "Tom Ford".
+
+    Readers never lock. Writers build a new array and swap it in, which is
+    fine because catalog writes are rare.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._items = {}
+        self.version = None
+
+    def __len__(self):
+        return len(self._items)
+
+    @staticmethod
+    def _terms(text):
+        words = normalize(text).split(' ')
+        return [(' '.join(words[i:]), i) for i in range(len(words)) if words[i]]
+
+    def _entries_for(self, kind, key, text):
+        return [(term, kind, key, position) for term, position in self._terms(text)]
+
+    def rebuild(self, items, version=None):
+        """Replace the whole index with (kind, key, text, payload) tuples"""
+        entries = []
+        payloads = {}
+        for kind, key, text, payload in items:
+            entries.extend(self._entries_for(kind, key, text))
+            payloads[(kind, key)] = (text, payload)
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._items = payloads
+            self.version = version
+
+    def upsert(self, kind, key, text, payload):
+        with self._lock:
+            entries = [entry for entry in self._entries if entry[1:3] != (kind, key)]
+            entries.extend(self._entries_for(kind, key, text))
+            entries.sort()
+            items = dict(self._items)
+            items[(kind, key)] = (text, payload)
+            self._entries, self._items = entries, items
+
+    def remove(self, kind, key):
+        with self._lock:
+            if (kind, key) not in self._items:
+                return
+            self._entries = [entry for entry in self._entries if entry[1:3] != (kind, key)]
+            items = dict(self._items)
+            del items[(kind, key)]
+            self._items = items
+
+    def search(self, prefix, limit=8):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        entries, items = self._entries, self._items
+
+        # Best match per item: earliest word position wins
+        candidates = {}
+        index = bisect_left(entries, (prefix,))
+        end = min(len(entries), index + MAX_SCAN)
+        while index < end and entries[index][0].startswith(prefix):
+            term, kind, key, position = entries[index]
+            if (kind, key) not in candidates or position < candidates[(kind, key)]:
+                candidates[(kind, key)] = position
+            index += 1
+
+        ranked = heapq.nsmallest(
+            limit,
+            candidates.items(),
+            key=lambda item: (item[1] > 0, KIND_PRIORITY[item[0][0]], len(items[item[0]][0]), items[item[0]][0]),
+        )
+        return [items[item_key][1] for item_key, _ in ranked]
+
+
+index = PrefixIndex()
+
+
+def perfume_entry(perfume_id, name, slug, brand_name):
+    return ('perfume', perfume_id, name, {
+        'type': 'perfume', 'id': perfume_id, 'name': name, 'slug': slug, 'brand_name': brand_name,
+    })
+
+
+def named_entry(kind, obj_id, name, slug):
+    return (kind, obj_id, name, {'type': kind, 'id': obj_id, 'name': name, 'slug': slug})
+
+
+def load_entries():
+    perfumes = Perfume.objects.active().values_list('id', 'name', 'slug', 'brand__name')
+    for perfume_id, name, slug, brand_name in perfumes.iterator():
+        yield perfume_entry(perfume_id, name, slug, brand_name)
+    for obj_id, name, slug in Brand.objects.values_list('id', 'name', 'slug'):
+        yield named_entry('brand', obj_id, name, slug)
+    for obj_id, name, slug in Category.objects.values_list('id', 'name', 'slug'):
+        yield named_entry('category', obj_id, name, slug)
+
+
+def suggest(prefix, limit=8):
+    """
+    Top `limit` suggestions for a prefix. The only shared state consulted is
+    the names version counter in the cache; the database is read only when
+    another process changed a name since the last build. Stock and price
+    changes (every checkout) bump only the catalog version, so they never
+    force a rebuild.
+    """
+    version = get_names_version()
+    if index.version != version:
+        index.rebuild(load_entries(), version)
+    return index.search(prefix, limit)
+
+
+def _apply(update):
+    """
+    Apply an incremental update once the change commits, bumping the names
+    version so other processes rebuild. If other processes changed names in
+    between, the update alone is not enough: leave the index stale so the
+    next lookup rebuilds it.
+    """
+    def apply():
+        version = bump_names_version()
+        if index.version is not None and index.version == version - 1:
+            update()
+            index.version = version
+        else:
+            index.version = None
+
+    transaction.on_commit(apply)
+
+
+# Perfume fields the index is built from
+INDEXED_FIELDS = {'name', 'slug', 'brand', 'is_active'}
+
+
+def perfume_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+        return
+    if instance.is_active:
+        entry = perfume_entry(instance.pk, instance.name, instance.slug, instance.brand.name)
+        _apply(lambda: index.upsert(*entry))
+    else:
+        pk = instance.pk
+        _apply(lambda: index.remove('perfume', pk))
+
+
+def perfume_deleted(sender, instance, **kwargs):
+    # Read now: delete() clears instance.pk before the update runs
+    pk = instance.pk
+    _apply(lambda: index.remove('perfume', pk))
+
+
+def named_saved(sender, instance, created=False, **kwargs):
+    kind = 'brand' if sender is Brand else 'category'
+    if created:
+        entry = named_entry(kind, instance.pk, instance.name, instance.slug)
+        _apply(lambda: index.upsert(*entry))
+    else:
+        # Perfume entries carry the brand name, so a rename needs a rebuild
+        invalidate()
+
+
+def invalidate(*args, **kwargs):
+    """Rebuild on the next lookup here, and in every process once the change commits"""
+    index.version = None
+    transaction.on_commit(bump_names_version)
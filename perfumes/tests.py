@@ -1,12 +1,31 @@
-from django.test import TestCase
+import asyncio
+import warnings
+from unittest import mock, skipUnless
+from django.db import connection
+from django.core.management import call_command
+from django.core.handlers.asgi import ASGIHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APITestCase
 from rest_framework import status
 from users.models import User
-from .models import Category, Brand, Perfume
+from .models import Category, Brand, Perfume, PerfumeImage
 from .serializers import PerfumeSerializer
+from .cache import MODIFIED_KEY, bump_catalog_version, bump_names_version, get_cache, get_cache_stats
+from .checks import catalog_cache_is_shared
+from . import suggest
+from perfumes_project.explain import IndexUsageMixin
+from perfumes_project.media_views import HASHED_NAME_RE
+from perfumes_project.image_cache import DiskLRUCache, get_resize_cache
 from PIL import Image
+from decimal import Decimal
 import io
+import os
+import shutil
+import tempfile
+import threading
+import time
 
 class PerfumeModelTest(TestCase):
     def setUp(self):
@@ -170,4 +189,757 @@ class PerfumeAPITest(APITestCase):
             'test_image.jpg',
             image_io.getvalue(),
             content_type='image/jpeg'
-        )
\ No newline at end of file
+        )
+
+class PerfumeQueryCountTest(APITestCase):
+    """Catalog endpoints must cost a constant number of queries regardless of page size"""
+    
+    def setUp(self):
+        self.category = Category.objects.create(name='Men', slug='men')
+        self.brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+    
+    def _create_perfumes(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._insert_perfumes(count)
+
+    def _insert_perfumes(self, count):
+        for i in range(count):
+            perfume = Perfume.objects.create(
+                name=f'Perfume {Perfume.objects.count()}',
+                brand=self.brand,
+                category=self.category,
+                description='A luxurious fragrance',
+                price=Decimal('100.00'),
+                discount_price=Decimal('80.00'),
+                stock=5,
+                is_featured=True,
+                image='perfumes/test.jpg'
+            )
+            PerfumeImage.objects.create(perfume=perfume, image='perfumes/extra.jpg')
+    
+    def _assert_constant_queries(self, url, expected):
+        for count in (1, 5):
+            self._create_perfumes(count)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    # Every cold response also runs one aggregate query for its ETag / Last-Modified
+    
+    def test_list_query_count(self):
+        # Validators, COUNT for pagination, the page itself and the images prefetch
+        self._assert_constant_queries('/api/perfumes/', 4)
+    
+    def test_featured_query_count(self):
+        self._assert_constant_queries('/api/perfumes/featured/', 3)
+    
+    def test_on_sale_query_count(self):
+        self._assert_constant_queries('/api/perfumes/on_sale/', 3)
+    
+    def test_retrieve_query_count(self):
+        self._create_perfumes(3)
+        perfume = Perfume.objects.first()
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/perfumes/{perfume.slug}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['brand']['name'], 'Tom Ford')
+        self.assertEqual(len(response.data['images']), 1)
+
+
+class CatalogCacheTest(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.category = Category.objects.create(name='Men', slug='men')
+        self.brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+        self.perfume = Perfume.objects.create(
+            name='Oud Wood',
+            brand=self.brand,
+            category=self.category,
+            description='A luxurious fragrance',
+            price=Decimal('250.00'),
+            stock=10,
+            is_featured=True,
+            image='perfumes/test.jpg'
+        )
+    
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.client.get('/api/perfumes/', {'gender': 'U', 'ordering': 'name'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        
+        # Same parameters in a different order hit the same entry without touching the database
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/perfumes/?ordering=name&gender=U')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        
+        stats = get_cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+    
+    def test_catalog_change_invalidates_cache(self):
+        self.client.get('/api/perfumes/featured/')
+        self.perfume.name = 'Oud Wood Intense'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfume.save()
+        
+        response = self.client.get('/api/perfumes/featured/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['name'], 'Oud Wood Intense')
+    
+    def test_cache_is_invalidated_only_on_commit(self):
+        version = get_cache_stats()['version']
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.perfume.name = 'Oud Wood Intense'
+            self.perfume.save()
+            self.assertEqual(get_cache_stats()['version'], version)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_cache_stats()['version'], version)
+    
+    def test_related_model_change_invalidates_cache(self):
+        self.client.get('/api/perfumes/on_sale/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.delete()
+        response = self.client.get('/api/perfumes/on_sale/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+    
+    def test_staff_responses_are_not_cached(self):
+        staff = User.objects.create_user(
+            email='staff@example.com', password='testpass123',
+            first_name='Staff', last_name='User', is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        response = self.client.get('/api/perfumes/')
+        self.assertNotIn('X-Cache', response)
+
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+
+
+class CatalogCacheCheckTest(TestCase):
+    @mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '1'})
+    def test_process_local_cache_is_fine_for_one_process(self):
+        with override_settings(CACHES=LOCMEM, IMAGE_DERIVATIVES_IN_BACKGROUND=False):
+            self.assertEqual(catalog_cache_is_shared(None), [])
+    
+    @mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '1'})
+    def test_background_worker_requires_shared_cache(self):
+        with override_settings(CACHES=LOCMEM, IMAGE_DERIVATIVES_IN_BACKGROUND=True):
+            self.assertEqual([error.id for error in catalog_cache_is_shared(None)], ['perfumes.E001'])
+        with override_settings(CACHES=REDIS, IMAGE_DERIVATIVES_IN_BACKGROUND=True):
+            self.assertEqual(catalog_cache_is_shared(None), [])
+    
+    @mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '4'})
+    def test_several_web_workers_require_shared_cache(self):
+        with override_settings(CACHES=LOCMEM, IMAGE_DERIVATIVES_IN_BACKGROUND=False):
+            self.assertEqual([error.id for error in catalog_cache_is_shared(None)], ['perfumes.E001'])
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.category = Category.objects.create(name='Men', slug='men')
+        self.brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+        self.perfume = Perfume.objects.create(
+            name='Oud Wood',
+            brand=self.brand,
+            category=self.category,
+            description='A luxurious fragrance',
+            price=Decimal('250.00'),
+            stock=10,
+            image='perfumes/test.jpg'
+        )
+    
+    def test_list_emits_validators(self):
+        for url in ('/api/perfumes/', '/api/perfumes/brands/', '/api/perfumes/categories/',
+                    f'/api/perfumes/{self.perfume.slug}/', '/api/perfumes/featured/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertTrue(response['ETag'].startswith('"'), url)
+            self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Last-Modified', self.client.get('/api/perfumes/'))
+    
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/perfumes/')['ETag']
+        response = self.client.get('/api/perfumes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+    
+    def test_if_modified_since_returns_304(self):
+        last_modified = self.client.get('/api/perfumes/brands/')['Last-Modified']
+        response = self.client.get('/api/perfumes/brands/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_changes_outside_the_result_set_move_last_modified(self):
+        changes = [
+            # Leaves the result set, so max(updated_at) of what is left would not move
+            lambda: Perfume.objects.filter(pk=self.perfume.pk).update(is_active=False),
+            # Only embedded in the payload
+            lambda: Brand.objects.filter(pk=self.brand.pk).update(name='Ford'),
+        ]
+        for change in changes:
+            # Fresh validators, as if the catalog last changed a minute ago
+            bump_catalog_version()
+            get_cache().set(MODIFIED_KEY, time.time() - 60, timeout=None)
+            last_modified = self.client.get('/api/perfumes/')['Last-Modified']
+            change()
+            bump_catalog_version()
+            response = self.client.get('/api/perfumes/', HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_change_produces_new_etag(self):
+        etag = self.client.get(f'/api/perfumes/{self.perfume.slug}/')['ETag']
+        self.perfume.price = Decimal('199.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfume.save()
+        response = self.client.get(f'/api/perfumes/{self.perfume.slug}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_etag_depends_on_filters(self):
+        first = self.client.get('/api/perfumes/', {'gender': 'U'})['ETag']
+        second = self.client.get('/api/perfumes/', {'gender': 'F'})['ETag']
+        self.assertNotEqual(first, second)
+
+
+class CatalogIndexUsageTest(IndexUsageMixin, TestCase):
+    """The hot catalog queries must be answerable from the catalog indexes"""
+    
+    def setUp(self):
+        self.category = Category.objects.create(name='Men', slug='men')
+        self.brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+    
+    def test_active_listing(self):
+        self.assertUsesIndex(Perfume.objects.active().order_by('-created_at'), 'perfume_active_created_idx')
+    
+    def test_featured(self):
+        self.assertUsesIndex(Perfume.objects.featured(), 'perfume_active_featured_idx')
+    
+    def test_price_range(self):
+        queryset = Perfume.objects.active().filter(price__gte=10, price__lte=100)
+        self.assertUsesIndex(queryset, 'perfume_active_price_idx')
+    
+    def test_brand_filter(self):
+        self.assertUsesIndex(Perfume.objects.active().filter(brand=self.brand), 'perfume_active_brand_idx')
+    
+    def test_category_filter(self):
+        self.assertUsesIndex(Perfume.objects.active().filter(category=self.category), 'perfume_active_category_idx')
+    
+    def test_gender_filter(self):
+        self.assertUsesIndex(Perfume.objects.active().filter(gender='F'), 'perfume_active_gender_idx')
+    
+    def test_in_stock_listing(self):
+        self.assertUsesIndex(Perfume.objects.active().filter(stock__gt=0), 'perfume_in_stock_idx')
+
+
+class PerfumeSearchTest(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.category = Category.objects.create(name='Men', slug='men')
+        self.brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+        self.other_brand = Brand.objects.create(name='Creed', slug='creed')
+        for name, brand, description in [
+            ('Oud Wood', self.brand, 'Smoky oud and rosewood'),
+            ('Aventus', self.other_brand, 'Pineapple and birch'),
+            ('Tobacco Vanille', self.brand, 'Warm vanilla and tobacco leaf'),
+        ]:
+            Perfume.objects.create(
+                name=name, brand=brand, category=self.category, description=description,
+                price=Decimal('200.00'), stock=5, image='perfumes/test.jpg'
+            )
+    
+    def _search(self, terms):
+        response = self.client.get('/api/perfumes/', {'search': terms})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [perfume['name'] for perfume in response.data['results']]
+    
+    def test_search_matches_name_brand_and_description(self):
+        self.assertEqual(self._search('aventus'), ['Aventus'])
+        self.assertCountEqual(self._search('tom ford'), ['Oud Wood', 'Tobacco Vanille'])
+        self.assertEqual(self._search('pineapple'), ['Aventus'])
+    
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+    def test_name_matches_rank_above_description_matches(self):
+        Perfume.objects.create(
+            name='Vanilla Sky', brand=self.other_brand, category=self.category, description='Sweet',
+            price=Decimal('150.00'), stock=5, image='perfumes/test.jpg'
+        )
+        self.assertEqual(self._search('vanilla')[0], 'Vanilla Sky')
+    
+    @skipUnless(connection.vendor == 'postgresql', 'Trigram search requires PostgreSQL')
+    def test_misspelt_query_uses_trigram_fallback(self):
+        self.assertEqual(self._search('aventos'), ['Aventus'])
+
+
+class PerfumeSuggestTest(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        suggest.invalidate()
+        self.category = Category.objects.create(name='Oriental', slug='oriental')
+        self.brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+        self.perfume = Perfume.objects.create(
+            name='Oud Wood', brand=self.brand, category=self.category, description='Smoky',
+            price=Decimal('200.00'), stock=5, image='perfumes/test.jpg'
+        )
+    
+    def _suggest(self, query):
+        response = self.client.get('/api/perfumes/suggest/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(result['type'], result['name']) for result in response.data['results']]
+    
+    def test_prefix_matches_any_word(self):
+        self.assertEqual(self._suggest('ou'), [('perfume', 'Oud Wood')])
+        self.assertEqual(self._suggest('wo'), [('perfume', 'Oud Wood')])
+        self.assertEqual(self._suggest('FORD'), [('brand', 'Tom Ford')])
+        self.assertEqual(self._suggest('ori'), [('category', 'Oriental')])
+        self.assertEqual(self._suggest(''), [])
+    
+    def test_warm_lookup_does_not_query_database(self):
+        self._suggest('o')
+        with self.assertNumQueries(0):
+            self._suggest('oud')
+    
+    def test_index_follows_catalog_changes_incrementally(self):
+        self._suggest('o')
+        with self.captureOnCommitCallbacks(execute=True):
+            perfume = Perfume.objects.create(
+                name='Ombre Leather', brand=self.brand, category=self.category, description='Leather',
+                price=Decimal('180.00'), stock=5, image='perfumes/test.jpg'
+            )
+        with self.assertNumQueries(0):
+            self.assertIn(('perfume', 'Ombre Leather'), self._suggest('omb'))
+        
+        perfume.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            perfume.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._suggest('omb'), [])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfume.delete()
+        self.assertEqual(self._suggest('oud'), [])
+    
+    def test_stock_changes_do_not_rebuild_the_index(self):
+        self._suggest('o')
+        # What a checkout's stock reservation does
+        bump_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfume.stock = 4
+            self.perfume.save(update_fields=['stock'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._suggest('oud'), [('perfume', 'Oud Wood')])
+    
+    def test_name_change_in_another_process_rebuilds_the_index(self):
+        self._suggest('o')
+        Perfume.objects.filter(pk=self.perfume.pk).update(name='Ombre Leather')
+        bump_names_version()
+        self.assertEqual(self._suggest('omb'), [('perfume', 'Ombre Leather')])
+    
+    def test_results_are_capped(self):
+        for i in range(12):
+            Perfume.objects.create(
+                name=f'Oud {i}', brand=self.brand, category=self.category, description='Oud',
+                price=Decimal('100.00'), stock=5, image='perfumes/test.jpg'
+            )
+        self.assertEqual(len(self._suggest('oud')), 8)
+        response = self.client.get('/api/perfumes/suggest/', {'q': 'oud', 'limit': 50})
+        self.assertEqual(len(response.data['results']), 13)
+
+
+class SparseFieldsetTest(APITestCase):
+    """?fields= / ?omit= trim both the payload and the queries behind it"""
+    
+    def setUp(self):
+        category = Category.objects.create(name='Men', slug='men')
+        brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+        for i in range(3):
+            perfume = Perfume.objects.create(
+                name=f'Oud {i}', brand=brand, category=category, description='A long story about oud',
+                price=Decimal('100.00'), discount_price=Decimal('80.00'), stock=5, image='perfumes/test.jpg'
+            )
+            PerfumeImage.objects.create(perfume=perfume, image='perfumes/extra.jpg')
+    
+    def _get(self, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/perfumes/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = [query['sql'] for query in context.captured_queries if 'LIMIT' in query['sql']]
+        return response.data['results'], page[-1], len(context.captured_queries)
+    
+    def test_fields_limits_payload_columns_and_prefetches(self):
+        _, _, full_queries = self._get({})
+        results, page_sql, queries = self._get({'fields': 'id,name,brand_name,is_in_stock'})
+        
+        self.assertEqual(set(results[0]), {'id', 'name', 'brand_name', 'is_in_stock'})
+        self.assertTrue(results[0]['is_in_stock'])
+        self.assertNotIn('"description"', page_sql)
+        self.assertNotIn('perfumes_category', page_sql)
+        self.assertIn('"perfumes_brand"."name"', page_sql)
+        self.assertNotIn('"perfumes_brand"."description"', page_sql)
+        # No images prefetch
+        self.assertEqual(queries, full_queries - 1)
+    
+    def test_omit_drops_fields(self):
+        results, page_sql, _ = self._get({'omit': 'description,images'})
+        self.assertNotIn('description', results[0])
+        self.assertNotIn('images', results[0])
+        self.assertIn('is_on_sale', results[0])
+        self.assertNotIn('"description"', page_sql)
+    
+    def test_nested_fields(self):
+        results, _, _ = self._get({'fields': 'id,images.image'})
+        self.assertEqual(set(results[0]), {'id', 'images'})
+        self.assertEqual(set(results[0]['images'][0]), {'image'})
+    
+    def test_cursor_pagination_with_fields(self):
+        # Validators and the page; created_at is kept for the cursor, so no row is re-read
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/perfumes/', {'fields': 'id', 'cursor': ''})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([set(result) for result in response.data['results']], [{'id'}] * 3)
+    
+    def test_writes_ignore_field_selection(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='adminpass123')
+        self.client.force_authenticate(user=admin)
+        perfume = Perfume.objects.first()
+        response = self.client.patch(f'/api/perfumes/{perfume.slug}/?fields=id', {'stock': 9}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('stock', response.data)
+
+
+class MediaServeTest(TestCase):
+    body = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'perfumes'))
+        for name in ('perfumes/plain.jpg', 'perfumes/plain.3f2a9c1e.webp'):
+            with open(os.path.join(self.media_root, name), 'wb') as f:
+                f.write(self.body)
+        settings = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SENDFILE_HEADER='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_full_response_streams_with_validators(self):
+        response = self.client.get('/media/perfumes/plain.jpg')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+        self.assertIn('Last-Modified', response)
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_hashed_names_are_immutable(self):
+        response = self.client.get('/media/perfumes/plain.3f2a9c1e.webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_conditional_get_returns_304(self):
+        first = self.client.get('/media/perfumes/plain.jpg')
+        response = self.client.get('/media/perfumes/plain.jpg', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get('/media/perfumes/plain.jpg', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_range_returns_partial_content(self):
+        response = self.client.get('/media/perfumes/plain.jpg', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), self.body[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.body)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.client.get('/media/perfumes/plain.jpg', HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), self.body[-4:])
+
+    def test_stale_if_range_sends_full_body(self):
+        response = self.client.get('/media/perfumes/plain.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+
+    def test_unsatisfiable_range_returns_416(self):
+        response = self.client.get('/media/perfumes/plain.jpg', HTTP_RANGE=f'bytes={len(self.body)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.body)}')
+
+    def test_head_and_missing_files(self):
+        response = self.client.head('/media/perfumes/plain.jpg')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Length'], str(len(self.body)))
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get('/media/perfumes/missing.jpg').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/media/perfumes').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_sendfile_offload(self):
+        with override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect'):
+            response = self.client.get('/media/perfumes/plain.jpg')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/perfumes/plain.jpg')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_SENDFILE_HEADER='X-Sendfile'):
+            response = self.client.get('/media/perfumes/plain.jpg')
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, 'perfumes/plain.jpg'))
+
+
+class MediaServeAsgiTest(SimpleTestCase):
+    """Media through the ASGI handler (the Dockerfile's uvicorn workers) must stream, not buffer"""
+    body = os.urandom(3 * 1024 * 1024)
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'perfumes'))
+        with open(os.path.join(self.media_root, 'perfumes/large.jpg'), 'wb') as f:
+            f.write(self.body)
+        settings = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SENDFILE_HEADER='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    async def asgi_get(self, path, headers=()):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), *headers], 'client': ('127.0.0.1', 1234),
+            'server': ('testserver', 80),
+        }
+        messages = []
+        requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # The handler listens for a disconnect while it responds
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        await ASGIHandler()(scope, receive, send)
+        start, *bodies = messages
+        return start, [message.get('body', b'') for message in bodies]
+
+    async def test_full_and_range_responses_stream(self):
+        with warnings.catch_warnings():
+            # Django warns, then buffers the whole body, when handed a sync iterator
+            warnings.filterwarnings('error', message='StreamingHttpResponse must consume synchronous iterators')
+            start, chunks = await self.asgi_get('/media/perfumes/large.jpg')
+            self.assertEqual(start['status'], 200)
+            self.assertEqual(b''.join(chunks), self.body)
+            self.assertGreater(len(chunks), 10)
+            self.assertLessEqual(max(len(chunk) for chunk in chunks), 64 * 1024)
+            headers = dict(start['headers'])
+            self.assertEqual(headers[b'Content-Length'], str(len(self.body)).encode())
+
+            start, chunks = await self.asgi_get('/media/perfumes/large.jpg', [(b'range', b'bytes=1000-1999999')])
+            self.assertEqual(start['status'], 206)
+            self.assertEqual(b''.join(chunks), self.body[1000:2000000])
+            self.assertGreater(len(chunks), 10)
+            self.assertEqual(dict(start['headers'])[b'Content-Range'], f'bytes 1000-1999999/{len(self.body)}'.encode())
+
+
+class ImageDerivativeTest(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVE_WIDTHS=(200, 400, 800),
+                                     IMAGE_DERIVATIVE_FORMATS=('webp', 'jpeg'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.category = Category.objects.create(name='Men', slug='men')
+        self.brand = Brand.objects.create(name='Tom Ford', slug='tom-ford')
+
+    def upload(self, size, mode='RGB', fmt='JPEG', name='bottle.jpg'):
+        image_io = io.BytesIO()
+        Image.new(mode, size, color='red').save(image_io, format=fmt)
+        return SimpleUploadedFile(name, image_io.getvalue())
+
+    def create_perfume(self, image):
+        return Perfume.objects.create(
+            name='Oud Wood', brand=self.brand, category=self.category, description='A luxurious fragrance',
+            price=Decimal('250.00'), stock=10, image=image
+        )
+
+    def test_derivatives_generated_on_save(self):
+        perfume = self.create_perfume(self.upload((1000, 500), mode='RGBA', fmt='PNG', name='bottle.png'))
+        derivatives = Perfume.objects.get(pk=perfume.pk).image_derivatives
+        self.assertEqual(derivatives['source'], perfume.image.name)
+        self.assertEqual((derivatives['width'], derivatives['height']), (1000, 500))
+        self.assertEqual(set(derivatives['formats']), {'webp', 'jpeg'})
+        for fmt, names in derivatives['formats'].items():
+            self.assertEqual(list(names), ['200', '400', '800'])
+            for width, name in names.items():
+                self.assertRegex(name, HASHED_NAME_RE)
+                with Image.open(os.path.join(self.media_root, name)) as derivative:
+                    self.assertEqual(derivative.size, (int(width), int(width) // 2))
+                    self.assertEqual(derivative.format, 'WEBP' if fmt == 'webp' else 'JPEG')
+
+    def test_small_images_are_not_upscaled(self):
+        perfume = self.create_perfume(self.upload((300, 300)))
+        self.assertEqual(list(perfume.image_derivatives['formats']['webp']), ['200', '300'])
+
+    def test_serializers_expose_srcset(self):
+        perfume = self.create_perfume(self.upload((900, 900)))
+        PerfumeImage.objects.create(perfume=perfume, image=self.upload((500, 500)))
+        data = self.client.get(f'/api/perfumes/{perfume.slug}/').data
+        webp = data['image_srcset']['webp'].split(', ')
+        self.assertEqual([entry.split(' ')[1] for entry in webp], ['200w', '400w', '800w'])
+        self.assertTrue(webp[0].startswith('http://testserver/media/perfumes/derivatives/'))
+        self.assertIn('500w', data['images'][0]['image_srcset']['jpeg'])
+
+    def test_unreadable_image_has_no_derivatives(self):
+        perfume = self.create_perfume('perfumes/missing.jpg')
+        self.assertEqual(Perfume.objects.get(pk=perfume.pk).image_derivatives, {})
+        data = self.client.get(f'/api/perfumes/{perfume.slug}/').data
+        self.assertEqual(data['image_srcset'], {})
+
+    def test_backfill_command(self):
+        perfume = self.create_perfume(self.upload((600, 600)))
+        Perfume.objects.filter(pk=perfume.pk).update(image_derivatives={})
+        call_command('generate_image_derivatives', workers=1, models=['perfumes.perfume'], stdout=io.StringIO())
+        perfume.refresh_from_db()
+        self.assertEqual(list(perfume.image_derivatives['formats']['jpeg']), ['200', '400', '600'])
+
+        output = io.StringIO()
+        call_command('generate_image_derivatives', workers=1, stdout=output)
+        self.assertIn('up to date', output.getvalue())
+
+
+class ImageResizeTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'perfumes'))
+        Image.new('RGB', (400, 200), color='red').save(os.path.join(self.media_root, 'perfumes/bottle.jpg'), 'JPEG')
+        with open(os.path.join(self.media_root, 'perfumes/notes.txt'), 'w') as f:
+            f.write('not an image')
+        settings = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SENDFILE_HEADER='', IMAGE_RESIZE_MAX_DIMENSION=1000)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def fetch_image(self, params, **headers):
+        response = self.client.get('/media/perfumes/bottle.jpg', params, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, Image.open(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_resize_keeps_aspect_ratio(self):
+        response, image = self.fetch_image({'w': 100})
+        self.assertEqual((image.format, image.size), ('JPEG', (100, 50)))
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        response, image = self.fetch_image({'w': 100, 'h': 20, 'fmt': 'webp'})
+        self.assertEqual((image.format, image.size), ('WEBP', (40, 20)))
+        self.assertEqual(response['Content-Type'], 'image/webp')
+
+        # Never upscaled
+        _, image = self.fetch_image({'w': 900})
+        self.assertEqual(image.size, (400, 200))
+
+    def test_renders_are_cached(self):
+        cache = get_resize_cache()
+        renders = cache.stats['renders']
+        first, _ = self.fetch_image({'w': 120})
+        second, _ = self.fetch_image({'w': 120})
+        self.assertEqual(cache.stats['renders'], renders + 1)
+        self.assertEqual(first['ETag'], second['ETag'])
+        cached = [name for _, _, names in os.walk(os.path.join(self.media_root, '_cache')) for name in names]
+        self.assertEqual(len([name for name in cached if name.endswith('.jpg')]), 1)
+
+        response = self.client.get('/media/perfumes/bottle.jpg', {'w': 120}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_invalid_requests(self):
+        for params in ({'w': 'wide'}, {'w': 0}, {'h': 5000}, {'fmt': 'bmp'}):
+            response = self.client.get('/media/perfumes/bottle.jpg', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        response = self.client.get('/media/perfumes/notes.txt', {'w': 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # Unrelated parameters serve the original
+        response = self.client.get('/media/perfumes/bottle.jpg', {'v': 123})
+        self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).size, (400, 200))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = DiskLRUCache(os.path.join(self.media_root, 'lru'), max_bytes=250)
+        paths = [cache.get_or_render(f'{i:02d}key', 'bin', lambda: b'x' * 100) for i in range(2)]
+        time.sleep(0.01)
+        cache.get_or_render('00key', 'bin', lambda: b'unused')  # hit: 00 is now the most recent
+        cache.get_or_render('02key', 'bin', lambda: b'x' * 100)
+        self.assertTrue(os.path.exists(paths[0]))
+        self.assertFalse(os.path.exists(paths[1]))
+        self.assertEqual(cache.stats['evictions'], 1)
+
+    def test_concurrent_misses_render_once(self):
+        cache = DiskLRUCache(os.path.join(self.media_root, 'flight'), max_bytes=10 ** 6)
+        calls = []
+
+        def slow_render():
+            calls.append(1)
+            time.sleep(0.05)
+            return b'rendered'
+
+        threads = [threading.Thread(target=cache.get_or_render, args=('abkey', 'bin', slow_render)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats['hits'] + cache.stats['misses'], 8)
+
+
+class UploadImagesTest(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVES_IN_BACKGROUND=False,
+                                     IMAGE_DERIVATIVE_WIDTHS=(200,), IMAGE_DERIVATIVE_FORMATS=('webp',))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        admin = User.objects.create_superuser(email='admin@example.com', password='adminpass123')
+        self.client.force_authenticate(user=admin)
+        self.perfume = Perfume.objects.create(
+            name='Oud Wood', brand=Brand.objects.create(name='Tom Ford', slug='tom-ford'),
+            category=Category.objects.create(name='Men', slug='men'),
+            description='A luxurious fragrance', price=Decimal('250.00'), stock=10, image='perfumes/test.jpg'
+        )
+        self.url = f'/api/perfumes/{self.perfume.slug}/upload_images/'
+
+    def photo(self, name):
+        image_io = io.BytesIO()
+        Image.new('RGB', (600, 400), color='blue').save(image_io, format='JPEG')
+        return SimpleUploadedFile(name, image_io.getvalue(), content_type='image/jpeg')
+
+    def upload(self, files):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, {'images': files}, format='multipart')
+        return response, len(context.captured_queries)
+
+    def test_reports_status_per_image(self):
+        broken = SimpleUploadedFile('broken.jpg', b'not really a jpeg', content_type='image/jpeg')
+        response, _ = self.upload([self.photo('front.jpg'), broken, self.photo('side.jpg')])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'rejected', 'created'])
+        self.assertIn('valid image', response.data['results'][1]['error'])
+        self.assertEqual(len(response.data['images']), 2)
+        stored = PerfumeImage.objects.filter(perfume=self.perfume)
+        self.assertEqual(stored.count(), 2)
+        for image in stored:
+            self.assertTrue(os.path.exists(image.image.path))
+            self.assertEqual(list(image.image_derivatives['formats']['webp']), ['200'])
+
+    def test_rows_are_inserted_in_one_query(self):
+        _, small = self.upload([self.photo('a.jpg')])
+        _, large = self.upload([self.photo(f'{i}.jpg') for i in range(6)])
+        self.assertEqual(small, large)
+        self.assertEqual(PerfumeImage.objects.filter(perfume=self.perfume).count(), 7)
+
+    def test_all_invalid_is_rejected(self):
+        broken = SimpleUploadedFile('broken.png', b'garbage', content_type='image/png')
+        response, _ = self.upload([broken])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(PerfumeImage.objects.exists())
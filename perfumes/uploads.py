@@ -0,0 +1,64 @@
+"""Batch gallery uploads: validate, decode and store files in parallel, insert rows in one query"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from PIL import Image
+
+from perfumes_project import images
+from .cache import bump_catalog_version
+from .models import PerfumeImage
+
+
+@dataclass
+class UploadResult:
+    name: str
+    stored_name: str = ''
+    error: str = ''
+    instance: PerfumeImage = None
+
+    @property
+    def ok(self):
+        return not self.error
+
+
+def _store(perfume, upload):
+    """Thread body: decode `upload` fully (catches truncated files) and write it to storage"""
+    try:
+        with Image.open(upload) as image:
+            image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return UploadResult(upload.name, error='Upload a valid image. The file you uploaded was either not an image or a corrupted image.')
+    upload.seek(0)
+    field = PerfumeImage._meta.get_field('image')
+    instance = PerfumeImage(perfume=perfume)
+    name = field.generate_filename(instance, upload.name)
+    try:
+        stored_name = field.storage.save(name, upload, max_length=field.max_length)
+    except OSError as exc:
+        return UploadResult(upload.name, error=f'Could not store the file: {exc}')
+    return UploadResult(upload.name, stored_name=stored_name)
+
+
+def add_gallery_images(perfume, uploads):
+    """
+    Store `uploads` as gallery images of `perfume` and return one UploadResult
+    per file, in order. Invalid files are reported without failing the batch.
+    Rows are inserted with bulk_create, which sends no signals: the catalog
+    version is bumped here and derivatives are scheduled explicitly.
+    """
+    workers = max(1, min(len(uploads), getattr(settings, 'IMAGE_UPLOAD_WORKERS', 4)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-upload') as executor:
+        results = list(executor.map(lambda upload: _store(perfume, upload), uploads))
+
+    stored = [result for result in results if result.ok]
+    if stored:
+        created = PerfumeImage.objects.bulk_create([
+            PerfumeImage(perfume=perfume, image=result.stored_name) for result in stored
+        ])
+        for result, instance in zip(stored, created):
+            result.instance = instance
+        transaction.on_commit(bump_catalog_version)
+        images.schedule_derivatives(PerfumeImage, [instance.pk for instance in created])
+    return results
@@ -2,14 +2,20 @@ from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db import models
+from perfumes_project.mixins import SparseFieldsetMixin
+from perfumes_project.pagination import HybridPagination
 from .models import Category, Brand, Perfume, PerfumeImage
+from .cache import CatalogCacheMixin, get_cache_stats
+from .conditional import ConditionalGetMixin
+from .search import PerfumeSearchFilter
+from .suggest import suggest as get_suggestions
+from .uploads import add_gallery_images
 from .serializers import (
     CategorySerializer, BrandSerializer,
     PerfumeSerializer, PerfumeDetailSerializer, PerfumeImageSerializer
 )
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -23,7 +29,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]
         return [permissions.IsAuthenticatedOrReadOnly()]
 
-class BrandViewSet(viewsets.ModelViewSet):
+class BrandViewSet(SparseFieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -37,15 +43,17 @@ class BrandViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]
         return [permissions.IsAuthenticatedOrReadOnly()]
 
-class PerfumeViewSet(viewsets.ModelViewSet):
+class PerfumeViewSet(SparseFieldsetMixin, ConditionalGetMixin, CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Perfume.objects.filter(is_active=True)
     serializer_class = PerfumeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, PerfumeSearchFilter, filters.OrderingFilter]
     filterset_fields = ['brand', 'category', 'gender', 'is_featured']
     search_fields = ['name', 'description', 'brand__name', 'category__name']
     ordering_fields = ['name', 'price', 'created_at']
+    pagination_class = HybridPagination
+    conditional_actions = ('list', 'retrieve', 'featured', 'on_sale')
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -55,14 +63,15 @@ class PerfumeViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [permissions.IsAdminUser()]
-        return [permissions.IsAuthenticatedOrReadOnly()]
+        # Honour per-action permission_classes (admin-only actions)
+        return super().get_permissions()
     
     def get_queryset(self):
-        queryset = Perfume.objects.all()
+        queryset = Perfume.objects.for_catalog()
         
         # Admin can see inactive perfumes
         if not self.request.user.is_staff:
-            queryset = queryset.filter(is_active=True)
+            queryset = queryset.active()
             
         # Filter by price range
         min_price = self.request.query_params.get('min_price')
@@ -81,31 +90,61 @@ class PerfumeViewSet(viewsets.ModelViewSet):
         # Filter by on_sale
         on_sale = self.request.query_params.get('on_sale')
         if on_sale and on_sale.lower() == 'true':
-            queryset = queryset.filter(
-                discount_price__isnull=False
-            ).exclude(discount_price__gte=models.F('price'))
+            queryset = queryset.on_sale()
             
         return queryset
     
+    def get_featured_queryset(self):
+        return Perfume.objects.featured()
+    
+    def get_on_sale_queryset(self):
+        return Perfume.objects.active().on_sale()
+    
+    def get_conditional_queryset(self):
+        if self.action == 'featured':
+            return self.get_featured_queryset()
+        if self.action == 'on_sale':
+            return self.get_on_sale_queryset()
+        return super().get_conditional_queryset()
+    
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        featured_perfumes = Perfume.objects.filter(is_featured=True, is_active=True)
-        serializer = self.get_serializer(featured_perfumes, many=True)
-        return Response(serializer.data)
+        def build_response():
+            featured_perfumes = self.prune_queryset(self.get_featured_queryset().for_catalog())
+            serializer = self.get_serializer(featured_perfumes, many=True)
+            return Response(serializer.data)
+        return self.conditional_response(request, lambda: self.cached_response(request, build_response))
     
     @action(detail=False, methods=['get'])
     def on_sale(self, request):
-        on_sale_perfumes = Perfume.objects.filter(
-            discount_price__isnull=False,
-            is_active=True
-        ).exclude(discount_price__gte=models.F('price'))
-        
-        serializer = self.get_serializer(on_sale_perfumes, many=True)
-        return Response(serializer.data)
+        def build_response():
+            on_sale_perfumes = self.prune_queryset(self.get_on_sale_queryset().for_catalog())
+            serializer = self.get_serializer(on_sale_perfumes, many=True)
+            return Response(serializer.data)
+        return self.conditional_response(request, lambda: self.cached_response(request, build_response))
+    
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Typeahead suggestions served from the in-process prefix index"""
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            limit = 8
+        return Response({'query': query, 'results': get_suggestions(query, limit)})
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        """Hit/miss counters for the catalog response cache"""
+        return Response(get_cache_stats())
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def upload_images(self, request, slug=None):
-        """Upload multiple images for a perfume"""
+        """
+        Upload multiple images for a perfume. Files are decoded and stored in
+        parallel; each gets a status in `results`, so one bad file does not
+        reject the others. Derivatives are built after the response.
+        """
         perfume = self.get_object()
         images = request.FILES.getlist('images')
         
@@ -115,19 +154,22 @@ class PerfumeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        uploaded_images = []
-        for image in images:
-            perfume_image = PerfumeImage.objects.create(
-                perfume=perfume,
-                image=image
-            )
-            serializer = PerfumeImageSerializer(perfume_image)
-            uploaded_images.append(serializer.data)
+        results = add_gallery_images(perfume, images)
+        created = [result.instance for result in results if result.ok]
+        uploaded_images = PerfumeImageSerializer(created, many=True, context=self.get_serializer_context()).data
+        
+        statuses = []
+        for result in results:
+            if result.ok:
+                statuses.append({'name': result.name, 'status': 'created', 'id': result.instance.id})
+            else:
+                statuses.append({'name': result.name, 'status': 'rejected', 'error': result.error})
         
         return Response({
-            'message': f'{len(uploaded_images)} images uploaded successfully',
-            'images': uploaded_images
-        }, status=status.HTTP_201_CREATED)
+            'message': f'{len(created)} of {len(results)} images uploaded successfully',
+            'images': uploaded_images,
+            'results': statuses
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['delete'], permission_classes=[permissions.IsAdminUser])
     def delete_image(self, request, slug=None):
@@ -0,0 +1,31 @@
+"""Helpers shared by the benchmark_* management commands"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run a block inside a transaction that is always rolled back, so synthetic data never persists"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+
+def timed(func, repeat=5):
+    """Call func `repeat` times and return (median, best) wall time in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
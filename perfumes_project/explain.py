@@ -0,0 +1,30 @@
+"""EXPLAIN helpers used to check that hot queries hit their indexes"""
+from django.db import connections
+
+
+def query_plan(queryset):
+    """
+    Return the textual query plan for a queryset.
+
+    On PostgreSQL sequential scans are disabled for the duration of the
+    EXPLAIN: small test tables would otherwise always be scanned, which says
+    nothing about whether a usable index exists.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+
+    with connection.cursor() as cursor:
+        cursor.execute('SET enable_seqscan = off')
+        try:
+            return queryset.explain()
+        finally:
+            cursor.execute('RESET enable_seqscan')
+
+
+class IndexUsageMixin:
+    """TestCase mixin asserting that a queryset's plan uses a named index"""
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = query_plan(queryset)
+        self.assertIn(index_name, plan, f'{index_name} not used:\n{plan}')
@@ -0,0 +1,223 @@
+"""
+On-demand resized media (``/media/<path>?w=&h=&fmt=``), kept in a size-bounded
+disk cache under ``MEDIA_ROOT/_cache``.
+
+Entries are keyed on the source's path, mtime and size plus the requested
+variant, so replacing an image never serves a stale rendering. Recency is
+tracked in each entry's atime (set explicitly on hits, so noatime mounts are
+fine) and the least recently used entries are evicted once the cache grows
+past IMAGE_RESIZE_CACHE_MAX_BYTES. Renders are single-flight: a per-key file
+lock makes concurrent requests, across threads and worker processes, wait
+for the first render instead of repeating it.
+"""
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .images import FORMATS, _prepare, encodable_formats
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+CACHE_DIRNAME = '_cache'
+# Evict down to this share of the limit, so eviction does not run on every write
+EVICT_TO = 0.9
+
+RESIZE_PARAMS = ('w', 'h', 'fmt')
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+
+
+class InvalidResize(ValueError):
+    """Resize parameters that cannot be honoured (reported as 400)"""
+
+
+def parse_resize(params):
+    """
+    ``(width, height, fmt)`` from query parameters, or None when no resize
+    was asked for. Raises InvalidResize for malformed or oversized requests.
+    """
+    if not any(params.get(name) for name in RESIZE_PARAMS):
+        return None
+    limit = getattr(settings, 'IMAGE_RESIZE_MAX_DIMENSION', 2000)
+    size = []
+    for name in ('w', 'h'):
+        value = params.get(name)
+        if not value:
+            size.append(None)
+            continue
+        try:
+            value = int(value)
+        except ValueError:
+            raise InvalidResize(f'{name} must be an integer')
+        if not 1 <= value <= limit:
+            raise InvalidResize(f'{name} must be between 1 and {limit}')
+        size.append(value)
+    fmt = params.get('fmt')
+    if fmt:
+        fmt = FORMAT_ALIASES.get(fmt.lower(), fmt.lower())
+        if fmt not in encodable_formats():
+            raise InvalidResize(f'Unsupported format: {params.get("fmt")}')
+    return size[0], size[1], fmt or None
+
+
+def default_format(source_path):
+    """Output format when ?fmt= is absent: the source's, by extension"""
+    extension = os.path.splitext(source_path)[1].lstrip('.').lower()
+    extension = FORMAT_ALIASES.get(extension, extension)
+    return extension if extension in encodable_formats() else 'jpeg'
+
+
+def render(source_path, width, height, fmt):
+    """Encoded bytes of `source_path` as `fmt`, fitted inside width x height (never upscaled)"""
+    with Image.open(source_path) as image:
+        target = (width or image.width, height or image.height)
+        # JPEG can decode straight to a power-of-two reduction of the target size
+        image.draft('RGB', target)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        _, pillow_format, options = FORMATS[fmt]
+        buffer = io.BytesIO()
+        _prepare(image, fmt).save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+class DiskLRUCache:
+    """Files under `root`, evicted least recently used first once over `max_bytes`"""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'renders': 0, 'evictions': 0}
+        # Size of the cache: scanned on the first write, then grown by this
+        # process's writes until it passes the limit and eviction rescans
+        self._estimated = None
+        self._lock = threading.Lock()
+        self._thread_locks = {}
+
+    def path(self, key, extension):
+        return os.path.join(self.root, key[:2], f'{key}.{extension}')
+
+    def get(self, path):
+        try:
+            stat = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, path, data):
+        """Write atomically: readers never see a partial file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._written(len(data))
+        return path
+
+    @contextmanager
+    def single_flight(self, key):
+        """Hold the lock for `key` (striped: keys with the same two-character prefix share a lock file)"""
+        stripe = key[:2]
+        with self._lock:
+            thread_lock = self._thread_locks.setdefault(stripe, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            lock_dir = os.path.join(self.root, 'locks')
+            os.makedirs(lock_dir, exist_ok=True)
+            with open(os.path.join(lock_dir, stripe), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_or_render(self, key, extension, render_func):
+        path = self.path(key, extension)
+        if self.get(path):
+            self.stats['hits'] += 1
+            return path
+        self.stats['misses'] += 1
+        with self.single_flight(key):
+            # Another thread or process may have rendered it while we waited
+            if self.get(path):
+                return path
+            data = render_func()
+            self.stats['renders'] += 1
+            return self.put(path, data)
+
+    def _entries(self):
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [name for name in dirnames if name != 'locks']
+            for filename in filenames:
+                if filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_atime_ns, stat.st_size, path
+
+    def _written(self, size):
+        with self._lock:
+            if self._estimated is None:
+                self._estimated = sum(entry[1] for entry in self._entries())
+            else:
+                self._estimated += size
+            if self._estimated <= self.max_bytes:
+                return
+            self._estimated = self.evict()
+
+    def evict(self, target=None):
+        """Delete least recently used entries until the cache fits `target` bytes; returns the new size"""
+        target = self.max_bytes * EVICT_TO if target is None else target
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats['evictions'] += 1
+        return total
+
+
+_caches = {}
+
+
+def get_resize_cache():
+    """The cache for the current MEDIA_ROOT"""
+    root = os.path.join(settings.MEDIA_ROOT, CACHE_DIRNAME)
+    max_bytes = getattr(settings, 'IMAGE_RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+    cache = _caches.get(root)
+    if cache is None or cache.max_bytes != max_bytes:
+        cache = _caches[root] = DiskLRUCache(root, max_bytes)
+    return cache
+
+
+def resized(source_path, stat, width, height, fmt):
+    """Path of the cached rendering of `source_path`, rendering it on a miss"""
+    fmt = fmt or default_format(source_path)
+    key = hashlib.sha256(
+        f'{source_path}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{height}|{fmt}'.encode()
+    ).hexdigest()
+    return get_resize_cache().get_or_render(key, FORMATS[fmt][0], lambda: render(source_path, width, height, fmt))
@@ -0,0 +1,206 @@
+"""
+Responsive image derivatives: resized WebP/JPEG (and optionally AVIF) copies
+of uploaded images, recorded on the model in a JSON map
+
+    {"source": "perfumes/rose.jpg", "width": 1600, "height": 1200,
+     "formats": {"webp": {"200": "perfumes/derivatives/rose-200w.1c9e0a5d7b24.webp", ...}, ...}}
+
+Derivative names carry a hash of the source content, so they are served as
+immutable (see media_views) and never need cache busting.
+"""
+import hashlib
+import io
+import logging
+import posixpath
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps, features
+
+from jobs.queue import enqueue
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    # name: (extension, Pillow format, save options)
+    'avif': ('avif', 'AVIF', {'quality': 55}),
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'png': ('png', 'PNG', {'optimize': True}),
+}
+DERIVATIVES_DIR = 'derivatives'
+
+
+@dataclass(frozen=True)
+class DerivativeSource:
+    model: type
+    image_field: str
+    derivatives_field: str
+    on_change: object = None
+
+
+# Every model image with derivatives, filled by register()
+REGISTRY = []
+
+
+def encodable_formats():
+    """Formats of FORMATS this Pillow build can write"""
+    return [name for name in FORMATS if name != 'avif' or features.check('avif')]
+
+
+def get_formats():
+    """Configured derivative formats this Pillow build can encode"""
+    names = getattr(settings, 'IMAGE_DERIVATIVE_FORMATS', ('webp', 'jpeg'))
+    return [name for name in names if name in encodable_formats()]
+
+
+def get_widths(original_width):
+    """Configured widths below the original, plus the original width when it is smaller than the largest"""
+    configured = sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (200, 400, 800)))
+    widths = [width for width in configured if width < original_width]
+    if not configured or original_width < configured[-1]:
+        widths.append(original_width)
+    return widths
+
+
+def _prepare(image, fmt):
+    if fmt == 'jpeg' or image.mode not in ('RGBA', 'LA', 'P'):
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # JPEG has no alpha: flatten onto white like the catalog background
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB') if image.mode != 'RGB' else image
+    return image.convert('RGBA')
+
+
+def derivative_name(source_name, width, fmt, digest):
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, DERIVATIVES_DIR, f'{stem}-{width}w.{digest}.{FORMATS[fmt][0]}')
+
+
+def build_derivatives(name, storage=None):
+    """
+    Write the derivatives of the stored image `name` and return its map.
+    Touches only storage, never the database, so it can run in worker processes.
+    Files that already exist (same source content) are reused.
+    """
+    storage = storage or default_storage
+    with storage.open(name, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    with Image.open(io.BytesIO(data)) as opened:
+        original = ImageOps.exif_transpose(opened)
+        original.load()
+
+    formats = {fmt: {} for fmt in get_formats()}
+    for width in get_widths(original.width):
+        height = max(1, round(original.height * width / original.width))
+        resized = None
+        for fmt, names in formats.items():
+            target = derivative_name(name, width, fmt, digest)
+            if not storage.exists(target):
+                if resized is None:
+                    resized = original if width == original.width else original.resize(
+                        (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+                    )
+                _, pillow_format, options = FORMATS[fmt]
+                buffer = io.BytesIO()
+                _prepare(resized, fmt).save(buffer, pillow_format, **options)
+                target = storage.save(target, ContentFile(buffer.getvalue()))
+            names[str(width)] = target
+    return {'source': name, 'width': original.width, 'height': original.height, 'formats': formats}
+
+
+def needs_refresh(name, derivatives):
+    derivatives = derivatives or {}
+    return (derivatives.get('source') or '') != (name or '')
+
+
+def refresh_derivatives(instance, image_field, derivatives_field, force=False):
+    """
+    Bring `instance`'s derivative map in line with its image. Returns True when
+    the map was rewritten. Images that cannot be read are logged and left
+    without derivatives; the backfill command retries them. Like Django's
+    FileField, replaced files are left in storage.
+    """
+    file = getattr(instance, image_field)
+    old = getattr(instance, derivatives_field) or {}
+    if not force and not needs_refresh(file.name, old):
+        return False
+    new = {}
+    if file.name:
+        try:
+            new = build_derivatives(file.name, file.storage)
+        except (OSError, ValueError, Image.DecompressionBombError) as exc:
+            logger.warning('Could not build derivatives of %s: %s', file.name, exc)
+            if not old:
+                return False
+    if new == old:
+        return False
+    type(instance)._default_manager.filter(pk=instance.pk).update(**{derivatives_field: new})
+    setattr(instance, derivatives_field, new)
+    return True
+
+
+def register(model, image_field, derivatives_field, on_change=None):
+    """
+    Generate derivatives whenever an instance of `model` is saved with a new
+    image. `on_change` is called after a map is rewritten (cache invalidation).
+    """
+    source = DerivativeSource(model, image_field, derivatives_field, on_change)
+    REGISTRY.append(source)
+
+    def image_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and image_field not in update_fields):
+            return
+        if refresh_derivatives(instance, image_field, derivatives_field) and on_change is not None:
+            on_change()
+
+    post_save.connect(image_saved, sender=model, weak=False,
+                      dispatch_uid=f'image_derivatives_{model._meta.label_lower}_{image_field}')
+    return source
+
+
+def refresh_many(model, pks):
+    """Refresh the derivatives of `model` rows `pks`; calls on_change once if any map changed"""
+    source = next(source for source in REGISTRY if source.model is model)
+    rows = source.model._default_manager.filter(pk__in=pks).only('pk', source.image_field, source.derivatives_field)
+    changed = False
+    for instance in rows:
+        changed |= refresh_derivatives(instance, source.image_field, source.derivatives_field)
+    if changed and source.on_change is not None:
+        source.on_change()
+
+
+def refresh_job(model, pks):
+    """Job body (jobs.queue): refresh_many() for the model labelled `model`"""
+    refresh_many(apps.get_model(model), pks)
+
+
+def schedule_derivatives(model, pks):
+    """
+    Build derivatives for rows saved without signals (bulk_create): by a job
+    queued in the current transaction when IMAGE_DERIVATIVES_IN_BACKGROUND is
+    set, else inline once the transaction commits.
+    """
+    pks = list(pks)
+    if not getattr(settings, 'IMAGE_DERIVATIVES_IN_BACKGROUND', False):
+        transaction.on_commit(lambda: refresh_many(model, pks))
+        return
+    enqueue(refresh_job, {'model': model._meta.label_lower, 'pks': pks})
+
+
+def srcsets(derivatives, build_url):
+    """``{"webp": "<url> 200w, <url> 400w", ...}`` from a derivative map"""
+    return {
+        fmt: ', '.join(f'{build_url(name)} {width}w' for width, name in sorted(names.items(), key=lambda item: int(item[0])))
+        for fmt, names in (derivatives or {}).get('formats', {}).items() if names
+    }
@@ -1,50 +1,231 @@
-from django.http import HttpResponse, Http404
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest, Http404, StreamingHttpResponse
 from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.decorators import method_decorator
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
 from django.views import View
+from PIL import Image
+from urllib.parse import quote
 import os
+import re
 import mimetypes
 
+from .image_cache import InvalidResize, parse_resize, resized
+
+# Names carrying a content hash (``photo.3f2a9c1e.webp``) never change content
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{8,64}\.[A-Za-z0-9]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, HEAD, OPTIONS',
+    'Access-Control-Allow-Headers': 'Origin, Content-Type, Accept, Authorization, Range',
+    'Access-Control-Expose-Headers': 'Content-Length, Content-Range, Accept-Ranges, ETag',
+    'Access-Control-Max-Age': '86400',
+}
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single ``bytes=`` range, None to ignore the
+    header (absent, malformed or multi-range: the full body is sent) and
+    ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def aread_file(f, length):
+    """
+    read_range() for ASGI, where a sync iterator would be read whole into
+    memory before sending: `length` bytes from the current position of the
+    open file `f`, each chunk read in a worker thread. Closes `f`.
+    """
+    read = sync_to_async(f.read, thread_sensitive=False)
+    try:
+        while length > 0:
+            chunk = await read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def open_at(path, start):
+    f = open(path, 'rb')
+    f.seek(start)
+    return f
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class MediaServeView(View):
-    """Custom media serving view with CORS headers"""
-    
+    """
+    Media files with CORS headers, streamed (from an async iterator under
+    ASGI, or offloaded to the front server with MEDIA_SENDFILE_HEADER) and
+    cacheable: ETag/Last-Modified validators,
+    conditional GET, single byte ranges, and immutable caching for
+    content-hashed names. Images can be resized on the fly with
+    ``?w=&h=&fmt=`` (see image_cache).
+    """
+
     def get(self, request, path):
         """Serve media files with CORS headers"""
-        # Construct the full file path
-        file_path = os.path.join(settings.MEDIA_ROOT, path)
-        
-        # Check if file exists
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
+        try:
+            file_path = safe_join(settings.MEDIA_ROOT, path)
+        except SuspiciousFileOperation:
             raise Http404("Media file not found")
-        
-        # Get the file's MIME type
-        content_type, _ = mimetypes.guess_type(file_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
-        
-        # Read and serve the file
         try:
-            with open(file_path, 'rb') as f:
-                response = HttpResponse(f.read(), content_type=content_type)
-                
-                # Add CORS headers
-                response['Access-Control-Allow-Origin'] = '*'
-                response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-                response['Access-Control-Allow-Headers'] = 'Origin, Content-Type, Accept, Authorization'
-                response['Access-Control-Max-Age'] = '86400'
-                
-                return response
-        except IOError:
+            stat = os.stat(file_path)
+        except OSError:
+            raise Http404("Media file not found")
+        if not os.path.isfile(file_path):
+            raise Http404("Media file not found")
+
+        try:
+            resize = parse_resize(request.GET)
+        except InvalidResize as exc:
+            return HttpResponseBadRequest(str(exc))
+        if resize is None:
+            return self.serve(request, path, file_path, stat)
+
+        # Validators follow the source and the requested variant, so revalidation never renders
+        etag = '"%x-%x-%s"' % (stat.st_mtime_ns, stat.st_size, '-'.join(str(value) for value in resize))
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return self._finalize(response, path, etag, last_modified)
+        try:
+            variant_path = resized(file_path, stat, *resize)
+            variant_stat = os.stat(variant_path)
+        except (Image.UnidentifiedImageError, Image.DecompressionBombError):
+            return HttpResponseBadRequest('Not a resizable image')
+        except OSError:
             raise Http404("Error reading media file")
-    
+        return self.serve(request, path, variant_path, variant_stat, etag=etag, last_modified=last_modified)
+
+    def serve(self, request, path, file_path, stat, etag=None, last_modified=None):
+        size = stat.st_size
+        etag = etag or '"%x-%x"' % (stat.st_mtime_ns, size)
+        last_modified = last_modified or int(stat.st_mtime)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return self._finalize(response, path, etag, last_modified)
+
+        content_type, encoding = mimetypes.guess_type(file_path)
+        if content_type is None:
+            content_type = 'application/octet-stream'
+
+        byte_range = None
+        if self._range_applies(request, etag, last_modified):
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return self._finalize(response, path, etag, last_modified)
+
+        sendfile_header = getattr(settings, 'MEDIA_SENDFILE_HEADER', '')
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+            response['Content-Length'] = str(size)
+        elif sendfile_header:
+            # The front server reads the file and handles Range itself
+            response = HttpResponse(content_type=content_type)
+            if sendfile_header.lower() == 'x-accel-redirect':
+                relative = os.path.relpath(file_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                response[sendfile_header] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + relative)
+            else:
+                response[sendfile_header] = file_path
+        elif isinstance(request, ASGIRequest):
+            # Served by an ASGI server: stream from an async iterator
+            start, end = byte_range or (0, size - 1)
+            try:
+                f = open_at(file_path, start)
+            except OSError:
+                raise Http404("Error reading media file")
+            response = StreamingHttpResponse(aread_file(f, end - start + 1),
+                                             status=206 if byte_range else 200, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            if byte_range:
+                response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            else:
+                # As FileResponse would
+                response['Content-Disposition'] = content_disposition_header(False, os.path.basename(file_path))
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(read_range(file_path, start, end - start + 1),
+                                             status=206, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            try:
+                response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+            except OSError:
+                raise Http404("Error reading media file")
+
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return self._finalize(response, path, etag, last_modified)
+
+    def _range_applies(self, request, etag, last_modified):
+        """If-Range: honour Range only while the client's copy is still current"""
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range == etag
+        return parse_http_date_safe(if_range) == last_modified
+
+    def _finalize(self, response, path, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        if HASHED_NAME_RE.search(path):
+            patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=getattr(settings, 'MEDIA_MAX_AGE', 3600))
+        for header, value in CORS_HEADERS.items():
+            response[header] = value
+        return response
+
     def options(self, request, path):
         """Handle CORS preflight requests"""
         response = HttpResponse()
-        response['Access-Control-Allow-Origin'] = '*'
-        response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-        response['Access-Control-Allow-Headers'] = 'Origin, Content-Type, Accept, Authorization'
-        response['Access-Control-Max-Age'] = '86400'
-        return response
\ No newline at end of file
+        for header, value in CORS_HEADERS.items():
+            response[header] = value
+        return response
@@ -0,0 +1,26 @@
+"""Viewset mixins shared by the apps"""
+from .serializers import get_field_selection, prune_queryset
+
+
+class SparseFieldsetMixin:
+    """
+    Pair with DynamicFieldsMixin serializers: when a read selects fields with
+    ``?fields=`` / ``?omit=``, the queryset is pruned to match so unneeded
+    columns and relations are never loaded.
+    """
+
+    def get_sparse_columns(self):
+        """Columns read outside the serializer, e.g. by the cursor paginator"""
+        cursor_class = getattr(self.paginator, 'cursor_pagination_class', None)
+        if cursor_class is not None and getattr(self.paginator, 'cursor_query_param', None) in self.request.query_params:
+            return [name.lstrip('-') for name in cursor_class.ordering]
+        return []
+
+    def prune_queryset(self, queryset):
+        selected, omitted = get_field_selection(self.request)
+        if not (selected or omitted):
+            return queryset
+        return prune_queryset(queryset, self.get_serializer(), self.get_sparse_columns())
+
+    def filter_queryset(self, queryset):
+        return self.prune_queryset(super().filter_queryset(queryset))
@@ -0,0 +1,42 @@
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+
+# Largest page a client can ask for with ?page_size=; bigger dumps go through
+# dedicated endpoints (aggregates, exports) instead
+MAX_PAGE_SIZE = 100
+
+
+class StandardPagination(PageNumberPagination):
+    """Default pagination: PAGE_SIZE rows, or ?page_size= up to MAX_PAGE_SIZE"""
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination on (-created_at, id): no COUNT(*) and no OFFSET scan"""
+    ordering = ('-created_at', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class HybridPagination(StandardPagination):
+    """
+    Page-number pagination by default (the admin UI relies on counts and page
+    jumps), switching to cursor pagination when the request opts in with
+    ``?cursor=`` (an empty value starts from the first page).
+    """
+    cursor_query_param = 'cursor'
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,194 @@
+"""Serializer helpers shared by the apps"""
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from .images import srcsets
+
+
+def _param_list(request, name):
+    if request is None:
+        return []
+    return [value.strip() for value in request.query_params.get(name, '').split(',') if value.strip()]
+
+
+def get_expanded(request):
+    """Names listed in ``?expand=a,b`` (empty without a request)"""
+    return set(_param_list(request, 'expand'))
+
+
+def get_field_selection(request):
+    """
+    ``(fields, omit)`` lists from ``?fields=`` and ``?omit=``, only honoured
+    on reads. Dotted names address nested serializers: ``items.quantity``.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return [], []
+    return _param_list(request, 'fields'), _param_list(request, 'omit')
+
+
+def _serializer_path(serializer):
+    """Dotted position of a serializer below the root serializer ('' for the root)"""
+    names = []
+    while serializer.parent is not None:
+        if serializer.field_name:
+            names.append(serializer.field_name)
+        serializer = serializer.parent
+    return '.'.join(reversed(names))
+
+
+def _names_at(names, path, leaf_only=False):
+    """Field names addressed at `path`: 'items.quantity' gives 'items' at the root and 'quantity' at 'items'"""
+    prefix = f'{path}.' if path else ''
+    found = set()
+    for name in names:
+        if name.startswith(prefix) and len(name) > len(prefix):
+            rest = name[len(prefix):]
+            if not leaf_only or '.' not in rest:
+                found.add(rest.split('.')[0])
+    return found
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets: ``?fields=id,name`` keeps only the listed fields and
+    ``?omit=description`` drops fields, at any nesting level
+    (``?fields=id,items.quantity``). Unknown names are ignored.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected, omitted = get_field_selection(self.context.get('request'))
+        if not (selected or omitted):
+            return fields
+        path = _serializer_path(self)
+        keep = _names_at(selected, path)
+        if keep:
+            fields = {name: field for name, field in fields.items() if name in keep}
+        for name in _names_at(omitted, path, leaf_only=True):
+            fields.pop(name, None)
+        return fields
+
+
+def _flatten_select_related(tree, prefix=''):
+    for name, children in tree.items():
+        yield f'{prefix}{name}'
+        yield from _flatten_select_related(children, f'{prefix}{name}__')
+
+
+def prune_queryset(queryset, serializer, extra_columns=()):
+    """
+    Restrict `queryset` to what `serializer` (after field selection) renders:
+    select_related/prefetch_related lookups for relations that are not
+    rendered are dropped, and the model's columns are limited with only().
+
+    Fields backed by properties declare the columns they read in
+    ``Meta.field_dependencies``; if a rendered field's columns cannot be
+    determined, columns are left alone and only relations are pruned.
+    """
+    serializer = getattr(serializer, 'child', serializer)
+    model = queryset.model
+    dependencies = getattr(getattr(serializer, 'Meta', None), 'field_dependencies', {})
+    annotations = queryset.query.annotations
+
+    columns = {model._meta.pk.name, *extra_columns}
+    # relation -> columns of the related row that are read (None: all of them)
+    relations = {}
+    prune_columns = True
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in dependencies:
+            columns.update(dependencies[name])
+            continue
+        if field.source == '*':
+            prune_columns = False
+            continue
+        attr = field.source_attrs[0]
+        if attr in annotations:
+            continue
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            prune_columns = False
+            continue
+        if model_field.concrete:
+            columns.add(attr)
+        if not model_field.is_relation:
+            continue
+        if len(field.source_attrs) == 1 and isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField)):
+            # Primary key fields read the foreign key column only
+            continue
+        if len(field.source_attrs) == 2 and relations.get(attr, set()) is not None:
+            relations.setdefault(attr, set()).add(field.source_attrs[1])
+        else:
+            relations[attr] = None
+
+    select_related = queryset.query.select_related
+    if isinstance(select_related, dict):
+        kept = [lookup for lookup in _flatten_select_related(select_related) if lookup.split('__')[0] in relations]
+        queryset = queryset.select_related(None)
+        if kept:
+            queryset = queryset.select_related(*kept)
+        for lookup in kept:
+            relation = lookup.split('__')[0]
+            if '__' in lookup:
+                # A deeper join needs the whole related row
+                relations[relation] = None
+        for relation in {lookup.split('__')[0] for lookup in kept}:
+            # brand.name reads one column of the joined row; naming only the
+            # relation loads all of it (nested serializers)
+            if relations[relation] is not None:
+                columns.update(f'{relation}__{name}' for name in relations[relation])
+
+    lookups = queryset._prefetch_related_lookups
+    if lookups:
+        kept = [
+            lookup for lookup in lookups
+            if (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split('__')[0] in relations
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*kept)
+
+    if prune_columns:
+        for ordering in queryset.query.order_by or model._meta.ordering:
+            name = ordering.lstrip('-') if isinstance(ordering, str) else ''
+            if name and name != '?' and '__' not in name and name not in annotations:
+                columns.add(model._meta.pk.name if name == 'pk' else name)
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+class ExpandableFieldsMixin:
+    """
+    Serialize relations compactly unless the client opts in to the full
+    representation with ``?expand=<name>``. Declare the detailed variants on
+    Meta as ``expandable_fields = {name: (field_name, field_class, kwargs)}``;
+    the declared field of the same `field_name` is the compact default.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expanded = get_expanded(self.context.get('request'))
+        for name, (field_name, field_class, kwargs) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expanded:
+                fields[field_name] = field_class(**kwargs)
+        return fields
+
+
+class SrcsetField(serializers.ReadOnlyField):
+    """
+    Resized variants of an image from its derivative map, one ``srcset`` value
+    per format: ``{"webp": "<url> 200w, <url> 400w", "jpeg": ...}``.
+    Empty until the derivatives have been generated.
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+
+        def build_url(name):
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return srcsets(value, build_url)
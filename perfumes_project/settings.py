@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third party apps
     'rest_framework',
     'django_filters',
@@ -33,6 +34,7 @@ INSTALLED_APPS = [
     'perfumes',
     'users',
     'orders',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -78,6 +80,67 @@ DATABASES = {
     )
 }
 
+# Cache
+# Use Redis (or any Redis-compatible server) when REDIS_URL is set, local memory otherwise
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'perfumes-plug',
+        }
+    }
+
+# Catalog response cache (invalidated by catalog changes, the timeout is only a safety net).
+# The version counter that invalidates it is kept in this cache, so once several
+# processes change the catalog (web workers, run_workers) it must be shared:
+# check perfumes.E001 requires REDIS_URL then
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 60 * 60))
+
+# Checkout pricing (orders.pricing): used when no ShippingRate / TaxRate row
+# matches the delivery province; rate tables are cached in PRICING_CACHE_ALIAS
+ORDER_TAX_RATE = os.environ.get('ORDER_TAX_RATE', '0.10')
+ORDER_SHIPPING_FEE = os.environ.get('ORDER_SHIPPING_FEE', '0.00')
+PRICING_CACHE_ALIAS = 'default'
+
+# Live order updates (orders.events, GET /api/orders/stream/): outbox poll interval
+# and lookback for late commits, heartbeat comment interval, stream lifetime before
+# the client reconnects, events replayed from Last-Event-ID, and how long a stream
+# ticket (POST /api/orders/stream_ticket/) stays valid
+ORDER_EVENTS_POLL_INTERVAL = float(os.environ.get('ORDER_EVENTS_POLL_INTERVAL', 1.0))
+ORDER_EVENTS_LOOKBACK = 5
+ORDER_EVENTS_HEARTBEAT = 15
+ORDER_EVENTS_MAX_AGE = 5 * 60
+ORDER_EVENTS_REPLAY = 100
+ORDER_EVENTS_TICKET_MAX_AGE = 30
+# Outbox rows older than this are deleted by orders.events.prune_events (see
+# JOBS_PERIODIC); a client offline for longer reloads instead of replaying
+ORDER_EVENTS_RETENTION = 24 * 60 * 60
+
+# Background jobs (jobs.queue): attempts before a job is marked failed, retry
+# delay (doubled per attempt, capped) and how long a running job may go
+# without finishing before it is assumed lost and requeued
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BACKOFF = 10
+JOBS_RETRY_BACKOFF_MAX = 60 * 60
+JOBS_LEASE = int(os.environ.get('JOBS_LEASE', 10 * 60))
+# Tasks run every N seconds by the workers
+JOBS_PERIODIC = {
+    'orders.events.prune_events': 60 * 60,
+}
+
+# Full-text search configuration for the perfume catalog (PostgreSQL only)
+PERFUME_SEARCH_CONFIG = os.environ.get('PERFUME_SEARCH_CONFIG', 'english')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,6 +172,28 @@ MEDIA_URL = '/media/'
 # MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_ROOT = os.environ.get('RAILWAY_VOLUME_MOUNT_PATH', os.path.join(BASE_DIR, 'media'))
 
+# Hand media bodies to the front server instead of streaming them from a worker:
+# 'X-Accel-Redirect' (nginx, internal location at MEDIA_ACCEL_REDIRECT_PREFIX) or 'X-Sendfile' (Apache, lighttpd)
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+# Browser cache lifetime of media whose name carries no content hash (hashed names are immutable)
+MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 3600))
+
+# Resized copies generated for uploaded images (perfumes_project.images), smallest first.
+# 'avif' is skipped when Pillow was built without AVIF support.
+IMAGE_DERIVATIVE_WIDTHS = (200, 400, 800)
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')
+# Derivatives of batch uploads are built by a job (manage.py run_workers) instead of
+# inline after commit. Only enable where a worker process runs alongside the web
+# server, otherwise the jobs are queued and never processed
+IMAGE_DERIVATIVES_IN_BACKGROUND = os.environ.get('IMAGE_DERIVATIVES_IN_BACKGROUND', 'False') == 'True'
+# Threads decoding and storing files in PerfumeViewSet.upload_images
+IMAGE_UPLOAD_WORKERS = 4
+# On-the-fly resizing (/media/<path>?w=&h=&fmt=): largest width/height served and
+# size bound of the rendered-variant cache under MEDIA_ROOT/_cache
+IMAGE_RESIZE_MAX_DIMENSION = 2000
+IMAGE_RESIZE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -120,7 +205,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'perfumes_project.pagination.StandardPagination',
     'PAGE_SIZE': 10
 }
 
@@ -42,6 +42,8 @@ class User(AbstractUser):
     is_admin = models.BooleanField(default=False)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    # Resized copies of the picture, maintained by perfumes_project.images
+    profile_picture_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     date_joined = models.DateTimeField(auto_now_add=True)
 
     USERNAME_FIELD = 'email'
@@ -1,23 +1,25 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import gettext_lazy as _
+from perfumes_project.serializers import DynamicFieldsMixin, SrcsetField
 from .models import Address
 
 User = get_user_model()
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = ['id', 'address_type', 'street_address', 'apartment_address',
                   'city', 'state', 'country', 'zip_code', 'is_default']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     addresses = AddressSerializer(many=True, read_only=True)
+    profile_picture_srcset = SrcsetField(source='profile_picture_derivatives')
     
     class Meta:
         model = User
         fields = ['id', 'email', 'first_name', 'last_name', 'phone_number',
-                  'profile_picture', 'is_staff', 'is_admin', 'addresses']
+                  'profile_picture', 'profile_picture_srcset', 'is_staff', 'is_admin', 'addresses']
         read_only_fields = ['is_staff', 'is_admin']
 
 class UserRegisterSerializer(serializers.ModelSerializer):
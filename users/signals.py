@@ -0,0 +1,4 @@
+from django.contrib.auth import get_user_model
+from perfumes_project import images
+
+images.register(get_user_model(), 'profile_picture', 'profile_picture_derivatives')
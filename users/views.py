@@ -1,4 +1,4 @@
-from rest_framework import viewsets, generics, permissions, status
+from rest_framework import viewsets, generics, permissions, status, filters
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model, authenticate
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from perfumes_project.mixins import SparseFieldsetMixin
 from .models import Address
 from .serializers import (
     UserSerializer, UserRegisterSerializer, UserLoginSerializer,
@@ -14,16 +15,20 @@ from .serializers import (
 
 User = get_user_model()
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['email', 'first_name', 'last_name']
+    ordering_fields = ['date_joined', 'email', 'last_name']
     
     def get_queryset(self):
         # Regular users can only see their own profile
         if not self.request.user.is_staff:
             return User.objects.filter(id=self.request.user.id)
-        return self.queryset
+        # Stable order, so pages do not overlap now that lists are paged
+        return self.queryset.order_by('-date_joined', 'id')
     
     def get_permissions(self):
         if self.action in ['create', 'create_test_user']:
@@ -138,7 +143,7 @@ class LoginView(generics.GenericAPIView):
             "access": str(refresh.access_token),
         })
 
-class AddressViewSet(viewsets.ModelViewSet):
+class AddressViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
     